@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from pydantic import BaseModel
+from functools import lru_cache
+from pydantic import BaseModel, create_model
 
 
 # Classe parent abstraite
@@ -14,3 +15,34 @@ class BaseFileAnalyzer(ABC):
     @abstractmethod
     def get_response_model(self) -> BaseModel:
         pass
+
+    def extract_tabular(self, content: bytes):
+        """Extraction structurée d'un classeur sans le modèle (TabularExtraction), None si le type
+        de document n'en a pas : le classeur est alors lu comme du texte."""
+        return None
+
+    def get_prompt_without(self, satisfied_fields) -> str:
+        """Prompt à envoyer quand certains champs ont déjà été extraits localement."""
+        if not satisfied_fields:
+            return self.get_prompt()
+        return (
+            self.get_prompt()
+            + "\nLes champs suivants ont déjà été extraits, ne les recherchez pas : "
+            + ", ".join(sorted(satisfied_fields)) + ".\n"
+        )
+
+    def get_response_model_without(self, satisfied_fields) -> BaseModel:
+        """Modèle de réponse réduit aux champs qui restent à demander au modèle."""
+        return _trimmed_model(self.get_response_model(), frozenset(satisfied_fields))
+
+
+@lru_cache(maxsize=None)
+def _trimmed_model(model, excluded: frozenset):
+    if not excluded:
+        return model
+    fields = {
+        name: (field.annotation, ...)
+        for name, field in model.model_fields.items()
+        if name not in excluded
+    }
+    return create_model(model.__name__, **fields)
@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from streaming_json import OnItem, emit_fields
+
+
+@dataclass
+class LLMResult:
+    # Instance du modèle de réponse, None si le modèle a refusé de répondre
+    parsed: Optional[BaseModel]
+    provider: str
+    model: str
+    # Tokens du prompt (y compris ceux lus depuis le cache du fournisseur) et de la réponse
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+# Classe parent abstraite des fournisseurs de modèles : chaque fournisseur adapte la sortie
+# structurée (schéma pydantic) à son API
+class BaseLLMProvider(ABC):
+    def __init__(self, name: str, model: str, input_cost: float = 0.0, output_cost: float = 0.0,
+                 cached_input_cost: float = None, context_window: int = 128_000, max_output_tokens: int = 16_384):
+        self.name = name
+        self.model = model
+        # Limites du modèle en tokens, utilisées pour planifier les appels groupés (analysis_planner)
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+        # Coûts en dollars par million de tokens
+        self.input_cost = input_cost
+        self.output_cost = output_cost
+        self.cached_input_cost = input_cost if cached_input_cost is None else cached_input_cost
+
+    @abstractmethod
+    async def parse(self, system: str, prompt: str, response_model: Any) -> LLMResult:
+        pass
+
+    async def parse_stream(self, system: str, prompt: str, response_model: Any, on_item: OnItem) -> LLMResult:
+        """Comme parse, en appelant on_item(champ, valeur) pour chaque élément de liste dès qu'il est
+        généré. Par défaut (fournisseur sans streaming), les éléments sont émis à la fin de la réponse."""
+        result = await self.parse(system, prompt, response_model)
+        if result.parsed is not None:
+            emit_fields(result.parsed.model_dump(exclude_none=True), on_item)
+        return result
+
+    def blended_cost(self, input_share: float = 0.75) -> float:
+        """Coût moyen par million de tokens, pour des appels majoritairement en entrée (prompt + chunk)."""
+        return input_share * self.input_cost + (1 - input_share) * self.output_cost
+
+    def cost(self, result: LLMResult) -> float:
+        return (
+            (result.input_tokens - result.cached_tokens) * self.input_cost
+            + result.cached_tokens * self.cached_input_cost
+            + result.output_tokens * self.output_cost
+        ) / 1_000_000
+
+    def make_result(self, parsed: Optional[BaseModel], input_tokens: int = 0, output_tokens: int = 0,
+                    cached_tokens: int = 0) -> LLMResult:
+        result = LLMResult(parsed, self.name, self.model, input_tokens, output_tokens, cached_tokens)
+        result.cost_usd = self.cost(result)
+        return result
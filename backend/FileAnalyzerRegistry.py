@@ -1,16 +1,19 @@
 from Enums.FileType import FileType
-from Files.BPUFileAnalyzer import BPUFileAnalyzer
-from Files.CCAPFileAnalyzer import CCAPFileAnalyzer
-from Files.CCTPFileAnalyser import CCTPFileAnalyzer
-from Files.MAINFileAnalyzer import MAINFileAnalyzer
-from Files.RCFileAnalyzer import RCFileAnalyzer
 from BaseFileAnalyzer import BaseFileAnalyzer
 
 class FileAnalyzerRegistry:
+    # Les analyseurs sont sans état : chaque worker peut garder sa propre instance du registre,
+    # créée au premier usage plutôt qu'à l'import
     _instances = {}
 
     @classmethod
     def initialize_registry(cls):
+        from Files.BPUFileAnalyzer import BPUFileAnalyzer
+        from Files.CCAPFileAnalyzer import CCAPFileAnalyzer
+        from Files.CCTPFileAnalyser import CCTPFileAnalyzer
+        from Files.MAINFileAnalyzer import MAINFileAnalyzer
+        from Files.RCFileAnalyzer import RCFileAnalyzer
+
         cls._instances = {
             FileType.RC: RCFileAnalyzer(),
             FileType.CCAP: CCAPFileAnalyzer(),
@@ -21,6 +24,8 @@ class FileAnalyzerRegistry:
 
     @classmethod
     def get_analyzer(cls, file_name: str) -> BaseFileAnalyzer:
+        if not cls._instances:
+            cls.initialize_registry()
         file_name_lower = file_name.lower()
 
         for file_type, analyzer in cls._instances.items():
@@ -30,6 +35,12 @@ class FileAnalyzerRegistry:
 
     @classmethod
     def _get_analyzer_class(cls, file_type: FileType):
+        from Files.BPUFileAnalyzer import BPUFileAnalyzer
+        from Files.CCAPFileAnalyzer import CCAPFileAnalyzer
+        from Files.CCTPFileAnalyser import CCTPFileAnalyzer
+        from Files.MAINFileAnalyzer import MAINFileAnalyzer
+        from Files.RCFileAnalyzer import RCFileAnalyzer
+
         registry = {
             FileType.RC: RCFileAnalyzer,
             FileType.CCAP: CCAPFileAnalyzer,
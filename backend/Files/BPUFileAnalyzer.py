@@ -17,4 +17,10 @@ class BPUFileAnalyzer(BaseFileAnalyzer):
         )
 
     def get_response_model(self) -> BaseModel:
-        return BPU
\ No newline at end of file
+        return BPU
+
+    def extract_tabular(self, content: bytes):
+        # Effectifs et montants calculés depuis les colonnes du bordereau, le modèle ne lit que les remarques
+        from bpu_extraction import extract_bpu_table
+
+        return extract_bpu_table(content)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, List
+
+from BaseLLMProvider import BaseLLMProvider, LLMResult
+from deadline import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Routage des appels entre fournisseurs de modèles. Chaque appel est envoyé au fournisseur au
+# meilleur score, calculé sur les appels récents :
+#   p95 de latence / taux de succès + LLM_COST_WEIGHT x coût moyen par million de tokens
+# (en secondes : avec le poids par défaut, 1 $/Mtok de plus vaut 0,5 s de latence en plus).
+# En cas d'erreur, l'appel bascule sur le fournisseur suivant ; après LLM_MAX_FAILURES erreurs
+# consécutives, ou une limite de débit (429), le fournisseur est écarté LLM_COOLDOWN_SECONDS.
+# Une petite part des appels (LLM_EXPLORATION_RATE) va à un autre fournisseur sain pour que ses
+# mesures restent à jour.
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS")
+LLM_COST_WEIGHT = float(os.getenv("LLM_COST_WEIGHT", "0.5"))
+LLM_PRIOR_LATENCY = float(os.getenv("LLM_PRIOR_LATENCY", "10"))
+LLM_MIN_SAMPLES = int(os.getenv("LLM_MIN_SAMPLES", "10"))
+LLM_MAX_FAILURES = int(os.getenv("LLM_MAX_FAILURES", "3"))
+LLM_COOLDOWN_SECONDS = float(os.getenv("LLM_COOLDOWN_SECONDS", "30"))
+LLM_EXPLORATION_RATE = float(os.getenv("LLM_EXPLORATION_RATE", "0.05"))
+STATS_WINDOW = 200
+MIN_SUCCESS_RATE = 0.05
+
+
+class ProviderStats:
+    def __init__(self):
+        self.latency = LatencyTracker(STATS_WINDOW, LLM_MIN_SAMPLES)
+        self.outcomes = deque(maxlen=STATS_WINDOW)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.cost = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def record_success(self, seconds: float, cost: float):
+        self.calls += 1
+        self.cost += cost
+        self.latency.record(seconds)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+
+    def record_failure(self, seconds: float, rate_limited: bool):
+        self.calls += 1
+        self.failures += 1
+        self.latency.record(seconds)
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if rate_limited or self.consecutive_failures >= LLM_MAX_FAILURES:
+            self.cooldown_until = time.monotonic() + LLM_COOLDOWN_SECONDS
+
+
+class LLMRouter:
+    def __init__(self, providers: List[BaseLLMProvider], exploration_rate: float = LLM_EXPLORATION_RATE,
+                 seed: int = None):
+        if not providers:
+            raise ValueError("Aucun fournisseur de modèle configuré")
+        self.providers = providers
+        self.stats = {provider.name: ProviderStats() for provider in providers}
+        self.exploration_rate = exploration_rate
+        self.random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls):
+        """Fournisseurs de LLM_PROVIDERS ("openai,anthropic") ; par défaut OpenAI, plus Anthropic
+        si ANTHROPIC_API_KEY est défini."""
+        names = LLM_PROVIDERS.split(",") if LLM_PROVIDERS else ["openai"] + (["anthropic"] if os.getenv("ANTHROPIC_API_KEY") else [])
+        return cls([cls._create_provider(name.strip()) for name in names if name.strip()])
+
+    @staticmethod
+    def _create_provider(name: str) -> BaseLLMProvider:
+        # Imports différés : chaque SDK n'est chargé que s'il est configuré
+        if name == "openai":
+            from Providers.OpenAIProvider import OpenAIProvider
+            return OpenAIProvider()
+        if name == "anthropic":
+            from Providers.AnthropicProvider import AnthropicProvider
+            return AnthropicProvider()
+        if name == "fake":
+            from Providers.FakeProvider import FakeProvider
+            return FakeProvider()
+        raise ValueError(f"Fournisseur de modèle inconnu : {name}")
+
+    def score(self, provider: BaseLLMProvider) -> float:
+        stats = self.stats[provider.name]
+        p95 = stats.latency.percentile(0.95)
+        if p95 is None:
+            p95 = LLM_PRIOR_LATENCY
+        return p95 / max(MIN_SUCCESS_RATE, 1 - stats.error_rate) + LLM_COST_WEIGHT * provider.blended_cost()
+
+    def ranked(self, explore: bool = True) -> List[BaseLLMProvider]:
+        """Fournisseurs dans l'ordre d'essai : les sains par score, puis ceux écartés (dernier recours).
+        Avec `explore`, un autre fournisseur sain passe parfois en tête (LLM_EXPLORATION_RATE)."""
+        now = time.monotonic()
+        healthy = sorted((p for p in self.providers if self.stats[p.name].cooldown_until <= now), key=self.score)
+        cooling = sorted((p for p in self.providers if self.stats[p.name].cooldown_until > now),
+                         key=lambda p: self.stats[p.name].cooldown_until)
+        if explore and len(healthy) > 1 and self.random.random() < self.exploration_rate:
+            healthy.insert(0, healthy.pop(self.random.randrange(1, len(healthy))))
+        return healthy + cooling
+
+    async def parse(self, system: str, prompt: str, response_model) -> LLMResult:
+        return await self._route(lambda provider: provider.parse(system, prompt, response_model))
+
+    async def parse_stream(self, system: str, prompt: str, response_model, on_item) -> LLMResult:
+        """Comme parse, en émettant les éléments de la réponse au fil de la génération. Après une
+        bascule, les éléments déjà émis par le fournisseur en échec peuvent être émis de nouveau."""
+        return await self._route(lambda provider: provider.parse_stream(system, prompt, response_model, on_item))
+
+    async def _route(self, call: Callable[[BaseLLMProvider], Awaitable[LLMResult]]) -> LLMResult:
+        error = None
+        for provider in self.ranked():
+            stats = self.stats[provider.name]
+            start = time.monotonic()
+            try:
+                result = await call(provider)
+            except asyncio.CancelledError:
+                # Appel annulé (requête doublon plus rapide, délai dépassé) : sa durée reste une mesure
+                stats.latency.record(time.monotonic() - start)
+                raise
+            except Exception as e:
+                rate_limited = getattr(e, "status_code", None) == 429
+                stats.record_failure(time.monotonic() - start, rate_limited)
+                logger.warning(f"Échec de l'appel {provider.name} ({provider.model}) : {e}")
+                error = e
+                continue
+            stats.record_success(time.monotonic() - start, result.cost_usd)
+            return result
+        raise error
+
+    def snapshot(self) -> list:
+        now = time.monotonic()
+        return [
+            {
+                "provider": provider.name,
+                "model": provider.model,
+                "score": round(self.score(provider), 3),
+                "p95_seconds": self.stats[provider.name].latency.percentile(0.95),
+                "error_rate": round(self.stats[provider.name].error_rate, 3),
+                "calls": self.stats[provider.name].calls,
+                "failures": self.stats[provider.name].failures,
+                "cost_usd": round(self.stats[provider.name].cost, 4),
+                "cooling_down": self.stats[provider.name].cooldown_until > now,
+            }
+            for provider in self.providers
+        ]
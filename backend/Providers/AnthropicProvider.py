@@ -0,0 +1,79 @@
+import logging
+import os
+
+from pydantic import ValidationError
+
+from BaseLLMProvider import BaseLLMProvider, LLMResult
+from streaming_json import IncrementalJSONParser
+
+logger = logging.getLogger(__name__)
+
+MAX_OUTPUT_TOKENS = 4096
+
+
+class AnthropicProvider(BaseLLMProvider):
+    def __init__(self, model: str = None, api_key: str = None):
+        super().__init__(
+            "anthropic",
+            model or os.getenv("ANTHROPIC_MODEL", "claude-3-5-haiku-latest"),
+            input_cost=float(os.getenv("ANTHROPIC_INPUT_COST", "0.80")),
+            output_cost=float(os.getenv("ANTHROPIC_OUTPUT_COST", "4.00")),
+            cached_input_cost=float(os.getenv("ANTHROPIC_CACHED_INPUT_COST", "0.08")),
+            context_window=int(os.getenv("ANTHROPIC_CONTEXT_WINDOW", "200000")),
+            max_output_tokens=MAX_OUTPUT_TOKENS,
+        )
+        from anthropic import AsyncAnthropic
+
+        self.client = AsyncAnthropic(api_key=api_key or os.getenv("ANTHROPIC_API_KEY"))
+
+    async def parse(self, system: str, prompt: str, response_model) -> LLMResult:
+        message = await self.client.messages.create(**self._request(system, prompt, response_model))
+        return self._result(message, response_model)
+
+    async def parse_stream(self, system: str, prompt: str, response_model, on_item) -> LLMResult:
+        # L'entrée de l'outil arrive par fragments JSON (événements input_json)
+        parser = IncrementalJSONParser()
+        async with self.client.messages.stream(**self._request(system, prompt, response_model)) as stream:
+            async for event in stream:
+                if event.type == "input_json":
+                    for field, value in parser.feed(event.partial_json):
+                        on_item(field, value)
+            message = await stream.get_final_message()
+        return self._result(message, response_model)
+
+    def _request(self, system: str, prompt: str, response_model) -> dict:
+        # Sortie structurée : un outil unique dont le schéma d'entrée est le modèle de réponse,
+        # dont l'appel est imposé
+        tool_name = response_model.__name__
+        return dict(
+            model=self.model,
+            max_tokens=MAX_OUTPUT_TOKENS,
+            system=system,
+            messages=[{"role": "user", "content": prompt}],
+            tools=[{
+                "name": tool_name,
+                "description": "Enregistre les informations extraites du document.",
+                "input_schema": response_model.model_json_schema(),
+            }],
+            tool_choice={"type": "tool", "name": tool_name},
+        )
+
+    def _result(self, message, response_model) -> LLMResult:
+        # Sans appel d'outil valide, la réponse est traitée comme un refus
+        tool_input = next((block.input for block in message.content if block.type == "tool_use"), None)
+        parsed = None
+        if tool_input is not None:
+            try:
+                parsed = response_model.model_validate(tool_input)
+            except ValidationError as e:
+                logger.warning(f"Réponse hors schéma de {self.model} : {e}")
+        # input_tokens ne compte pas les tokens lus depuis le cache (ni ceux qui y sont écrits)
+        usage = message.usage
+        cached = getattr(usage, "cache_read_input_tokens", None) or 0
+        created = getattr(usage, "cache_creation_input_tokens", None) or 0
+        return self.make_result(
+            parsed,
+            input_tokens=usage.input_tokens + cached + created,
+            output_tokens=usage.output_tokens,
+            cached_tokens=cached,
+        )
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import random
+import typing
+
+from pydantic import BaseModel
+
+from BaseLLMProvider import BaseLLMProvider, LLMResult
+from streaming_json import IncrementalJSONParser
+
+
+class FakeProviderError(Exception):
+    pass
+
+
+def empty_response(prompt: str, response_model) -> dict:
+    """Réponse par défaut : chaque champ vide (liste vide, ou None) ; un champ modèle
+    (analyse groupée de plusieurs documents) reçoit la réponse vide de son modèle."""
+    return {
+        name: [] if typing.get_origin(field.annotation) is list
+        else empty_response(prompt, field.annotation) if isinstance(field.annotation, type) and issubclass(field.annotation, BaseModel)
+        else None
+        for name, field in response_model.model_fields.items()
+    }
+
+
+class FakeProvider(BaseLLMProvider):
+    """Fournisseur local, sans réseau, pour tester le routage : latence, taux d'erreur et coût réglables,
+    modifiables en cours de test (provider.latency = 5, provider.error_rate = 1, ...)."""
+
+    def __init__(self, name: str = "fake", latency: float = 0.0, error_rate: float = 0.0,
+                 input_cost: float = 0.0, output_cost: float = 0.0, responder=empty_response, seed: int = None,
+                 stream_fragments: int = 20):
+        super().__init__(name, f"{name}-model", input_cost, output_cost)
+        self.latency = latency
+        # En streaming, la réponse est découpée en fragments répartis sur la latence
+        self.stream_fragments = stream_fragments
+        self.error_rate = error_rate
+        self.responder = responder
+        self.calls = 0
+        self.random = random.Random(seed)
+
+    async def parse(self, system: str, prompt: str, response_model) -> LLMResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.random.random() < self.error_rate:
+            raise FakeProviderError(f"Erreur simulée de {self.name}")
+        return self._result(system, prompt, response_model, self.responder(prompt, response_model))
+
+    async def parse_stream(self, system: str, prompt: str, response_model, on_item) -> LLMResult:
+        self.calls += 1
+        if self.random.random() < self.error_rate:
+            await asyncio.sleep(self.latency)
+            raise FakeProviderError(f"Erreur simulée de {self.name}")
+        data = self.responder(prompt, response_model)
+        text = json.dumps(data, ensure_ascii=False) if data is not None else ""
+        parser = IncrementalJSONParser()
+        size = max(1, -(-len(text) // self.stream_fragments))
+        for start in range(0, len(text), size):
+            await asyncio.sleep(self.latency / self.stream_fragments)
+            for field, value in parser.feed(text[start:start + size]):
+                on_item(field, value)
+        return self._result(system, prompt, response_model, data)
+
+    def _result(self, system: str, prompt: str, response_model, data) -> LLMResult:
+        return self.make_result(
+            None if data is None else response_model(**data),
+            input_tokens=(len(system) + len(prompt)) // 4,
+            output_tokens=len(str(data)) // 4,
+        )
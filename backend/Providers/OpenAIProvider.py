@@ -0,0 +1,67 @@
+import os
+
+from BaseLLMProvider import BaseLLMProvider, LLMResult
+from streaming_json import IncrementalJSONParser
+
+
+class OpenAIProvider(BaseLLMProvider):
+    def __init__(self, model: str = None, api_key: str = None, base_url: str = None):
+        super().__init__(
+            "openai",
+            model or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            input_cost=float(os.getenv("OPENAI_INPUT_COST", "0.15")),
+            output_cost=float(os.getenv("OPENAI_OUTPUT_COST", "0.60")),
+            cached_input_cost=float(os.getenv("OPENAI_CACHED_INPUT_COST", "0.075")),
+            context_window=int(os.getenv("OPENAI_CONTEXT_WINDOW", "128000")),
+            max_output_tokens=int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", "16384")),
+        )
+        from openai import AsyncOpenAI
+
+        # OPENAI_BASE_URL permet de pointer vers un serveur simulé (scripts/mock_openai.py)
+        self.client = AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+        )
+
+    async def parse(self, system: str, prompt: str, response_model) -> LLMResult:
+        completion = await self.client.beta.chat.completions.parse(
+            model=self.model,
+            messages=self._messages(system, prompt),
+            response_format=response_model,
+        )
+        return self._result(completion)
+
+    async def parse_stream(self, system: str, prompt: str, response_model, on_item) -> LLMResult:
+        parser = IncrementalJSONParser()
+        async with self.client.beta.chat.completions.stream(
+            model=self.model,
+            messages=self._messages(system, prompt),
+            response_format=response_model,
+            stream_options={"include_usage": True},
+        ) as stream:
+            async for event in stream:
+                if event.type == "content.delta":
+                    for field, value in parser.feed(event.delta):
+                        on_item(field, value)
+            completion = await stream.get_final_completion()
+        return self._result(completion)
+
+    @staticmethod
+    def _messages(system: str, prompt: str):
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _result(self, completion) -> LLMResult:
+        message = completion.choices[0].message
+        usage = completion.usage
+        # prompt_tokens_details n'est pas typé dans toutes les versions du SDK (champ supplémentaire)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", 0)
+        return self.make_result(
+            None if message.refusal else message.parsed,
+            input_tokens=usage.prompt_tokens if usage else 0,
+            output_tokens=usage.completion_tokens if usage else 0,
+            cached_tokens=cached or 0,
+        )
@@ -0,0 +1,214 @@
+import heapq
+import logging
+import math
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from analyze import CHUNK_WORDS
+
+logger = logging.getLogger(__name__)
+
+# Choix de la stratégie d'appels au modèle pour un appel d'offres, une fois le texte de ses
+# documents extrait :
+#   - single : un seul appel pour tous les documents (contexte long, prompts communs une fois) ;
+#   - grouped : des appels regroupant plusieurs documents, dans la limite de PLANNER_MAX_CALL_TOKENS,
+#     les documents trop longs restant découpés ;
+#   - fanout : un appel par chunk de CHUNK_WORDS mots, en parallèle (comportement historique).
+# Chaque stratégie réalisable (fenêtre de contexte et sortie maximale du modèle) est estimée en
+# coût (prix du fournisseur préféré du routeur) et en durée (latence modélisée ; les appels sont
+# répartis entre LLM_WORKERS workers, chacun prenant l'appel suivant dès qu'il est libre) ; la
+# stratégie retenue minimise durée + PLANNER_COST_WEIGHT x coût. Un appel émet chaque champ
+# demandé une fois, qu'il couvre un chunk ou plusieurs documents : le découpage répète la sortie
+# à chaque chunk, l'appel unique ou groupé ne la paie qu'une fois mais la génère d'un seul tenant.
+# PLANNER_MAX_CALL_TOKENS borne la taille d'un appel bien en deçà de la fenêtre de contexte : au-delà,
+# le rappel des longues listes baisse (voir scripts/benchmark_strategies.py).
+ANALYSIS_STRATEGY = os.getenv("ANALYSIS_STRATEGY", "auto")
+STRATEGIES = ("single", "grouped", "fanout")
+PLANNER_MAX_CALL_TOKENS = int(os.getenv("PLANNER_MAX_CALL_TOKENS", "40000"))
+# Au-delà, l'appel d'offres est analysé chunk par chunk sans attendre la fin de l'extraction
+PLANNER_MAX_BUFFER_TOKENS = int(os.getenv("PLANNER_MAX_BUFFER_TOKENS", "200000"))
+# Attente maximale des textes mis de côté pour planifier, bornée aussi à PLANNER_DEADLINE_SHARE du
+# délai de la requête : au-delà, les documents en attente sont découpés sans attendre la fin de
+# l'extraction (l'estimation de durée des stratégies ne compte pas cette attente)
+PLANNER_MAX_BUFFER_SECONDS = float(os.getenv("PLANNER_MAX_BUFFER_SECONDS", "5"))
+PLANNER_DEADLINE_SHARE = 0.25
+# Secondes de durée équivalentes à 1 $ (par défaut, 1 centime vaut 2 s)
+PLANNER_COST_WEIGHT = float(os.getenv("PLANNER_COST_WEIGHT", "200"))
+# Modèle de latence d'un appel : délai fixe + lecture du prompt + génération de la réponse
+LLM_BASE_LATENCY = float(os.getenv("LLM_BASE_LATENCY", "0.6"))
+PREFILL_TOKENS_PER_SECOND = float(os.getenv("LLM_PREFILL_TOKENS_PER_SECOND", "10000"))
+DECODE_TOKENS_PER_SECOND = float(os.getenv("LLM_DECODE_TOKENS_PER_SECOND", "100"))
+# Taille estimée de la réponse par champ demandé dans un appel, et marge de la fenêtre de contexte
+OUTPUT_TOKENS_PER_FIELD = int(os.getenv("PLANNER_OUTPUT_TOKENS_PER_FIELD", "40"))
+CONTEXT_MARGIN = 0.9
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    # Estimation suffisante pour planifier, sans charger d'encodeur
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class PlannedDocument:
+    name: str
+    analyzer: str
+    prompt_tokens: int
+    tokens: int
+    fields: int
+    chunks: int
+
+    @property
+    def output_tokens(self) -> int:
+        return self.fields * OUTPUT_TOKENS_PER_FIELD
+
+
+@dataclass
+class Estimate:
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    wall_seconds: float = 0.0
+    feasible: bool = True
+
+    @property
+    def score(self) -> float:
+        return self.wall_seconds + PLANNER_COST_WEIGHT * self.cost_usd
+
+
+@dataclass
+class AnalysisPlan:
+    strategy: str
+    # Documents analysés ensemble, un appel par groupe
+    groups: List[List[PlannedDocument]] = field(default_factory=list)
+    # Documents analysés chunk par chunk
+    fanout: List[PlannedDocument] = field(default_factory=list)
+    estimates: Dict[str, Estimate] = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "calls": len(self.groups) + sum(document.chunks for document in self.fanout),
+            "estimates": {
+                name: {**asdict(estimate), "cost_usd": round(estimate.cost_usd, 6),
+                       "wall_seconds": round(estimate.wall_seconds, 1)}
+                for name, estimate in self.estimates.items()
+            },
+        }
+
+
+def document_for(name: str, analyzer: str, prompt: str, fields: int, text: str) -> PlannedDocument:
+    return PlannedDocument(
+        name=name,
+        analyzer=analyzer,
+        prompt_tokens=count_tokens(prompt),
+        tokens=count_tokens(text),
+        fields=fields,
+        chunks=max(1, math.ceil(len(text.split()) / CHUNK_WORDS)),
+    )
+
+
+def call_latency(input_tokens: int, output_tokens: int) -> float:
+    return LLM_BASE_LATENCY + input_tokens / PREFILL_TOKENS_PER_SECOND + output_tokens / DECODE_TOKENS_PER_SECOND
+
+
+def group_input_tokens(documents: List[PlannedDocument]) -> int:
+    # Le prompt de chaque type de document n'est envoyé qu'une fois par appel
+    prompts = {document.analyzer: document.prompt_tokens for document in documents}
+    return sum(prompts.values()) + sum(document.tokens for document in documents)
+
+
+def group_output_tokens(documents: List[PlannedDocument]) -> int:
+    # Chaque champ n'est émis qu'une fois par appel : les documents d'un même type partagent leurs champs
+    fields = {}
+    for document in documents:
+        fields[document.analyzer] = max(fields.get(document.analyzer, 0), document.fields)
+    return sum(fields.values()) * OUTPUT_TOKENS_PER_FIELD
+
+
+def wall_seconds(latencies: List[float], concurrency: int) -> float:
+    """Durée d'une série d'appels répartis entre `concurrency` workers, du plus long au plus court,
+    chacun prenant l'appel suivant dès qu'il est libre."""
+    workers = [0.0] * max(1, min(concurrency, len(latencies)))
+    for latency in sorted(latencies, reverse=True):
+        heapq.heapreplace(workers, workers[0] + latency)
+    return max(workers)
+
+
+class Planner:
+    def __init__(self, provider, concurrency: int):
+        self.provider = provider
+        self.concurrency = concurrency
+        self.max_input = min(PLANNER_MAX_CALL_TOKENS, int(provider.context_window * CONTEXT_MARGIN))
+        self.max_output = int(provider.max_output_tokens * CONTEXT_MARGIN)
+
+    @classmethod
+    def for_client(cls, client, concurrency: int):
+        # Routeur : le fournisseur au meilleur score, qui recevra vraisemblablement les appels
+        # (sans l'exploration aléatoire du routage)
+        provider = client.ranked(explore=False)[0] if hasattr(client, "ranked") else client
+        return cls(provider, concurrency)
+
+    def fits(self, documents: List[PlannedDocument]) -> bool:
+        output = group_output_tokens(documents)
+        return group_input_tokens(documents) + output <= self.max_input and output <= self.max_output
+
+    def estimate(self, groups: List[List[PlannedDocument]], fanout: List[PlannedDocument]) -> Estimate:
+        calls = []
+        for group in groups:
+            calls.append((group_input_tokens(group), group_output_tokens(group)))
+        for document in fanout:
+            chunk_tokens = math.ceil(document.tokens / document.chunks)
+            calls += [(document.prompt_tokens + chunk_tokens, document.output_tokens)] * document.chunks
+
+        estimate = Estimate(calls=len(calls))
+        latencies = []
+        for input_tokens, output_tokens in calls:
+            estimate.input_tokens += input_tokens
+            estimate.output_tokens += output_tokens
+            latencies.append(call_latency(input_tokens, output_tokens))
+        estimate.cost_usd = (
+            estimate.input_tokens * self.provider.input_cost + estimate.output_tokens * self.provider.output_cost
+        ) / 1_000_000
+        estimate.wall_seconds = wall_seconds(latencies, self.concurrency)
+        return estimate
+
+    def grouped(self, documents: List[PlannedDocument]):
+        """Regroupe les documents par type puis du plus long au plus court, tant que l'appel tient
+        dans les limites ; les documents trop longs pour un appel restent découpés."""
+        groups, fanout = [], []
+        for document in sorted(documents, key=lambda d: (d.analyzer, -d.tokens)):
+            if not self.fits([document]):
+                fanout.append(document)
+                continue
+            for group in groups:
+                if self.fits(group + [document]):
+                    group.append(document)
+                    break
+            else:
+                groups.append([document])
+        return groups, fanout
+
+    def plan(self, documents: List[PlannedDocument], strategy: str = ANALYSIS_STRATEGY) -> AnalysisPlan:
+        candidates = {"fanout": ([], list(documents))}
+        if self.fits(documents):
+            candidates["single"] = ([list(documents)], [])
+        groups, fanout = self.grouped(documents)
+        # Sans document regroupé, la stratégie groupée est identique au découpage
+        if any(len(group) > 1 for group in groups):
+            candidates["grouped"] = (groups, fanout)
+
+        estimates = {name: self.estimate(*candidate) for name, candidate in candidates.items()}
+        for name in STRATEGIES:
+            estimates.setdefault(name, Estimate(feasible=False))
+
+        if strategy in candidates:
+            chosen = strategy
+        else:
+            if strategy != "auto":
+                logger.info(f"Stratégie '{strategy}' impossible pour ces documents : choix automatique.")
+            chosen = min(candidates, key=lambda name: estimates[name].score)
+        groups, fanout = candidates[chosen]
+        return AnalysisPlan(chosen, groups, fanout, estimates)
@@ -0,0 +1,163 @@
+import logging
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Analyse tabulaire des bordereaux de prix unitaires (BPU) au format XLSX, sans le modèle :
+# chaque feuille est chargée en colonnes (pandas), la ligne d'en-tête et le rôle des colonnes
+# (prix unitaire, quantité, heures, effectifs, ...) sont reconnus par mots-clés, puis montants,
+# volumes horaires et effectifs sont calculés colonne par colonne. Seules les remarques en texte
+# libre restent à faire lire par le modèle.
+HEADER_SCAN_ROWS = 30
+MIN_HEADER_ROLES = 2
+REMARK_MIN_WORDS = 6
+
+# Ordre significatif : le premier motif reconnu donne le rôle de la colonne
+# ("Taux horaire" est un prix unitaire, "Total heures" un volume horaire)
+COLUMN_ROLES = [
+    ("unit_price", r"prix\s*unit|\bp\.?\s*u\.?(?:\s|$)|taux\s*horaire|prix\s*horaire|co[uû]t\s*horaire"),
+    ("cdi", r"\bcdi\b"),
+    ("cdd", r"\bcdd\b"),
+    ("agents", r"nombre\s*d.?\s*agents|\bnb\.?\s*(?:d.?\s*)?agents|effectif|\betp\b"),
+    ("hours", r"heures|volume\s*horaire|\bnb\.?\s*h\b"),
+    ("amount", r"montant|total"),
+    ("quantity", r"quantit|\bqt[ée]s?\b|\bnombre\b|\bnb\b|volume"),
+    ("unit", r"^unit[ée]s?$|^u$|unit[ée]\s*de\s*(?:mesure|compte)"),
+    ("designation", r"d[ée]signation|libell[ée]|prestation|description|intitul[ée]|article|poste"),
+]
+NUMERIC_ROLES = {"unit_price", "cdi", "cdd", "agents", "hours", "amount", "quantity"}
+TOTAL_ROW = r"^\s*(?:sous[-\s]?)?total"
+HOUR_UNIT = r"^\s*h\b|heure"
+
+# Champs du modèle BPU remplis entièrement par l'analyse tabulaire quand la colonne existe
+HEADCOUNT_FIELDS = {"agents": "nombre_agents", "cdi": "nombre_cdi", "cdd": "nombre_cdd"}
+
+
+@dataclass
+class TabularExtraction:
+    fields: Dict[str, List] = field(default_factory=dict)
+    # Champs à ne plus demander au modèle
+    satisfied: Set[str] = field(default_factory=set)
+    # Texte libre du classeur (remarques, descriptions longues), seul envoyé au modèle
+    remarks: str = ""
+
+
+def format_number(value: float, decimals: int = 2) -> str:
+    return f"{value:,.{decimals}f}".replace(",", " ").replace(".", ",")
+
+
+def to_numbers(column):
+    """Convertit une colonne en nombres ("1 234,50 €" -> 1234.5), NaN pour les cellules non numériques."""
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype(float)
+    cleaned = column.astype(str).str.replace(r"[^\d,.\-]", "", regex=True)
+    # Séparateur de milliers "." et décimale "," : 1.234,50
+    french = cleaned.str.contains(",", regex=False) & cleaned.str.contains(".", regex=False)
+    cleaned = cleaned.where(~french, cleaned.str.replace(".", "", regex=False))
+    return pd.to_numeric(cleaned.str.replace(",", ".", regex=False), errors="coerce")
+
+
+def find_header(grid):
+    """Position de la ligne d'en-tête (celle qui reconnaît le plus de rôles de colonnes) et rôles reconnus."""
+    labels = grid.head(HEADER_SCAN_ROWS).apply(lambda column: column.astype(str).str.strip().str.lower())
+    labels = labels.where(grid.head(HEADER_SCAN_ROWS).notna(), "")
+
+    roles_by_row = [{} for _ in range(len(labels))]
+    for role, pattern in COLUMN_ROLES:
+        matched = labels.apply(lambda column: column.str.contains(pattern, regex=True)).to_numpy()
+        for row, col in zip(*matched.nonzero()):
+            column = grid.columns[col]
+            # Une colonne n'a qu'un rôle, et un rôle qu'une colonne (la première)
+            if column not in roles_by_row[row].values() and role not in roles_by_row[row]:
+                roles_by_row[row][role] = column
+
+    best = max(range(len(roles_by_row)), key=lambda row: len(roles_by_row[row]), default=None)
+    if best is None or len(roles_by_row[best]) < MIN_HEADER_ROLES:
+        return None, {}
+    return best, roles_by_row[best]
+
+
+def analyze_sheet(sheet_name: str, grid) -> Optional[dict]:
+    import numpy as np
+
+    grid = grid.dropna(how="all").dropna(axis=1, how="all")
+    if grid.empty:
+        return None
+    header, roles = find_header(grid)
+    if header is None or not NUMERIC_ROLES & roles.keys():
+        return None
+
+    body = grid.iloc[header + 1:]
+    label_column = roles.get("designation", grid.columns[0])
+    body = body[~body[label_column].astype(str).str.contains(TOTAL_ROW, case=False, regex=True, na=False)]
+    numbers = {role: to_numbers(body[column]) for role, column in roles.items() if role in NUMERIC_ROLES}
+    quantity = numbers.get("quantity", numbers.get("hours"))
+
+    priced = np.logical_or.reduce([values.notna().to_numpy() for values in numbers.values()])
+    summary = {"sheet": sheet_name, "lines": int(priced.sum())}
+    if "unit_price" in numbers and quantity is not None:
+        line_amounts = (numbers["unit_price"] * quantity).fillna(numbers.get("amount", np.nan))
+        summary["total"] = float(np.nansum(line_amounts.to_numpy()))
+    elif "amount" in numbers:
+        summary["total"] = float(np.nansum(numbers["amount"].to_numpy()))
+
+    if "hours" in numbers:
+        summary["hours"] = float(np.nansum(numbers["hours"].to_numpy()))
+    elif "quantity" in numbers and "unit" in roles:
+        in_hours = body[roles["unit"]].astype(str).str.contains(HOUR_UNIT, case=False, regex=True, na=False)
+        if in_hours.any():
+            summary["hours"] = float(np.nansum(numbers["quantity"][in_hours].to_numpy()))
+
+    for role in HEADCOUNT_FIELDS:
+        if role in numbers and numbers[role].notna().any():
+            summary[role] = int(round(np.nansum(numbers[role].to_numpy())))
+    if "agents" not in summary and ("cdi" in summary or "cdd" in summary):
+        summary["agents"] = summary.get("cdi", 0) + summary.get("cdd", 0)
+
+    # Texte libre hors colonnes numériques et ligne d'en-tête
+    text_cells = grid.drop(index=grid.index[header]).drop(columns=[roles[role] for role in NUMERIC_ROLES & roles.keys()])
+    text_cells = text_cells.stack().astype(str).str.strip()
+    remarks = text_cells[text_cells.str.split().str.len() >= REMARK_MIN_WORDS]
+    summary["remarks"] = list(dict.fromkeys(remarks))
+    return summary
+
+
+def extract_bpu_table(excel_content: bytes) -> Optional[TabularExtraction]:
+    """Analyse tabulaire d'un BPU. Retourne None si aucune feuille n'a de tableau de prix reconnaissable :
+    le classeur est alors traité comme du texte, comme les autres documents."""
+    import pandas as pd
+
+    try:
+        sheets = pd.read_excel(BytesIO(excel_content), sheet_name=None, header=None, engine="openpyxl")
+    except Exception as e:
+        logger.error(f"Error reading BPU workbook: {str(e)}")
+        return None
+
+    summaries = [summary for name, grid in sheets.items() if (summary := analyze_sheet(name, grid)) is not None]
+    if not summaries:
+        return None
+
+    extraction = TabularExtraction()
+    details = []
+    remarks = []
+    for summary in summaries:
+        for role, field_name in HEADCOUNT_FIELDS.items():
+            if role in summary:
+                extraction.fields.setdefault(field_name, []).append(summary[role])
+                extraction.satisfied.add(field_name)
+        line = f"{summary['sheet']} : {summary['lines']} lignes de prix"
+        if "total" in summary:
+            line += f", montant total HT {format_number(summary['total'])} €"
+        if "hours" in summary:
+            line += f", volume horaire {format_number(summary['hours'], 0)} h"
+        details.append(line)
+        if summary["remarks"]:
+            remarks.append(f"{summary['sheet']} :\n" + "\n".join(summary["remarks"]))
+
+    extraction.fields["autres_details"] = details
+    extraction.remarks = "\n\n".join(remarks)
+    return extraction
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# Points de reprise des analyses : l'issue de chaque chunk envoyé au modèle (réussite, refus ou
+# erreur) est enregistrée dès qu'elle est connue, par appel d'offres et par fichier. Un chunk en
+# échec est relancé seul, selon la politique CHUNK_RETRY_* ; s'il échoue encore, le fichier est
+# rendu avec les chunks réussis et la liste des chunks manquants. Au dépôt suivant, un chunk déjà
+# réussi (même prompt, même texte) est repris du point de reprise : seuls les chunks manquants
+# sont renvoyés au modèle.
+DB_NAME = "checkpoints.sqlite"
+# Tentatives par chunk, la première comprise ; délai doublé après chaque échec
+CHUNK_RETRY_ATTEMPTS = int(os.getenv("CHUNK_RETRY_ATTEMPTS", "3"))
+CHUNK_RETRY_BACKOFF = float(os.getenv("CHUNK_RETRY_BACKOFF", "1.0"))
+# Relancer aussi les chunks auxquels le modèle a refusé de répondre
+CHUNK_RETRY_REFUSALS = os.getenv("CHUNK_RETRY_REFUSALS", "1") == "1"
+CHECKPOINT_RETENTION_DAYS = int(os.getenv("CHECKPOINT_RETENTION_DAYS", "7"))
+
+OK = "ok"
+REFUSED = "refused"
+ERROR = "error"
+# Échec constaté après le délai de la requête : ni relancé, ni enregistré
+EXPIRED = "expired"
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS chunk_checkpoints (tender_id TEXT, file_name TEXT, chunk_key TEXT, "
+    "chunk_index INTEGER, status TEXT, result TEXT, error TEXT, attempts INTEGER, updated_at TEXT, "
+    "PRIMARY KEY (tender_id, file_name, chunk_key))",
+    "CREATE INDEX IF NOT EXISTS chunk_checkpoints_updated ON chunk_checkpoints (updated_at)",
+]
+
+_schema_ready = False
+
+
+def _connect():
+    global _schema_ready
+    connection = connect(DB_NAME)
+    if not _schema_ready:
+        for statement in SCHEMA:
+            connection.execute(statement)
+        _schema_ready = True
+    return connection
+
+
+def chunk_key(prompt: str, text: str) -> str:
+    # Le prompt dépend des champs déjà extraits par les règles : il fait partie de la clé
+    return hashlib.sha256(f"{prompt}\0{text}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = CHUNK_RETRY_ATTEMPTS
+    backoff: float = CHUNK_RETRY_BACKOFF
+    retry_refusals: bool = CHUNK_RETRY_REFUSALS
+
+    def delay(self, attempt: int) -> float:
+        return self.backoff * 2 ** (attempt - 1)
+
+
+@dataclass
+class ChunkOutcome:
+    status: str
+    info: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # 0 : résultat repris d'un point de reprise, sans appel au modèle
+    attempts: int = 0
+
+    def missing(self, index: int) -> Dict[str, Any]:
+        return {"chunk": index, "status": self.status, "error": self.error, "attempts": self.attempts}
+
+
+class ProviderCallError(Exception):
+    """Échec de l'appel au fournisseur : seule erreur relancée par call_with_retry. Les autres
+    exceptions (ordonnancement, annulation, ...) ne sont pas des échecs du modèle et se propagent."""
+
+
+async def provider_call(call: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+    try:
+        return await call()
+    except Exception as e:
+        raise ProviderCallError(f"{type(e).__name__}: {e}") from e
+
+
+async def call_with_retry(call: Callable[[], Awaitable[Optional[dict]]], policy: RetryPolicy, label: str,
+                          deadline=None) -> ChunkOutcome:
+    """Exécute `call` (None : refus du modèle) jusqu'à policy.attempts fois, tant qu'il échoue.
+    `call` signale l'échec du fournisseur par ProviderCallError (voir provider_call). Aucune
+    relance n'est lancée au-delà de `deadline` (Deadline)."""
+    attempt = 0
+    while True:
+        attempt += 1
+        error = None
+        try:
+            info = await call()
+        except ProviderCallError as e:
+            info, error = None, str(e)
+        if info is not None:
+            return ChunkOutcome(OK, info, attempts=attempt)
+        reason = error or "refus du modèle"
+        if deadline is not None and deadline.expired:
+            logger.warning(f"{label} : tentative {attempt} en échec après le délai de la requête ({reason}).")
+            return ChunkOutcome(EXPIRED, error=error, attempts=attempt)
+        if attempt >= policy.attempts or (error is None and not policy.retry_refusals):
+            return ChunkOutcome(ERROR if error else REFUSED, error=error, attempts=attempt)
+        delay = policy.delay(attempt)
+        if deadline is not None and deadline.remaining() <= delay:
+            logger.warning(f"{label} : tentative {attempt} en échec ({reason}), pas de relance avant le délai de la requête.")
+            return ChunkOutcome(EXPIRED, error=error, attempts=attempt)
+        logger.warning(f"{label} : tentative {attempt} en échec ({reason}), nouvel essai dans {delay:g}s.")
+        await asyncio.sleep(delay)
+
+
+class ChunkCheckpoints:
+    """Points de reprise des chunks d'un appel d'offres."""
+
+    def __init__(self, tender_id: str):
+        self.tender_id = tender_id
+        # Chunks réussis, par (fichier, clé du chunk)
+        self.done: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def load(self):
+        """Charge les chunks réussis de l'appel d'offres et supprime les points de reprise expirés."""
+        expired = (datetime.utcnow() - timedelta(days=CHECKPOINT_RETENTION_DAYS)).isoformat()
+        connection = _connect()
+        try:
+            connection.execute("DELETE FROM chunk_checkpoints WHERE updated_at < ?", (expired,))
+            rows = connection.execute(
+                "SELECT file_name, chunk_key, result FROM chunk_checkpoints WHERE tender_id = ? AND status = ?",
+                (self.tender_id, OK),
+            ).fetchall()
+        finally:
+            connection.close()
+        self.done = {(file_name, key): json.loads(result) for file_name, key, result in rows}
+
+    def get(self, file_name: str, key: str) -> Optional[Dict[str, Any]]:
+        return self.done.get((file_name, key))
+
+    def record(self, file_name: str, index: int, key: str, outcome: ChunkOutcome):
+        connection = _connect()
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO chunk_checkpoints (tender_id, file_name, chunk_key, chunk_index, status, "
+                "result, error, attempts, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.tender_id, file_name, key, index, outcome.status,
+                 json.dumps(outcome.info, ensure_ascii=False) if outcome.info is not None else None,
+                 outcome.error, outcome.attempts, datetime.utcnow().isoformat()),
+            )
+        finally:
+            connection.close()
+        if outcome.status == OK:
+            self.done[(file_name, key)] = outcome.info
+
+    def forget(self, file_names: Iterable[str]):
+        """Supprime les points de reprise des fichiers dont le résultat complet est enregistré ailleurs (manifeste)."""
+        connection = _connect()
+        try:
+            connection.executemany(
+                "DELETE FROM chunk_checkpoints WHERE tender_id = ? AND file_name = ?",
+                [(self.tender_id, file_name) for file_name in file_names],
+            )
+        finally:
+            connection.close()
+
+
+async def run_checkpointed(call: Callable[[], Awaitable[Optional[dict]]], file_name: str, index: int, key: str,
+                           checkpoints: Optional[ChunkCheckpoints] = None,
+                           policy: Optional[RetryPolicy] = None, deadline=None) -> ChunkOutcome:
+    """Analyse un chunk : reprise du point de reprise s'il a déjà réussi, sinon appel avec
+    relances, puis enregistrement de son issue (sauf échec après le délai de la requête)."""
+    saved = checkpoints.get(file_name, key) if checkpoints is not None else None
+    if saved is not None:
+        return ChunkOutcome(OK, saved)
+
+    outcome = await call_with_retry(call, policy or RetryPolicy(), f"Chunk {index} de '{file_name}'", deadline)
+    if outcome.status == ERROR:
+        logger.error(f"Error extracting information with GPT for file '{file_name}', chunk {index}: {outcome.error}")
+    if outcome.status != EXPIRED:
+        await save_checkpoint(checkpoints, file_name, index, key, outcome)
+    return outcome
+
+
+async def save_checkpoint(checkpoints: Optional[ChunkCheckpoints], file_name: str, index: int, key: str,
+                          outcome: ChunkOutcome):
+    if checkpoints is None:
+        return
+    try:
+        await asyncio.to_thread(checkpoints.record, file_name, index, key, outcome)
+    except Exception as e:
+        # L'analyse continue : seule la reprise de ce chunk au prochain dépôt est perdue
+        logger.error(f"Enregistrement du point de reprise de '{file_name}' (chunk {index}) impossible: {e}")
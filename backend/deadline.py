@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import AsyncContextManager, Awaitable, Callable, Optional, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Budget de latence d'une requête d'analyse et relance ("hedging") des appels LLM lents :
+# si un appel dépasse le percentile HEDGE_PERCENTILE des latences récentes, une seconde requête
+# identique est envoyée et la première réponse obtenue est retenue.
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "90"))
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+# Attente maximale des requêtes perdantes laissées aller à leur terme pour compter leur consommation
+HEDGE_LOSER_TIMEOUT_SECONDS = float(os.getenv("HEDGE_LOSER_TIMEOUT_SECONDS", "120"))
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+
+class LatencyTracker:
+    """Fenêtre glissante des dernières latences observées (en secondes)."""
+
+    def __init__(self, window: int = 200, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# Latences des appels LLM réussis, par processus
+llm_latency = LatencyTracker()
+
+
+async def _timed(call: Callable[[], Awaitable[T]], tracker: LatencyTracker,
+                 slot: Optional[Callable[[], AsyncContextManager]] = None,
+                 started: Optional[asyncio.Event] = None) -> T:
+    # L'attente de la place (slot) n'est pas comptée dans la latence de l'appel
+    async with slot() if slot is not None else nullcontext():
+        if started is not None:
+            started.set()
+        start = time.monotonic()
+        result = await call()
+        tracker.record(time.monotonic() - start)
+        return result
+
+
+async def hedged_call(call: Callable[[], Awaitable[T]], tracker: LatencyTracker = llm_latency,
+                      losers: Optional[Set[asyncio.Future]] = None,
+                      slot: Optional[Callable[[], AsyncContextManager]] = None) -> T:
+    """Exécute `call` ; s'il n'a pas répondu après le percentile de latence, lance un doublon
+    et retourne la première réponse réussie. L'appel perdant est annulé, ou, avec `losers`,
+    laissé aller à son terme et ajouté à cet ensemble : sa réponse, facturée par le fournisseur,
+    est alors comptée par `call` lui-même (voir drain_losers).
+    Avec `slot` (par exemple scheduler.slot), chaque requête, doublon compris, occupe sa propre
+    place pendant toute sa durée ; le délai avant le doublon court à partir de l'obtention de
+    la place de la première."""
+    delay = tracker.percentile(HEDGE_PERCENTILE) if HEDGE_ENABLED else None
+    started = asyncio.Event()
+    primary = asyncio.ensure_future(_timed(call, tracker, slot, started))
+    if delay is None:
+        return await primary
+
+    pending = {primary}
+    error = None
+    try:
+        waiting = asyncio.ensure_future(started.wait())
+        try:
+            await asyncio.wait({primary, waiting}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiting.cancel()
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            logger.info(f"Appel LLM plus lent que p{int(HEDGE_PERCENTILE * 100)} ({delay:.1f}s) : envoi d'une requête doublon.")
+            pending.add(asyncio.ensure_future(_timed(call, tracker, slot)))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if losers is not None:
+                        for loser in pending:
+                            # Erreur éventuelle du perdant lue à sa fin, sans la propager
+                            loser.add_done_callback(lambda task: task.cancelled() or task.exception())
+                        losers.update(pending)
+                        pending = set()
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def drain_losers(losers: Set[asyncio.Future], timeout: float = HEDGE_LOSER_TIMEOUT_SECONDS) -> int:
+    """Attend la fin des appels perdants de hedged_call ; ceux encore en cours après `timeout`
+    sont annulés. Retourne le nombre d'appels annulés (consommation inconnue)."""
+    if not losers:
+        return 0
+    _, pending = await asyncio.wait(set(losers), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    losers.clear()
+    return len(pending)
@@ -0,0 +1,193 @@
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter, deque
+from pathlib import Path
+from typing import Optional
+
+from sqlite_store import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Mode diagnostic (DIAGNOSTICS_ENABLED=1), désactivé par défaut :
+# - un thread de surveillance poste régulièrement un rappel dans la boucle d'événements ; s'il
+#   n'est pas exécuté après SLOW_CALLBACK_MS, la boucle est bloquée par du code synchrone et la
+#   pile du thread de la boucle est échantillonnée jusqu'au déblocage. La pile la plus fréquente
+#   et la fonction applicative en cause sont journalisées ;
+# - une requête envoyée avec les en-têtes `X-Profile: 1` et `X-Admin-Token` est profilée avec
+#   cProfile ; le profil est enregistré dans DATA_DIR/profiles et consultable par /admin/profiles.
+#   cProfile ne voit que le thread de la boucle : les autres requêtes traitées en même temps y
+#   apparaissent, le travail délégué aux threads (extraction, MinIO, SQLite) n'y apparaît pas.
+DIAGNOSTICS_ENABLED = os.getenv("DIAGNOSTICS_ENABLED") == "1"
+SLOW_CALLBACK_MS = float(os.getenv("SLOW_CALLBACK_MS", "100"))
+STACK_SAMPLE_INTERVAL_MS = float(os.getenv("STACK_SAMPLE_INTERVAL_MS", "5"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+PROFILES_DIR = Path(DATA_DIR) / "profiles"
+MAX_PROFILES = 50
+MAX_STACK_DEPTH = 25
+BACKEND_DIR = str(Path(__file__).resolve().parent)
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(DIAGNOSTICS_ENABLED and ADMIN_TOKEN and token and secrets.compare_digest(token, ADMIN_TOKEN))
+
+
+def _stack_key(frame):
+    key = []
+    while frame is not None:
+        key.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    return tuple(key)
+
+
+def _is_application_frame(filename: str) -> bool:
+    return filename.startswith(BACKEND_DIR) and "site-packages" not in filename and filename != __file__
+
+
+class LoopWatchdog(threading.Thread):
+    def __init__(self, loop, threshold_ms: float = SLOW_CALLBACK_MS, sample_interval_ms: float = STACK_SAMPLE_INTERVAL_MS):
+        super().__init__(name="loop-watchdog", daemon=True)
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.threshold = threshold_ms / 1000
+        self.sample_interval = sample_interval_ms / 1000
+        self.stalls = deque(maxlen=100)
+
+    def run(self):
+        while not self.loop.is_closed():
+            answered = threading.Event()
+            posted = time.monotonic()
+            try:
+                self.loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                return  # boucle fermée
+            if answered.wait(self.threshold):
+                time.sleep(self.threshold)
+                continue
+
+            samples = Counter()
+            while not answered.wait(self.sample_interval):
+                frame = sys._current_frames().get(self.loop_thread_id)
+                if frame is not None:
+                    samples[_stack_key(frame)] += 1
+            self.report(time.monotonic() - posted, samples)
+
+    def report(self, duration: float, samples: Counter):
+        if not samples:
+            return
+        stack, count = samples.most_common(1)[0]
+        culprit = next(((f, line, name) for f, line, name in stack if _is_application_frame(f)), stack[0])
+        # Frames les plus internes, plus la frame applicative si elle est au-delà
+        shown = stack[:MAX_STACK_DEPTH]
+        if culprit not in shown:
+            shown = shown + (culprit,)
+        summary = traceback.StackSummary.from_list(
+            [(filename, line, name, None) for filename, line, name in reversed(shown)]
+        )
+        stall = {
+            "at": time.time(),
+            "duration_ms": round(duration * 1000, 1),
+            "function": f"{culprit[2]} ({os.path.relpath(culprit[0], BACKEND_DIR)}:{culprit[1]})",
+            "samples": sum(samples.values()),
+            "stack": summary.format(),
+        }
+        self.stalls.append(stall)
+        logger.warning(
+            f"Boucle d'événements bloquée {stall['duration_ms']} ms par {stall['function']} "
+            f"({count}/{stall['samples']} échantillons) :\n{''.join(stall['stack'])}"
+        )
+
+
+watchdog: Optional[LoopWatchdog] = None
+_profiling = threading.Lock()
+
+
+def start(loop):
+    global watchdog
+    if DIAGNOSTICS_ENABLED and watchdog is None:
+        watchdog = LoopWatchdog(loop)
+        watchdog.start()
+        logger.info(f"Mode diagnostic actif : blocages de la boucle signalés au-delà de {SLOW_CALLBACK_MS:.0f} ms")
+
+
+def recent_stalls():
+    return list(watchdog.stalls) if watchdog is not None else []
+
+
+def _prune_profiles():
+    profiles = sorted(PROFILES_DIR.glob("*.prof"), key=lambda path: path.stat().st_mtime)
+    for path in profiles[:-MAX_PROFILES]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".json").unlink(missing_ok=True)
+
+
+def _save_profile(profiler: cProfile.Profile, profile_id: str, metadata: dict):
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(PROFILES_DIR / f"{profile_id}.prof")
+    (PROFILES_DIR / f"{profile_id}.json").write_text(json.dumps(metadata))
+    _prune_profiles()
+
+
+async def profile_middleware(request, call_next):
+    if request.headers.get("x-profile") != "1" or not is_admin(request.headers.get("x-admin-token")):
+        return await call_next(request)
+    # Un seul profil à la fois par worker : cProfile ne peut pas être imbriqué
+    if not _profiling.acquire(blocking=False):
+        logger.warning("Profil déjà en cours dans ce worker, requête non profilée")
+        return await call_next(request)
+
+    profile_id = uuid.uuid4().hex
+    profiler = cProfile.Profile()
+    start_time = time.monotonic()
+    try:
+        profiler.enable()
+        response = await call_next(request)
+    finally:
+        profiler.disable()
+        _profiling.release()
+
+    # Écriture du profil et purge des anciens hors de la boucle d'événements
+    await asyncio.to_thread(_save_profile, profiler, profile_id, {
+        "id": profile_id,
+        "method": request.method,
+        "path": request.url.path,
+        "status": response.status_code,
+        "duration_ms": round((time.monotonic() - start_time) * 1000, 1),
+        "pid": os.getpid(),
+        "at": time.time(),
+    })
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def list_profiles():
+    profiles = []
+    for path in sorted(PROFILES_DIR.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    path = PROFILES_DIR / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+def format_profile(path: Path, sort: str = "cumulative", limit: int = 50) -> str:
+    output = io.StringIO()
+    stats = pstats.Stats(str(path), stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
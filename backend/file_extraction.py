@@ -1,7 +1,6 @@
 import zipfile
-import pdfplumber
-import openpyxl
-import docx
+import hashlib
+import os
 from io import BytesIO
 from fastapi import FastAPI, File, UploadFile
 
@@ -9,6 +8,8 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+FILE_TYPES_BY_EXTENSION = {".xlsx": "excel", ".pdf": "pdf", ".docx": "docx"}
+
 def extract_files_from_zip(zip_content: BytesIO):
     processed_files = []
     missing_info_files = []
@@ -18,35 +19,29 @@ def extract_files_from_zip(zip_content: BytesIO):
         file_list = z.namelist()
 
         for file_name in file_list:
-            if (
-                file_name.endswith('/') or  # directories
-                "__MACOSX" in file_name or  # Mac system files
-                file_name.startswith('.') or  # hidden files (e.g., .DS_Store)
-                file_name.startswith('._') or  # Mac resource fork files
-                file_name.startswith('~$') or   # temporary Office files
-                file_name.endswith('.DS_Store')  # Specific .DS_Store files
-            ):
+            if is_unwanted_member(file_name):
                 logger.info(f"Skipping directory or unwanted file: {file_name}")
                 continue
 
             with z.open(file_name) as extracted_file:
                 file_data = extracted_file.read()
+                file_hash = hashlib.sha256(file_data).hexdigest()
 
                 if file_name.lower().endswith('.xlsx'):
                     try:
                         # Pass the file data for later processing
-                        processed_files.append({"filename": file_name, "content": file_data, "type": "excel"})
+                        processed_files.append({"filename": file_name, "content": file_data, "type": "excel", "sha256": file_hash})
                     except Exception as e:
                         logger.error(f"Invalid .xlsx file '{file_name}': {str(e)}")
                         continue
 
                 elif file_name.lower().endswith('.pdf'):
                     # Process the PDF files directly
-                    processed_files.append({"filename": file_name, "content": file_data, "type": "pdf"})
+                    processed_files.append({"filename": file_name, "content": file_data, "type": "pdf", "sha256": file_hash})
 
                 elif file_name.lower().endswith('.docx'):
                     # Process .docx files
-                    processed_files.append({"filename": file_name, "content": file_data, "type": "docx"})
+                    processed_files.append({"filename": file_name, "content": file_data, "type": "docx", "sha256": file_hash})
 
                 else:
                     logger.info(f"Unrecognized file type: {file_name}")
@@ -59,6 +54,38 @@ def extract_files_from_zip(zip_content: BytesIO):
 
     return processed_files, missing_info_files, unrecognized_files
 
+def is_unwanted_member(file_name: str) -> bool:
+    return (
+        file_name.endswith('/') or  # directories
+        "__MACOSX" in file_name or  # Mac system files
+        file_name.startswith('.') or  # hidden files (e.g., .DS_Store)
+        file_name.startswith('._') or  # Mac resource fork files
+        file_name.startswith('~$') or   # temporary Office files
+        file_name.endswith('.DS_Store')  # Specific .DS_Store files
+    )
+
+def iter_files_from_zip(z: zipfile.ZipFile, skip=None):
+    """Variante paresseuse de extract_files_from_zip : lit et retourne les fichiers un par un,
+    sans charger le contenu des fichiers non supportés. `skip(zip_info)` permet d'écarter un
+    fichier avant de le lire (par exemple un fichier inchangé depuis la dernière analyse)."""
+    for info in z.infolist():
+        file_name = info.filename
+        if is_unwanted_member(file_name):
+            logger.info(f"Skipping directory or unwanted file: {file_name}")
+            continue
+
+        file_type = FILE_TYPES_BY_EXTENSION.get(os.path.splitext(file_name.lower())[1])
+        if file_type is None:
+            logger.info(f"Unrecognized file type: {file_name}")
+            continue
+        if skip is not None and skip(info):
+            continue
+
+        with z.open(info) as extracted_file:
+            file_data = extracted_file.read()
+        yield {"filename": file_name, "content": file_data, "type": file_type,
+               "sha256": hashlib.sha256(file_data).hexdigest(), "crc32": info.CRC, "size": info.file_size}
+
 def extract_text_from_file(file):
     file_type = file.get("type")
     file_content = file.get("content")
@@ -74,6 +101,8 @@ def extract_text_from_file(file):
         return ""
 
 def extract_text_from_excel(excel_content: bytes) -> str:
+    import openpyxl  # import différé : coûteux, inutile au démarrage
+
     text = ""
     try:
         workbook = openpyxl.load_workbook(BytesIO(excel_content))
@@ -88,6 +117,8 @@ def extract_text_from_excel(excel_content: bytes) -> str:
     return text
 
 def extract_text_from_pdf(pdf_content):
+    import pdfplumber  # import différé : coûteux, inutile au démarrage
+
     text = ""
     with pdfplumber.open(BytesIO(pdf_content)) as pdf:
         for page in pdf.pages:
@@ -95,7 +126,8 @@ def extract_text_from_pdf(pdf_content):
     return text
 
 def extract_text_from_word(word_content: bytes) -> str:
-    print("word")
+    import docx  # import différé : coûteux, inutile au démarrage
+
     text = ""
     try:
         doc = docx.Document(BytesIO(word_content))
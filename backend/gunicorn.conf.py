@@ -0,0 +1,45 @@
+# Configuration du service en multi-workers : gunicorn gère les processus, uvicorn sert l'ASGI.
+#
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# Avec preload_app, l'application est importée une fois dans le processus maître puis partagée
+# par fork (copie à l'écriture) : les workers démarrent sans ré-importer le code.
+#
+# État par processus et partage entre workers :
+# - SQLite (DATA_DIR), partagé par les workers du conteneur : RequestLimiter, index de recherche,
+#   consommation cumulée (usage.sqlite), points de reprise des chunks, profils de diagnostic ;
+# - manifestes d'appels d'offres, rapports et dépôts directs : MinIO, partagés entre workers
+#   et conteneurs ;
+# - FileAnalyzerRegistry, gabarits de rapport, schémas réduits (lru_cache) : caches sans état,
+#   sûrs par worker ;
+# - routeur de modèles (LLMRouter) et ses fournisseurs, clients S3 et pool de rendu des rapports
+#   (REPORT_WORKERS processus) : créés au premier usage dans chaque worker, jamais dans le maître,
+#   pour ne pas être partagés par fork. Les statistiques du routeur (latence, erreurs, scores)
+#   et les latences qui déclenchent les requêtes doublons (deadline.llm_latency) sont propres
+#   à chaque worker : chacun apprend de ses propres appels ;
+# - planificateur des appels au modèle (llm_scheduler.scheduler) : par worker, LLM_MAX_CONCURRENCY
+#   places par worker (jusqu'à workers x LLM_MAX_CONCURRENCY appels simultanés par conteneur).
+#   L'équité entre appels d'offres ne vaut qu'au sein d'un worker : deux analyses servies par
+#   des workers différents ne se partagent pas de crédit ;
+# - consommation d'une analyse (UsageRecorder) : gardée en mémoire par le worker qui traite la
+#   requête, puis ajoutée à usage.sqlite en fin d'analyse ;
+# - mesures d'exécution (/metrics/runtime) et détecteur de blocages : par worker, chaque réponse
+#   indique son pid.
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+keepalive = 300
+timeout = int(os.getenv("WORKER_TIMEOUT", "300"))
+graceful_timeout = 30
+
+
+def on_starting(server):
+    # Optionnel : importer les parseurs dans le maître pour que les workers partagent leurs pages
+    # mémoire, au prix d'un démarrage plus long
+    if os.getenv("PRELOAD_PARSERS") == "1":
+        import docx  # noqa: F401
+        import openpyxl  # noqa: F401
+        import pdfplumber  # noqa: F401
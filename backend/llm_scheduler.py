@@ -0,0 +1,168 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable
+
+# Ordonnancement des appels au modèle d'un worker entre les analyses en cours : une file par
+# appel d'offres (ou par client), servies en deficit round-robin. À chaque passage, une file
+# reçoit LLM_SCHEDULER_QUANTUM x poids tokens de crédit et envoie ses appels tant que leur
+# coût estimé (tokens du prompt) reste couvert : chaque file obtient une part du débit
+# proportionnelle à son poids, quel que soit le nombre d'appels qu'elle a en attente.
+# Une file qui a soumis moins de SMALL_JOB_TOKENS tokens a un poids multiplié par
+# SMALL_JOB_BOOST : les petites analyses passent devant les gros DCE déjà entamés.
+# Le planificateur est propre à chaque worker (gunicorn.conf.py) : la limite de concurrence et
+# l'équité entre files ne valent qu'entre les requêtes d'un même worker.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_SCHEDULER_QUANTUM = int(os.getenv("LLM_SCHEDULER_QUANTUM", "2000"))
+SMALL_JOB_TOKENS = int(os.getenv("LLM_SMALL_JOB_TOKENS", "20000"))
+SMALL_JOB_BOOST = float(os.getenv("LLM_SMALL_JOB_BOOST", "4"))
+# Durée de conservation des mesures d'une file vide
+IDLE_QUEUE_SECONDS = 300
+
+
+class TenantQueue:
+    def __init__(self, key: Hashable, weight: float):
+        self.key = key
+        self.weight = weight
+        self.waiting = deque()
+        self.deficit = 0.0
+        # Tour de passage en cours : le quantum est crédité au début du tour
+        self.in_turn = False
+        self.running = 0
+        self.served = 0
+        self.submitted_cost = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_active = time.monotonic()
+
+    @property
+    def effective_weight(self) -> float:
+        return self.weight * (SMALL_JOB_BOOST if self.submitted_cost < SMALL_JOB_TOKENS else 1)
+
+
+class FairScheduler:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, quantum: int = LLM_SCHEDULER_QUANTUM):
+        self.max_concurrency = max_concurrency
+        self.quantum = quantum
+        self.running = 0
+        self.queues: Dict[Hashable, TenantQueue] = {}
+        # Files ayant des appels en attente, dans l'ordre de passage
+        self.active = deque()
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable, cost: int, weight: float = 1.0):
+        """Attend le tour de la file `key` pour un appel de coût estimé `cost` (tokens), puis
+        occupe une des LLM_MAX_CONCURRENCY places jusqu'à la fin du bloc."""
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = TenantQueue(key, weight)
+        queue.weight = weight
+        queue.submitted_cost += cost
+        queue.last_active = time.monotonic()
+
+        entry = (asyncio.get_running_loop().create_future(), max(1, cost), time.monotonic())
+        queue.waiting.append(entry)
+        if key not in self.active:
+            self.active.append(key)
+        self._dispatch()
+
+        try:
+            await entry[0]
+        except asyncio.CancelledError:
+            # Task.cancel() annule aussitôt le future d'attente : s'il n'est plus dans la file,
+            # _dispatch l'a retiré, soit en lui attribuant une place (résultat posé), soit en
+            # l'écartant parce qu'il était déjà annulé
+            if entry in queue.waiting:
+                queue.waiting.remove(entry)
+                if not queue.waiting and key in self.active:
+                    self.active.remove(key)
+                    self._reset(queue)
+            elif not entry[0].cancelled():
+                # Place attribuée au moment de l'annulation : elle est rendue
+                self._release(queue)
+            raise
+        try:
+            yield
+        finally:
+            self._release(queue)
+
+    def _release(self, queue: TenantQueue):
+        self.running -= 1
+        queue.running -= 1
+        queue.last_active = time.monotonic()
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.running < self.max_concurrency and self.active:
+            queue = self.queues[self.active[0]]
+            future, cost, queued_at = queue.waiting[0]
+            if future.done():
+                # Attente annulée avant son tour : retirée sans consommer de crédit
+                self._pop_waiting(queue)
+                continue
+            if not queue.in_turn:
+                queue.in_turn = True
+                queue.deficit += self.quantum * queue.effective_weight
+            if queue.deficit < cost:
+                # Crédit épuisé : fin du tour, la file suivante prend la main
+                queue.in_turn = False
+                self.active.rotate(-1)
+                continue
+            queue.deficit -= cost
+            self._pop_waiting(queue)
+            waited = time.monotonic() - queued_at
+            queue.total_wait += waited
+            queue.max_wait = max(queue.max_wait, waited)
+            queue.served += 1
+            queue.running += 1
+            self.running += 1
+            future.set_result(None)
+        self._forget_idle_queues()
+
+    def _pop_waiting(self, queue: TenantQueue):
+        queue.waiting.popleft()
+        if not queue.waiting:
+            self.active.popleft()
+            self._reset(queue)
+
+    @staticmethod
+    def _reset(queue: TenantQueue):
+        # Une file vide ne garde pas de crédit (DRR)
+        queue.deficit = 0.0
+        queue.in_turn = False
+
+    def _forget_idle_queues(self):
+        now = time.monotonic()
+        for key in [
+            key for key, queue in self.queues.items()
+            if not queue.waiting and not queue.running and now - queue.last_active > IDLE_QUEUE_SECONDS
+        ]:
+            del self.queues[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "queued": sum(len(queue.waiting) for queue in self.queues.values()),
+            "queues": [
+                {
+                    "key": str(queue.key),
+                    "weight": queue.weight,
+                    "effective_weight": queue.effective_weight,
+                    "queued": len(queue.waiting),
+                    "queued_tokens": sum(cost for _, cost, _ in queue.waiting),
+                    "running": queue.running,
+                    "served": queue.served,
+                    "submitted_tokens": queue.submitted_cost,
+                    "mean_wait_seconds": round(queue.total_wait / queue.served, 3) if queue.served else None,
+                    "max_wait_seconds": round(queue.max_wait, 3),
+                }
+                for queue in self.queues.values()
+            ],
+        }
+
+
+# Planificateur partagé par les requêtes du worker
+scheduler = FairScheduler()
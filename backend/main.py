@@ -1,16 +1,33 @@
 import logging
 import asyncio
 import os
+import re
+import uuid
+import zipfile
+
+import orjson
 from io import BytesIO
-from openai import AsyncOpenAI
-from fastapi import FastAPI, File, UploadFile,HTTPException,BackgroundTasks,WebSocket
+from typing import Optional
+from fastapi import FastAPI, File, Form, UploadFile,HTTPException,BackgroundTasks,WebSocket,Request,Header
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from file_extraction import extract_files_from_zip,extract_text_from_file, read_zip_file
-from analyze import analyze_processed_files,print_file
+from file_extraction import read_zip_file
+from ranged_object import open_remote_zip
+from analyze import print_file
+from pipeline import analyze_tender
+from report_rendering import CONTENT_TYPES, render_and_store_report
+from tender_manifest import load_manifest
+from search_index import search
+from usage_accounting import UsageRecorder, tender_usage, usage_report
 from Enums.FileType import FileType
 from FileAnalyzerRegistry import FileAnalyzerRegistry
 from BaseFileAnalyzer import BaseFileAnalyzer
+from sqlite_store import connect
+import runtime_metrics
+from llm_scheduler import scheduler
+import diagnostics
+from deadline import ANALYSIS_DEADLINE_SECONDS, Deadline
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -29,8 +46,73 @@ app.add_middleware(
 
 load_dotenv()
 
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-FileAnalyzerRegistry.initialize_registry()
+_client = None
+
+
+def get_client():
+    """Routeur entre fournisseurs de modèles (LLM_PROVIDERS), créé au premier appel dans chaque
+    worker : l'import des SDK est coûteux au démarrage."""
+    global _client
+    if _client is None:
+        from LLMRouter import LLMRouter
+        _client = LLMRouter.from_env()
+    return _client
+
+
+TENDER_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Dépôts directs dans MinIO (formulaire présigné POST, taille bornée par la politique signée).
+# L'archive est supprimée après son analyse ou son refus ; les dépôts jamais analysés sont
+# supprimés par une règle de cycle de vie après UPLOAD_RETENTION_DAYS jours.
+UPLOAD_BUCKET = os.getenv("MINIO_BUCKET_NAME", "gonogo")
+UPLOAD_PREFIX = "uploads/"
+UPLOAD_KEY_PATTERN = re.compile(r"uploads/[0-9a-f]{32}\.zip")
+UPLOAD_URL_EXPIRATION = 900
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(200 * 1024 * 1024)))
+UPLOAD_RETENTION_DAYS = int(os.getenv("UPLOAD_RETENTION_DAYS", "1"))
+_upload_bucket_ready = False
+
+
+def warm_up():
+    # Imports différés (SDK des fournisseurs de modèles, boto3, analyseurs) faits dans un thread au démarrage du worker,
+    # plutôt que dans la boucle d'événements lors de la première requête
+    import s3_config  # noqa: F401
+
+    get_client()
+    FileAnalyzerRegistry.initialize_registry()
+
+
+@app.on_event("startup")
+async def start_runtime_metrics():
+    runtime_metrics.loop_lag.start()
+    diagnostics.start(asyncio.get_running_loop())
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+
+
+if diagnostics.DIAGNOSTICS_ENABLED:
+    app.middleware("http")(diagnostics.profile_middleware)
+
+
+@app.middleware("http")
+async def count_inflight_requests(request: Request, call_next):
+    if request.url.path == "/metrics/runtime":
+        return await call_next(request)
+    runtime_metrics.inflight_requests += 1
+    try:
+        return await call_next(request)
+    finally:
+        runtime_metrics.inflight_requests -= 1
+
+
+@app.get("/metrics/runtime")
+async def get_runtime_metrics():
+    """Mesures du worker qui répond (RSS, retard de la boucle d'événements, requêtes en cours, fournisseurs de modèles,
+    files d'appels au modèle par appel d'offres ou client)."""
+    return {
+        **runtime_metrics.snapshot(),
+        "llm_providers": _client.snapshot() if _client is not None else [],
+        "llm_scheduler": scheduler.snapshot(),
+    }
 
 
 @app.websocket("/ws/timer")
@@ -57,7 +139,7 @@ async def long_request():
 
 def long_running_task(duration: int):
     asyncio.run(asyncio.sleep(duration))
-    print("Tâche de longue durée terminée.")
+    logger.info("Tâche de longue durée terminée.")
 
 @app.get("/background-request")
 async def background_request(background_tasks: BackgroundTasks, duration: int = 120):
@@ -66,7 +148,22 @@ async def background_request(background_tasks: BackgroundTasks, duration: int =
     background_tasks.add_task(long_running_task, duration)
     return {"message": "Tâche de longue durée en cours d'exécution en arrière-plan."}
 @app.post("/read-file")
-async def match(zip_file: UploadFile = File(...)):
+async def match(zip_file: UploadFile = File(...), tender_id: Optional[str] = Form(None),
+                deadline_seconds: Optional[float] = Form(None, gt=0), stream: bool = Form(False),
+                client_id: Optional[str] = Form(None)):
+    # Budget de latence de la requête : au-delà, on retourne le résultat partiel déjà fusionné
+    deadline = Deadline(min(deadline_seconds or ANALYSIS_DEADLINE_SECONDS, ANALYSIS_DEADLINE_SECONDS))
+
+    # Identifiant de l'appel d'offres : permet de ne ré-analyser que les fichiers modifiés
+    # lors du dépôt d'un rectificatif
+    if tender_id is None:
+        tender_id = uuid.uuid4().hex
+    elif not TENDER_ID_PATTERN.fullmatch(tender_id):
+        raise HTTPException(status_code=400, detail="Identifiant d'appel d'offres invalide.")
+    # Client facturé : la consommation des appels au modèle est cumulée par client
+    if client_id is not None and not TENDER_ID_PATTERN.fullmatch(client_id):
+        raise HTTPException(status_code=400, detail="Identifiant de client invalide.")
+
     file_size = await zip_file.read()
     if len(file_size) > 10 * 1024 * 1024:
         raise HTTPException(
@@ -76,7 +173,7 @@ async def match(zip_file: UploadFile = File(...)):
 
     # Vérification 2: Limite de requêtes par semaine
     try:
-        RequestLimiter.check_and_increment()
+        await asyncio.to_thread(RequestLimiter.check_and_increment)
     except HTTPException as e:
         logger.warning(f"Trop de requêtes: {e.detail}")
         raise e
@@ -92,39 +189,301 @@ async def match(zip_file: UploadFile = File(...)):
 
     logger.info(f"Received file: {zip_file.filename}")
 
-    # Lire le contenu du fichier ZIP
-    processed_files, missing_info_files, unrecognized_files = extract_files_from_zip(zip_content)
+    try:
+        z = zipfile.ZipFile(zip_content)
+    except zipfile.BadZipFile:
+        raise HTTPException(
+            status_code=400, detail="Le fichier fourni n'est pas un fichier ZIP valide."
+        )
+
+    if stream:
+        return stream_analysis(lambda on_item: run_analysis(tender_id, z, deadline, client_id, on_item))
+    return ORJSONResponse(await run_analysis(tender_id, z, deadline, client_id))
 
-    final_results = await analyze_processed_files(client,processed_files)
-    print("final_results")
-    print(final_results)
-    final_results = print_file(final_results)
+
+async def run_analysis(tender_id: str, z: zipfile.ZipFile, deadline: Deadline, client_id: Optional[str] = None,
+                       on_item=None):
+    usage = UsageRecorder(tender_id, client_id)
+    # Les fichiers de l'archive sont lus un par un au fil de l'analyse
+    with z:
+        # Une file d'appels au modèle par client (par appel d'offres sans client) : un gros DCE
+        # ne retarde pas les analyses des autres
+        final_results, changes = await analyze_tender(
+            get_client(), tender_id, z, deadline, on_item, usage, queue_key=client_id or tender_id
+        )
+    logger.debug(f"final_results : {final_results}")
+    # Réponse faite de types simples (chaînes, nombres, listes, dictionnaires) : sérialisée
+    # directement par orjson, sans passer par jsonable_encoder
+    return {
+        "final_results": print_file(final_results),
+        "tender_id": tender_id,
+        "changes": changes,
+        "usage": usage.summary(),
+    }
+
+
+def stream_analysis(analysis):
+    """Réponse NDJSON : un événement {"type": "item", "file", "field", "value"} par élément extrait,
+    dès sa génération par le modèle, puis {"type": "result", ...} (même contenu que la réponse
+    sans streaming), ou {"type": "error", "detail"}. Tout passe par la connexion de la requête :
+    pas d'état partagé entre workers."""
+    events = asyncio.Queue()
+
+    def on_item(file_name, field, value):
+        events.put_nowait({"type": "item", "file": file_name, "field": field, "value": value})
+
+    async def body():
+        task = asyncio.create_task(analysis(on_item))
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                yield orjson.dumps(event) + b"\n"
+            try:
+                event = {"type": "result", **task.result()}
+            except Exception as e:
+                logger.error(f"Erreur lors de l'analyse en streaming: {e}")
+                event = {"type": "error", "detail": "Erreur lors de l'analyse."}
+            yield orjson.dumps(event) + b"\n"
+        finally:
+            # Client déconnecté : l'analyse en cours est abandonnée
+            task.cancel()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+def prepare_upload_bucket():
+    from s3_config import ensure_bucket, ensure_expiration_rule
+
+    global _upload_bucket_ready
+    if _upload_bucket_ready:
+        return
+    ensure_bucket(UPLOAD_BUCKET)
+    try:
+        ensure_expiration_rule(UPLOAD_BUCKET, UPLOAD_PREFIX, UPLOAD_RETENTION_DAYS)
+    except Exception as e:
+        # Les archives analysées ou refusées restent supprimées par /analyze-upload
+        logger.warning(f"Règle d'expiration des dépôts non appliquée : {e}")
+    _upload_bucket_ready = True
+
+
+async def discard_upload(object_key: str):
+    from s3_config import delete_object
+
+    await asyncio.to_thread(delete_object, UPLOAD_BUCKET, object_key)
+
+
+@app.post("/uploads")
+async def create_upload():
+    """Retourne un formulaire présigné (URL et champs à envoyer avec le fichier, en dernier) pour
+    déposer l'archive directement dans MinIO, sans passer par l'API ; MinIO refuse un fichier
+    de plus de MAX_UPLOAD_SIZE octets."""
+    from s3_config import generate_presigned_post
+
+    object_key = f"{UPLOAD_PREFIX}{uuid.uuid4().hex}.zip"
+    await asyncio.to_thread(prepare_upload_bucket)
+    form = await asyncio.to_thread(
+        generate_presigned_post, UPLOAD_BUCKET, object_key, MAX_UPLOAD_SIZE, "application/zip", UPLOAD_URL_EXPIRATION
+    )
+    if form is None:
+        raise HTTPException(status_code=500, detail="Erreur lors de la génération de l'URL de dépôt.")
     return {
-        "results": final_results,
-        "final_results": final_results
+        "object_key": object_key,
+        "url": form["url"],
+        "fields": form["fields"],
+        "max_size": MAX_UPLOAD_SIZE,
+        "expires_in": UPLOAD_URL_EXPIRATION,
     }
 
 
+@app.post("/analyze-upload")
+async def analyze_upload(object_key: str = Form(...), tender_id: Optional[str] = Form(None),
+                         deadline_seconds: Optional[float] = Form(None, gt=0), stream: bool = Form(False),
+                         client_id: Optional[str] = Form(None)):
+    """Analyse une archive déposée dans MinIO : seuls le répertoire central et les fichiers analysés sont lus.
+    L'archive est supprimée une fois analysée ou refusée."""
+    from s3_config import get_object_info
+
+    if not UPLOAD_KEY_PATTERN.fullmatch(object_key):
+        raise HTTPException(status_code=400, detail="Référence de dépôt invalide.")
+
+    deadline = Deadline(min(deadline_seconds or ANALYSIS_DEADLINE_SECONDS, ANALYSIS_DEADLINE_SECONDS))
+    try:
+        if tender_id is None:
+            tender_id = uuid.uuid4().hex
+        elif not TENDER_ID_PATTERN.fullmatch(tender_id):
+            raise HTTPException(status_code=400, detail="Identifiant d'appel d'offres invalide.")
+        # Client facturé : la consommation des appels au modèle est cumulée par client
+        if client_id is not None and not TENDER_ID_PATTERN.fullmatch(client_id):
+            raise HTTPException(status_code=400, detail="Identifiant de client invalide.")
+
+        info = await asyncio.to_thread(get_object_info, UPLOAD_BUCKET, object_key)
+        if info is None:
+            raise HTTPException(status_code=404, detail="Archive introuvable.")
+        size = info["size"]
+        if size > MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=400, detail=f"Le fichier dépasse la taille maximale autorisée de {MAX_UPLOAD_SIZE // (1024 * 1024)} Mo."
+            )
+
+        try:
+            await asyncio.to_thread(RequestLimiter.check_and_increment)
+        except HTTPException as e:
+            logger.warning(f"Trop de requêtes: {e.detail}")
+            raise e
+
+        # Ouverture et lecture du répertoire central par requêtes Range, hors de la boucle d'événements
+        try:
+            reader, z = await asyncio.to_thread(open_remote_zip, UPLOAD_BUCKET, object_key, size, info["etag"])
+        except zipfile.BadZipFile:
+            raise HTTPException(
+                status_code=400, detail="Le fichier fourni n'est pas un fichier ZIP valide."
+            )
+    except HTTPException:
+        await discard_upload(object_key)
+        raise
+
+    logger.info(f"Analyse de l'archive déposée {object_key} ({size} octets)")
+
+    async def analysis(on_item=None):
+        try:
+            response = await run_analysis(tender_id, z, deadline, client_id, on_item)
+        finally:
+            await discard_upload(object_key)
+        logger.info(f"{object_key} : {reader.bytes_fetched} octets lus en {reader.requests} requête(s)")
+        return response
+
+    if stream:
+        return stream_analysis(analysis)
+    return ORJSONResponse(await analysis())
+
+
+@app.get("/tenders/{tender_id}/report")
+async def tender_report(tender_id: str, format: str = "pdf"):
+    if not TENDER_ID_PATTERN.fullmatch(tender_id):
+        raise HTTPException(status_code=400, detail="Identifiant d'appel d'offres invalide.")
+    if format not in CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Format de rapport non supporté (pdf ou docx).")
+
+    manifest = await load_manifest(tender_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Appel d'offres introuvable.")
+
+    url = await render_and_store_report(tender_id, manifest["version"], manifest["merged"], format)
+    if url is None:
+        raise HTTPException(status_code=500, detail="Erreur lors de la génération du rapport.")
+    return {"tender_id": tender_id, "format": format, "url": url}
+
+
+@app.get("/tenders/{tender_id}/usage")
+async def tender_usage_report(tender_id: str):
+    """Consommation cumulée des analyses d'un appel d'offres (tokens, coût, coût par page)."""
+    if not TENDER_ID_PATTERN.fullmatch(tender_id):
+        raise HTTPException(status_code=400, detail="Identifiant d'appel d'offres invalide.")
+    usage = await asyncio.to_thread(tender_usage, tender_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail="Appel d'offres introuvable.")
+    return usage
+
+
+@app.get("/search")
+async def search_tenders(q: str, field: Optional[str] = None, tender_id: Optional[str] = None, limit: int = 20):
+    """Recherche dans les analyses passées, par champ (penalites, formule_revision, ...) ou dans le texte des documents (field=texte)."""
+    if not 1 <= limit <= 200:
+        raise HTTPException(status_code=400, detail="La limite doit être comprise entre 1 et 200.")
+    hits = await asyncio.to_thread(search, q, field, tender_id, limit)
+    return {"query": q, "field": field, "hits": hits}
+
+
+PROFILE_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def require_admin(token: Optional[str]):
+    # Les routes d'administration n'existent qu'en mode diagnostic, avec ADMIN_TOKEN défini
+    if not diagnostics.is_admin(token):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/admin/stalls")
+async def admin_stalls(x_admin_token: Optional[str] = Header(None)):
+    """Derniers blocages de la boucle d'événements détectés dans le worker qui répond."""
+    require_admin(x_admin_token)
+    return {"pid": os.getpid(), "stalls": diagnostics.recent_stalls()}
+
+
+@app.get("/admin/usage")
+async def admin_usage(client_id: Optional[str] = None, since: Optional[str] = None,
+                      x_admin_token: Optional[str] = Header(None)):
+    """Rapport de consommation : coût par page et tokens par analyseur, coût par client, appels d'offres hors budget."""
+    require_admin(x_admin_token)
+    if since is not None:
+        try:
+            since = datetime.fromisoformat(since).isoformat()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Date invalide (format ISO attendu).")
+    return await asyncio.to_thread(usage_report, client_id, since)
+
+
+@app.get("/admin/profiles")
+async def admin_profiles(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return {"profiles": await asyncio.to_thread(diagnostics.list_profiles)}
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def admin_profile(profile_id: str, sort: str = "cumulative", limit: int = 50, raw: bool = False,
+                        x_admin_token: Optional[str] = Header(None)):
+    """Profil d'une requête : texte pstats trié, ou fichier .prof brut (raw=true) pour snakeviz et consorts."""
+    require_admin(x_admin_token)
+    path = diagnostics.profile_path(profile_id) if PROFILE_ID_PATTERN.fullmatch(profile_id) else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable.")
+    if raw:
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    try:
+        return PlainTextResponse(await asyncio.to_thread(diagnostics.format_profile, path, sort, limit))
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Tri inconnu : {sort}")
 
 
 class RequestLimiter:
-    weekly_limit = 50
-    current_week_count = 0
-    last_reset = datetime.utcnow()
+    """Limite hebdomadaire de requêtes. Le compteur est stocké dans SQLite pour être partagé
+    par tous les workers du conteneur (un compteur en mémoire serait multiplié par leur nombre)."""
+    weekly_limit = int(os.getenv("WEEKLY_REQUEST_LIMIT", "50"))
+    db_name = "limiter.sqlite"
 
     @staticmethod
     def check_and_increment():
-        # Vérifie si la semaine est terminée pour réinitialiser le compteur
-        if datetime.utcnow() - RequestLimiter.last_reset > timedelta(weeks=1):
-            RequestLimiter.current_week_count = 0
-            RequestLimiter.last_reset = datetime.utcnow()
-        # Incrémente le compteur si le nombre de requêtes est inférieur à la limite
-        if RequestLimiter.current_week_count < RequestLimiter.weekly_limit:
-            RequestLimiter.current_week_count += 1
-        else:
-            raise HTTPException(
-                status_code=429, detail="Limite de requêtes hebdomadaire atteinte."
+        connection = connect(RequestLimiter.db_name)
+        try:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS request_limiter "
+                "(id INTEGER PRIMARY KEY CHECK (id = 1), current_week_count INTEGER, last_reset TEXT)"
+            )
+            # Verrou en écriture pour que la lecture et l'incrément soient atomiques entre workers
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT current_week_count, last_reset FROM request_limiter WHERE id = 1"
+            ).fetchone()
+            now = datetime.utcnow()
+            current_week_count, last_reset = (row[0], datetime.fromisoformat(row[1])) if row else (0, now)
+
+            # Vérifie si la semaine est terminée pour réinitialiser le compteur
+            if now - last_reset > timedelta(weeks=1):
+                current_week_count = 0
+                last_reset = now
+            # Incrémente le compteur si le nombre de requêtes est inférieur à la limite
+            if current_week_count >= RequestLimiter.weekly_limit:
+                connection.execute("ROLLBACK")
+                raise HTTPException(
+                    status_code=429, detail="Limite de requêtes hebdomadaire atteinte."
+                )
+            connection.execute(
+                "INSERT OR REPLACE INTO request_limiter (id, current_week_count, last_reset) VALUES (1, ?, ?)",
+                (current_week_count + 1, last_reset.isoformat()),
             )
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
 
 def test ():
 
@@ -0,0 +1,678 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from analysis_planner import (
+    ANALYSIS_STRATEGY,
+    PLANNER_DEADLINE_SHARE,
+    PLANNER_MAX_BUFFER_SECONDS,
+    PLANNER_MAX_BUFFER_TOKENS,
+    AnalysisPlan,
+    PlannedDocument,
+    Planner,
+    count_tokens,
+    document_for,
+)
+from analyze import (
+    UNRECOGNIZED_FILE,
+    PreparedAnalysis,
+    analyze_chunk,
+    analyze_documents,
+    merge_results,
+    prepare_analysis,
+    sections_for_fields,
+    split_text_into_chunks,
+)
+from chunk_checkpoints import (
+    OK,
+    REFUSED,
+    ChunkCheckpoints,
+    ChunkOutcome,
+    RetryPolicy,
+    ProviderCallError,
+    chunk_key,
+    provider_call,
+    run_checkpointed,
+    save_checkpoint,
+)
+from deadline import Deadline, drain_losers, hedged_call
+from file_extraction import extract_text_from_file, iter_files_from_zip
+from FileAnalyzerRegistry import FileAnalyzerRegistry
+from llm_scheduler import scheduler
+from search_index import index_document, index_tender
+from streaming_json import emit_fields
+from tender_manifest import classify_file, diff_fields, load_manifest, new_manifest, save_manifest
+from usage_accounting import UsageRecorder
+
+logger = logging.getLogger(__name__)
+
+# Pipeline d'analyse par étapes reliées par des files bornées :
+#   lecture des fichiers -> extraction du texte -> découpage en chunks -> appels LLM -> fusion
+# Chaque étape attend que la suivante ait de la place : la mémoire d'une requête dépend des
+# tailles de files, et plus de la taille du DCE. Le contenu brut d'un fichier est libéré dès
+# que son texte est extrait.
+MEMBER_QUEUE_SIZE = int(os.getenv("PIPELINE_MEMBER_QUEUE_SIZE", "2"))
+TEXT_QUEUE_SIZE = int(os.getenv("PIPELINE_TEXT_QUEUE_SIZE", "2"))
+CHUNK_QUEUE_SIZE = int(os.getenv("PIPELINE_CHUNK_QUEUE_SIZE", "16"))
+RESULT_QUEUE_SIZE = int(os.getenv("PIPELINE_RESULT_QUEUE_SIZE", "16"))
+EXTRACT_WORKERS = int(os.getenv("PIPELINE_EXTRACT_WORKERS", "2"))
+LLM_WORKERS = int(os.getenv("PIPELINE_LLM_WORKERS", "8"))
+# Réponses du modèle lues en streaming : les éléments générés alimentent le résultat partiel
+# (délai dépassé) et le canal on_item avant la fin de chaque appel
+LLM_STREAMING = os.getenv("PIPELINE_LLM_STREAMING", "1") == "1"
+
+# Marque la fin d'une file : chaque worker d'une étape en reçoit un
+DONE = object()
+
+
+@dataclass
+class FileState:
+    filename: str
+    name: str
+    info: Any = None
+    chunk_results: Dict[int, Optional[dict]] = field(default_factory=dict)
+    # Éléments déjà générés par les appels en cours, par index de chunk
+    streamed: Dict[int, Dict[str, list]] = field(default_factory=dict)
+    total_chunks: Optional[int] = None
+    # Chunks sans résultat après relances (erreur ou refus du modèle), par index
+    missing: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def complete(self) -> bool:
+        return self.total_chunks is not None and len(self.chunk_results) == self.total_chunks
+
+    def result(self) -> Dict[str, Any]:
+        if isinstance(self.info, str):
+            return {"filename": self.name, "info": self.info}
+        chunks = [self.chunk_results[index] for index in sorted(self.chunk_results)]
+        chunks += [self.streamed[index] for index in sorted(self.streamed) if index not in self.chunk_results]
+        result = {"filename": self.name, "info": (self.info or []) + [info for info in chunks if info is not None]}
+        if self.missing:
+            result["missing_chunks"] = [self.missing[index] for index in sorted(self.missing)]
+        return result
+
+
+@dataclass
+class ChunkJob:
+    state: FileState
+    index: int
+    prepared: Any
+    chunk: str
+    # Les requêtes doublons ne sont envoyées que pour les chunks, pas pour un document entier
+    hedge: bool = True
+
+
+@dataclass
+class GroupJob:
+    # Documents analysés en un seul appel : (état, analyse préparée, texte)
+    documents: List[Tuple[FileState, PreparedAnalysis, str]]
+
+
+class AnalysisPipeline:
+    def __init__(self, client, on_file_done: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 on_text: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                 deadline: Optional[Deadline] = None,
+                 on_item: Optional[Callable[[str, str, Any], None]] = None,
+                 usage: Optional[UsageRecorder] = None,
+                 queue_key: Optional[str] = None,
+                 strategy: str = ANALYSIS_STRATEGY,
+                 checkpoints: Optional[ChunkCheckpoints] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 stop_reading: Optional[threading.Event] = None):
+        self.client = client
+        # Issue de chaque chunk enregistrée au fil de l'analyse (chunk_checkpoints) ; un chunk en
+        # échec est relancé seul selon `retry_policy`
+        self.checkpoints = checkpoints
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Stratégie d'appels (analysis_planner) : les textes sont mis de côté jusqu'à la fin de
+        # l'extraction pour choisir entre appel unique, appels groupés et découpage en chunks,
+        # sauf en découpage imposé ou en streaming (premiers éléments au plus tôt). L'attente est
+        # bornée en tokens (PLANNER_MAX_BUFFER_TOKENS) et en durée (PLANNER_MAX_BUFFER_SECONDS,
+        # part du délai de la requête) ; un document trop long pour un appel est découpé aussitôt.
+        self.strategy = strategy
+        self.planning = strategy != "fanout" and on_item is None
+        self.buffered: List[Tuple[FileState, PreparedAnalysis, str]] = []
+        self.buffered_tokens = 0
+        self.buffered_since: Optional[float] = None
+        self.buffer_seconds = PLANNER_MAX_BUFFER_SECONDS
+        if deadline is not None:
+            self.buffer_seconds = min(self.buffer_seconds, deadline.seconds * PLANNER_DEADLINE_SHARE)
+        self.planner: Optional[Planner] = None
+        self.documents: Dict[str, PlannedDocument] = {}
+        self.plan: Optional[AnalysisPlan] = None
+        self.usage = usage
+        # Requêtes doublons perdantes laissées aller à leur terme pour compter leur consommation
+        self.hedge_losers: Set[asyncio.Future] = set()
+        # File du planificateur d'appels au modèle (llm_scheduler) : partagée par les analyses
+        # d'un même appel d'offres ou client
+        self.queue_key = queue_key or uuid.uuid4().hex
+        self.on_file_done = on_file_done
+        self.on_text = on_text
+        self.deadline = deadline
+        self.on_item = on_item
+        self.results: Dict[str, Dict[str, Any]] = {}
+        # Fichiers terminés avec des chunks manquants
+        self.incomplete: Dict[str, List[Dict[str, Any]]] = {}
+        # Fichiers dont le texte n'a pas pu être extrait, avec l'erreur
+        self.failed: Dict[str, str] = {}
+
+        # Suivi des fichiers en cours, pour rendre un résultat partiel si le délai est dépassé
+        self.pending: Dict[str, Optional[FileState]] = {}
+        self.partial_results: Dict[str, Dict[str, Any]] = {}
+        self.reading_done = False
+        self.timed_out = False
+        # Le thread de lecture ne peut pas être annulé : en fin d'analyse anticipée, l'itérable
+        # des fichiers est prié de s'arrêter (stop_reading) et la lecture en cours est attendue
+        self.stop_reading = stop_reading or threading.Event()
+        self.reader: Optional[asyncio.Future] = None
+
+        self.member_queue = asyncio.Queue(MEMBER_QUEUE_SIZE)
+        self.text_queue = asyncio.Queue(TEXT_QUEUE_SIZE)
+        self.chunk_queue = asyncio.Queue(CHUNK_QUEUE_SIZE)
+        self.result_queue = asyncio.Queue(RESULT_QUEUE_SIZE)
+
+    async def run(self, files: Iterable[dict]) -> Dict[str, Dict[str, Any]]:
+        """Analyse les fichiers fournis par l'itérable (lu hors de la boucle d'événements)
+        et retourne les résultats bruts indexés par nom de fichier."""
+        stages = [
+            asyncio.create_task(self._stage([self._read(iter(files))], self.member_queue, EXTRACT_WORKERS)),
+            asyncio.create_task(self._stage(
+                [self._extract() for _ in range(EXTRACT_WORKERS)], self.text_queue, 1
+            )),
+            asyncio.create_task(self._stage([self._chunk()], self.chunk_queue, LLM_WORKERS)),
+            asyncio.create_task(self._stage(
+                [self._call_llm() for _ in range(LLM_WORKERS)], self.result_queue, 1
+            )),
+            asyncio.create_task(self._merge()),
+        ]
+        try:
+            timeout = self.deadline.remaining() if self.deadline is not None else None
+            await asyncio.wait_for(asyncio.gather(*stages), timeout)
+        except asyncio.TimeoutError:
+            # wait_for a annulé les étapes : on garde ce qui a déjà été analysé
+            self.timed_out = True
+            await self._stop_reading()
+            self.partial_results = {
+                file_name: state.result()
+                for file_name, state in self.pending.items()
+                if state is not None
+            }
+            logger.warning(
+                f"Délai d'analyse dépassé : {len(self.pending)} fichier(s) incomplet(s), résultat partiel."
+            )
+        except BaseException:
+            self.stop_reading.set()
+            for stage in stages:
+                stage.cancel()
+            raise
+        return self.results
+
+    async def _stop_reading(self):
+        # Attendre la lecture en cours avant que l'appelant n'exploite les résultats et ne ferme l'archive
+        self.stop_reading.set()
+        if self.reader is not None and not self.reader.done():
+            await asyncio.wait([self.reader])
+
+    def field_status(self, fields) -> Dict[str, str]:
+        """Indique pour chaque champ si son contenu est complet ou partiel (délai dépassé
+        avant la fin de l'analyse d'un fichier susceptible de le renseigner, ou chunks de ce
+        fichier manquants après relances)."""
+        if self.timed_out and not self.reading_done:
+            # Des fichiers de l'archive n'ont pas encore été lus : aucun champ n'est garanti
+            return {field: "partial" for field in fields}
+
+        partial = set()
+        for file_name in list(self.incomplete) + (list(self.pending) if self.timed_out else []):
+            analyzer = FileAnalyzerRegistry.get_analyzer(file_name.lower())
+            if analyzer is not None:
+                partial.update(analyzer.get_response_model().model_fields)
+        return {field: "partial" if field in partial else "complete" for field in set(fields) | partial}
+
+    @staticmethod
+    async def _stage(workers, outbox: asyncio.Queue, downstream_workers: int):
+        await asyncio.gather(*workers)
+        for _ in range(downstream_workers):
+            await outbox.put(DONE)
+
+    async def _read(self, files):
+        while True:
+            # Lecture protégée de l'annulation : _stop_reading attend sa fin
+            self.reader = asyncio.ensure_future(asyncio.to_thread(next, files, None))
+            file = await asyncio.shield(self.reader)
+            if file is None:
+                self.reading_done = True
+                return
+            self.pending[file["filename"]] = None
+            await self.member_queue.put(file)
+
+    async def _extract(self):
+        while True:
+            file = await self.member_queue.get()
+            if file is DONE:
+                return
+            analyzer = FileAnalyzerRegistry.get_analyzer(file["filename"].lower())
+            tabular = None
+            try:
+                if file["type"] == "excel" and analyzer is not None:
+                    tabular = await asyncio.to_thread(analyzer.extract_tabular, file["content"])
+                if tabular is not None:
+                    # Tableau analysé localement : seul le texte libre reste à lire par le modèle
+                    file["tabular"] = tabular
+                    text = tabular.remarks
+                else:
+                    text = await asyncio.to_thread(extract_text_from_file, file)
+            except Exception as e:
+                # Fichier illisible (PDF corrompu, ...) : seul ce fichier est écarté, l'analyse continue
+                logger.error(f"Extraction du texte de '{file['filename']}' impossible: {e}")
+                self.failed[file["filename"]] = f"{type(e).__name__}: {e}"
+                self.pending.pop(file["filename"], None)
+                continue
+            finally:
+                # Le contenu brut n'est plus nécessaire une fois le texte extrait
+                file.pop("content", None)
+            if self.usage is not None and analyzer is not None:
+                self.usage.record_file(file["filename"], analyzer.name.name, text)
+            if self.on_text is not None:
+                await self.on_text(file["filename"], text)
+            await self.text_queue.put((file, text))
+
+    async def _chunk(self):
+        while True:
+            try:
+                item = await asyncio.wait_for(self.text_queue.get(), self._buffer_wait())
+            except asyncio.TimeoutError:
+                await self._stop_planning(f"Extraction plus longue que {self.buffer_seconds:g}s : analyse par chunks.")
+                continue
+            if item is DONE:
+                if self.buffered:
+                    await self._dispatch_plan()
+                return
+            file, text = item
+            state = FileState(filename=file["filename"], name=file["filename"].lower())
+            self.pending[state.filename] = state
+            total = 0
+
+            tabular = file.get("tabular")
+            analyzer = FileAnalyzerRegistry.get_analyzer(state.name) if text or tabular else None
+            if not text and tabular is None:
+                state.info = []
+            elif analyzer is None:
+                logger.info(f"No analyzer found for file '{state.name}'. Skipping.")
+                state.info = UNRECOGNIZED_FILE
+            else:
+                # Extraction par règles et découpage parcourent tout le texte : hors de la boucle
+                prepared = await asyncio.to_thread(prepare_analysis, analyzer, text, True, tabular)
+                state.info = [prepared.rule_fields] if prepared.rule_fields else []
+                if prepared.needs_llm and text and self.planning:
+                    if self.planner is None:
+                        self.planner = Planner.for_client(self.client, LLM_WORKERS)
+                    document = await asyncio.to_thread(
+                        document_for, state.filename, prepared.analyzer.name.name, prepared.prompt,
+                        len(prepared.response_model.model_fields), text,
+                    )
+                    if not self.planner.fits([document]):
+                        # Découpé quelle que soit la stratégie retenue : inutile d'attendre le plan
+                        await self._queue_chunks(state, prepared, text)
+                        continue
+                    self.documents[state.filename] = document
+                    self.buffered.append((state, prepared, text))
+                    self.buffered_tokens += document.tokens
+                    if self.buffered_since is None:
+                        self.buffered_since = asyncio.get_running_loop().time()
+                    if self.buffered_tokens > PLANNER_MAX_BUFFER_TOKENS:
+                        await self._stop_planning(f"Plus de {PLANNER_MAX_BUFFER_TOKENS} tokens : analyse par chunks.")
+                    continue
+                if prepared.needs_llm and text:
+                    await self._queue_chunks(state, prepared, text)
+                    continue
+
+            await self.result_queue.put((state, total))
+
+    def _buffer_wait(self) -> Optional[float]:
+        if not self.buffered:
+            return None
+        return max(0.0, self.buffered_since + self.buffer_seconds - asyncio.get_running_loop().time())
+
+    async def _stop_planning(self, reason: str):
+        logger.info(reason)
+        self.planning = False
+        buffered, self.buffered = self.buffered, []
+        for state, prepared, text in buffered:
+            await self._queue_chunks(state, prepared, text)
+
+    async def _queue_chunks(self, state: FileState, prepared: PreparedAnalysis, text: str):
+        total = 0
+        chunks = split_text_into_chunks(text)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            await self.chunk_queue.put(ChunkJob(state, total, prepared, chunk))
+            total += 1
+        # Le nombre de chunks n'est connu qu'une fois le découpage terminé
+        await self.result_queue.put((state, total))
+
+    async def _dispatch_plan(self):
+        documents = {
+            state.filename: (state, prepared, text) for state, prepared, text in self.buffered
+        }
+        self.buffered = []
+        self.plan = self.planner.plan([self.documents[name] for name in documents], self.strategy)
+        logger.info(
+            f"Stratégie d'analyse '{self.plan.strategy}' pour {len(documents)} document(s) : "
+            f"{self.plan.summary()['calls']} appel(s)"
+        )
+        for group in self.plan.groups:
+            if len(group) == 1:
+                # Document seul : un appel avec streaming, sans requête doublon (document entier)
+                state, prepared, text = documents[group[0].name]
+                await self.chunk_queue.put(ChunkJob(state, 0, prepared, text, hedge=False))
+                await self.result_queue.put((state, 1))
+                continue
+            await self.chunk_queue.put(GroupJob([documents[document.name] for document in group]))
+            for document in group:
+                await self.result_queue.put((documents[document.name][0], 1))
+        for document in self.plan.fanout:
+            await self._queue_chunks(*documents[document.name])
+
+    async def _call_llm(self):
+        while True:
+            job = await self.chunk_queue.get()
+            if job is DONE:
+                return
+            if isinstance(job, GroupJob):
+                await self._call_group(job)
+            else:
+                await self._call_chunk(job)
+
+    async def _call_chunk(self, job: ChunkJob):
+        on_item = self._stream_to(job) if LLM_STREAMING or self.on_item is not None else None
+        # Coût estimé de l'appel pour le partage équitable : tokens du prompt (~4 caractères par token)
+        cost = (len(job.prepared.prompt) + len(job.chunk)) // 4
+
+        async def attempt():
+            call = lambda: analyze_chunk(self.client, job.state.name, job.prepared, job.chunk, on_item, self.usage)
+            slot = lambda: scheduler.slot(self.queue_key, cost)
+            if job.hedge:
+                # Requête doublon comprise, chaque requête occupe sa place du planificateur et est
+                # débitée du crédit de la file, jusqu'à sa fin
+                losers = self.hedge_losers if self.usage is not None else None
+                return await provider_call(lambda: hedged_call(call, losers=losers, slot=slot))
+            # La place du planificateur n'est pas gardée pendant l'attente avant une relance
+            async with slot():
+                return await provider_call(call)
+
+        outcome = await run_checkpointed(
+            attempt, job.state.filename, job.index, chunk_key(job.prepared.prompt, job.chunk),
+            self.checkpoints, self.retry_policy, self.deadline,
+        )
+        if not outcome.attempts:
+            # Chunk repris d'un dépôt précédent : ses éléments n'ont pas été transmis
+            self._emit(job.state, outcome.info)
+        await self.result_queue.put((job, outcome))
+
+    async def _call_group(self, job: GroupJob):
+        documents = []
+        for state, prepared, text in job.documents:
+            key = chunk_key(prepared.prompt, text)
+            if self.checkpoints is not None and self.checkpoints.get(state.filename, key) is not None:
+                # Document déjà analysé lors d'un dépôt précédent
+                await self._call_chunk(ChunkJob(state, 0, prepared, text, hedge=False))
+            else:
+                documents.append((state, prepared, text))
+        if len(documents) < 2:
+            for state, prepared, text in documents:
+                await self._call_chunk(ChunkJob(state, 0, prepared, text, hedge=False))
+            return
+
+        # Appel long, sans relance : sa latence n'est pas comparable à celle des chunks
+        cost = sum(count_tokens(prepared.prompt) + count_tokens(text) for _, prepared, text in documents)
+        try:
+            async with scheduler.slot(self.queue_key, cost):
+                results = await provider_call(lambda: analyze_documents(
+                    self.client, [(state.name, prepared, text) for state, prepared, text in documents], self.usage
+                ))
+        except ProviderCallError as e:
+            logger.warning(f"Analyse groupée de {[s.name for s, _, _ in documents]} en échec ({e}) : documents relancés un par un.")
+            results = {}
+        for state, prepared, text in documents:
+            chunk_job = ChunkJob(state, 0, prepared, text, hedge=False)
+            info = results.get(state.name)
+            if info is None and (state.name not in results or self.retry_policy.retry_refusals):
+                # Appel groupé en échec, ou refus : le document est relancé seul
+                await self._call_chunk(chunk_job)
+                continue
+            outcome = ChunkOutcome(OK, info, attempts=1) if info is not None else ChunkOutcome(REFUSED, attempts=1)
+            await save_checkpoint(self.checkpoints, state.filename, 0, chunk_key(prepared.prompt, text), outcome)
+            self._emit(state, info)
+            await self.result_queue.put((chunk_job, outcome))
+
+    def _emit(self, state: FileState, info: Optional[dict]):
+        if info is not None and self.on_item is not None:
+            emit_fields(info, lambda field_name, value: self.on_item(state.filename, field_name, value))
+
+    def _stream_to(self, job: ChunkJob):
+        # Requête doublon ou bascule de fournisseur : un même élément peut être généré deux fois
+        streamed = job.state.streamed.setdefault(job.index, {})
+        seen = set()
+
+        def on_item(field_name, value):
+            if job.index in job.state.chunk_results:
+                # Requête doublon perdante encore en cours : le résultat du chunk est déjà retenu
+                return
+            key = (field_name, json.dumps(value, sort_keys=True, ensure_ascii=False))
+            if key in seen:
+                return
+            seen.add(key)
+            streamed.setdefault(field_name, []).append(value)
+            if self.on_item is not None:
+                self.on_item(job.state.filename, field_name, value)
+
+        return on_item
+
+    async def _merge(self):
+        # L'étape de découpage écrit aussi dans cette file, mais elle se termine toujours avant
+        # les appels LLM : la fin de ces derniers marque la fin des résultats
+        while True:
+            item = await self.result_queue.get()
+            if item is DONE:
+                return
+
+            first, second = item
+            if isinstance(first, FileState):
+                state = first
+                state.total_chunks = second
+            else:
+                state = first.state
+                state.chunk_results[first.index] = second.info
+                if second.info is None:
+                    state.missing[first.index] = second.missing(first.index)
+                state.streamed.pop(first.index, None)
+
+            if state.complete:
+                result = state.result()
+                self.results[state.filename] = result
+                self.pending.pop(state.filename, None)
+                if state.missing:
+                    self.incomplete[state.filename] = result["missing_chunks"]
+                if self.on_file_done is not None:
+                    self.on_file_done(state.filename, result)
+
+
+async def analyze_files(client, processed_files) -> Dict[str, Dict[str, Any]]:
+    """Analyse chaque fichier et retourne les résultats bruts indexés par nom de fichier."""
+    return await AnalysisPipeline(client).run(processed_files)
+
+
+async def analyze_processed_files(client, processed_files):
+    results_by_file = await analyze_files(client, processed_files)
+    return merge_results(list(results_by_file.values()))
+
+
+# Enregistrements différés en cours (référence gardée jusqu'à leur fin)
+_late_usage: Set[asyncio.Task] = set()
+
+
+async def save_late_usage(usage: UsageRecorder, losers: Set[asyncio.Future]):
+    cancelled = await drain_losers(losers)
+    if cancelled:
+        logger.warning(f"{cancelled} requête(s) doublon(s) de '{usage.tender_id}' sans réponse : consommation non comptée.")
+    try:
+        await asyncio.to_thread(usage.save)
+    except Exception as e:
+        logger.error(f"Enregistrement de la consommation de '{usage.tender_id}' impossible: {e}")
+
+
+async def analyze_tender(client, tender_id: str, z: zipfile.ZipFile, deadline: Optional[Deadline] = None,
+                         on_item: Optional[Callable[[str, str, Any], None]] = None,
+                         usage: Optional[UsageRecorder] = None, queue_key: Optional[str] = None):
+    """Analyse incrémentale d'un appel d'offres : seuls les fichiers ajoutés ou modifiés
+    depuis le dernier dépôt sont envoyés au modèle, les autres sont repris du manifeste.
+    Si le délai est dépassé, le résultat contient ce qui a déjà été analysé : les fichiers
+    incomplets ne sont pas enregistrés dans le manifeste et seront ré-analysés au prochain dépôt.
+    `on_item(fichier, champ, valeur)` reçoit chaque élément extrait par le modèle dès sa génération,
+    `usage` la consommation des appels au modèle, enregistrée en fin d'analyse. Les appels au
+    modèle passent par la file `queue_key` du planificateur (par défaut, celle de l'appel d'offres).
+    Un fichier dont des chunks restent en échec après relances est rendu avec ses chunks réussis
+    et la liste des chunks manquants ; il n'est pas mémorisé dans le manifeste, et au prochain
+    dépôt seuls ses chunks manquants sont renvoyés au modèle (chunk_checkpoints)."""
+    previous = await load_manifest(tender_id)
+    manifest = previous or new_manifest(tender_id)
+    known = manifest["files"]
+    changes = {"added": [], "modified": [], "removed": [], "unchanged": []}
+    uploaded = set()
+    hashes = {}
+    errors = []
+    # Positionné par le pipeline quand l'analyse s'arrête avant la fin de la lecture (délai dépassé)
+    stop_reading = threading.Event()
+    # Fichiers incomplets (chunks manquants) et fichiers complets analysés par ce dépôt
+    incomplete = {}
+    completed = []
+
+    checkpoints = ChunkCheckpoints(tender_id)
+    try:
+        await asyncio.to_thread(checkpoints.load)
+    except Exception as e:
+        logger.error(f"Lecture des points de reprise de '{tender_id}' impossible: {e}")
+        checkpoints = None
+
+    def unchanged_before_read(info):
+        if stop_reading.is_set():
+            # Analyse terminée : plus aucun fichier n'est lu
+            return True
+        # CRC et taille lus dans le répertoire central : un fichier inchangé n'est pas lu
+        # (ni téléchargé quand l'archive est lue à distance)
+        entry = known.get(info.filename)
+        if entry is None or entry.get("crc32") != info.CRC or entry.get("size") != info.file_size:
+            return False
+        uploaded.add(info.filename)
+        changes["unchanged"].append(info.filename)
+        return True
+
+    def changed_files():
+        # Exécuté dans le thread de lecture : les fichiers inchangés ne sont pas transmis au pipeline
+        for file in iter_files_from_zip(z, skip=unchanged_before_read):
+            if stop_reading.is_set():
+                return
+            uploaded.add(file["filename"])
+            status = classify_file(manifest, file["filename"], file["sha256"])
+            changes[status].append(file["filename"])
+            if status == "unchanged":
+                continue
+            hashes[file["filename"]] = {"sha256": file["sha256"], "crc32": file["crc32"], "size": file["size"]}
+            yield file
+
+    def on_file_done(file_name, result):
+        if result.get("missing_chunks"):
+            # Ne pas mémoriser un fichier incomplet : ses chunks manquants seront relancés au prochain dépôt
+            known.pop(file_name, None)
+            errors.append(file_name)
+            incomplete[file_name] = result
+            return
+        known[file_name] = {**hashes[file_name], "result": result}
+        completed.append(file_name)
+
+    async def on_text(file_name, text):
+        try:
+            await asyncio.to_thread(index_document, tender_id, file_name, text)
+        except Exception as e:
+            logger.error(f"Indexation du texte de '{file_name}' impossible: {e}")
+
+    pipeline = AnalysisPipeline(
+        client, on_file_done, on_text, deadline, on_item, usage, queue_key or tender_id,
+        checkpoints=checkpoints, stop_reading=stop_reading,
+    )
+    await pipeline.run(changed_files())
+    # Lecture terminée ou arrêtée : copies figées de ce qu'elle a relevé
+    changes = {status: list(file_names) for status, file_names in changes.items()}
+    uploaded = set(uploaded)
+    # Fichiers en cours au moment du délai : l'ancien résultat d'un fichier modifié ne doit pas
+    # être fusionné avec le résultat partiel de son nouveau contenu
+    for file_name in pipeline.pending:
+        known.pop(file_name, None)
+    # Fichiers illisibles : ni leur ancien résultat ni leur empreinte ne sont conservés, ils
+    # seront relus au prochain dépôt
+    for file_name in pipeline.failed:
+        known.pop(file_name, None)
+        errors.append(file_name)
+
+    # Sans lecture complète de l'archive, on ne peut pas savoir quels fichiers ont été retirés
+    changes["removed"] = [
+        file_name for file_name in list(known) if file_name not in uploaded
+    ] if pipeline.reading_done else []
+    for file_name in changes["removed"]:
+        known.pop(file_name)
+    logger.info(
+        f"Tender '{tender_id}': {len(changes['added']) + len(changes['modified'])} fichier(s) analysé(s), "
+        f"{len(changes['unchanged'])} repris du manifeste."
+    )
+
+    merged = merge_results(
+        [entry["result"] for entry in known.values()]
+        + list(incomplete.values())
+        + list(pipeline.partial_results.values())
+    )
+
+    changed_fields = diff_fields(previous["merged"] if previous else None, merged)
+    manifest["version"] += 1
+    manifest["merged"] = merged
+    if await save_manifest(manifest) and checkpoints is not None and completed:
+        # Résultats complets enregistrés dans le manifeste : leurs points de reprise ne servent plus
+        try:
+            await asyncio.to_thread(checkpoints.forget, completed)
+        except Exception as e:
+            logger.error(f"Suppression des points de reprise de '{tender_id}' impossible: {e}")
+    try:
+        await asyncio.to_thread(index_tender, tender_id, manifest["version"], merged, changes["removed"])
+    except Exception as e:
+        logger.error(f"Indexation de l'appel d'offres '{tender_id}' impossible: {e}")
+    if usage is not None:
+        try:
+            await asyncio.to_thread(usage.save)
+        except Exception as e:
+            logger.error(f"Enregistrement de la consommation de '{tender_id}' impossible: {e}")
+        if pipeline.hedge_losers:
+            # Requêtes doublons perdantes encore en cours : leur consommation est enregistrée à
+            # leur fin, sans retarder la réponse
+            task = asyncio.create_task(save_late_usage(usage, pipeline.hedge_losers))
+            _late_usage.add(task)
+            task.add_done_callback(_late_usage.discard)
+
+    report = {
+        "tender_id": tender_id,
+        "version": manifest["version"],
+        "files": changes,
+        "failed_files": errors,
+        "missing_chunks": {file_name: result["missing_chunks"] for file_name, result in incomplete.items()},
+        "extraction_errors": dict(pipeline.failed),
+        "complete": not pipeline.timed_out,
+        "pending_files": sorted(pipeline.pending),
+        "field_status": pipeline.field_status(merged),
+        "changed_fields": changed_fields,
+        "changed_sections": sections_for_fields(changed_fields),
+        "strategy": pipeline.plan.summary() if pipeline.plan is not None else {"strategy": "fanout"},
+    }
+    return merged, report
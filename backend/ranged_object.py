@@ -0,0 +1,121 @@
+import io
+import logging
+import zipfile
+from collections import OrderedDict
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# Lecture d'un objet MinIO comme un fichier local (seek/read), par requêtes HTTP Range.
+# zipfile lit d'abord le répertoire central en fin d'archive, puis uniquement les fichiers
+# ouverts : seuls les blocs réellement lus sont téléchargés. Les requêtes portent l'ETag lu
+# à l'ouverture : un objet remplacé pendant la lecture fait échouer la lecture au lieu de
+# mélanger deux versions de l'archive.
+BLOCK_SIZE = 256 * 1024
+MAX_CACHED_BLOCKS = 8
+
+
+class RangedObjectReader(io.RawIOBase):
+    def __init__(self, bucket_name: str, object_name: str, size: int, s3_client=None,
+                 block_size: int = BLOCK_SIZE, etag: Optional[str] = None):
+        from s3_config import get_s3_client
+
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.size = size
+        self.block_size = block_size
+        self.etag = etag
+        # Un seul client pour toutes les requêtes de lecture de l'objet
+        self.s3_client = s3_client or get_s3_client()
+        self.position = 0
+        self.bytes_fetched = 0
+        self.requests = 0
+        self._blocks = OrderedDict()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"whence invalide : {whence}")
+        if self.position < 0:
+            raise ValueError("Position négative")
+        return self.position
+
+    def _fetch(self, start: int, end: int) -> bytes:
+        from s3_config import get_object_range
+
+        try:
+            data = get_object_range(self.bucket_name, self.object_name, start, end, self.s3_client, self.etag)
+        except ClientError as e:
+            raise IOError(f"Lecture des octets {start}-{end} de {self.object_name} impossible : {e}") from e
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        if len(data) != end - start + 1:
+            # Objet tronqué ou remplacé par un plus court : sans cette vérification, read boucle indéfiniment
+            raise IOError(
+                f"{self.object_name} : {len(data)} octet(s) reçu(s) au lieu de {end - start + 1} "
+                f"(objet modifié pendant la lecture ?)"
+            )
+        return data
+
+    def _block(self, index: int) -> bytes:
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+
+        start = index * self.block_size
+        block = self._fetch(start, min(start + self.block_size, self.size) - 1)
+
+        self._blocks[index] = block
+        if len(self._blocks) > MAX_CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return block
+
+    def read(self, size: int = -1) -> bytes:
+        if self.position >= self.size:
+            return b""
+        end = self.size if size is None or size < 0 else min(self.size, self.position + size)
+
+        # Les lectures plus grandes qu'un bloc (contenu d'un fichier) sont faites en une requête
+        if end - self.position > self.block_size:
+            data = self._fetch(self.position, end - 1)
+        else:
+            parts = []
+            position = self.position
+            while position < end:
+                index, offset = divmod(position, self.block_size)
+                block = self._block(index)
+                part = block[offset:offset + end - position]
+                parts.append(part)
+                position += len(part)
+            data = b"".join(parts)
+
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_remote_zip(bucket_name: str, object_name: str, size: int, etag: Optional[str] = None):
+    """Ouvre une archive stockée dans MinIO (bloquant : à appeler hors de la boucle d'événements)."""
+    reader = RangedObjectReader(bucket_name, object_name, size, etag=etag)
+    return reader, zipfile.ZipFile(reader)
@@ -0,0 +1,158 @@
+import asyncio
+import html
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from string import Template
+
+from analyze import report_sections
+
+logger = logging.getLogger(__name__)
+
+# Génération côté serveur des rapports PDF et DOCX à partir du résultat fusionné.
+# Les gabarits sont compilés une fois par processus, et le rendu (CPU) tourne dans un pool
+# de processus pour ne pas bloquer la boucle d'événements.
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+REPORT_BUCKET = os.getenv("MINIO_BUCKET_NAME", "gonogo")
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_TITLE = "Résumé Go NoGo"
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+_executor = None
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Template:
+    return Template((TEMPLATES_DIR / name).read_text(encoding="utf-8"))
+
+
+@lru_cache(maxsize=None)
+def get_stylesheet() -> str:
+    return (TEMPLATES_DIR / "report.css").read_text(encoding="utf-8")
+
+
+@lru_cache(maxsize=None)
+def get_docx_template() -> bytes:
+    """Document Word vide avec les styles du rapport, sérialisé une fois puis réouvert à chaque rendu."""
+    import docx
+    from docx.shared import Pt, RGBColor
+
+    document = docx.Document()
+    styles = document.styles
+    styles["Normal"].font.size = Pt(10)
+    for style_name, size in (("Heading 1", 16), ("Heading 2", 13), ("Heading 3", 11)):
+        styles[style_name].font.size = Pt(size)
+        styles[style_name].font.color.rgb = RGBColor(0x31, 0x2E, 0x81)
+
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _subtitle() -> str:
+    return f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
+
+
+def render_html(dico) -> str:
+    escape = html.escape
+    section_template = get_template("report_section.html")
+    field_template = get_template("report_field.html")
+
+    sections = []
+    for section_title, fields in report_sections(dico):
+        rendered_fields = "".join(
+            field_template.substitute(
+                label=escape(label),
+                items="\n".join(f"<li>{escape(value)}</li>" for value in values),
+            )
+            for label, values in fields
+        )
+        sections.append(section_template.substitute(section_title=escape(section_title), fields=rendered_fields))
+
+    return get_template("report.html").substitute(
+        title=escape(REPORT_TITLE), subtitle=escape(_subtitle()), sections="".join(sections)
+    )
+
+
+def render_pdf(dico) -> bytes:
+    import fitz
+
+    story = fitz.Story(html=render_html(dico), user_css=get_stylesheet())
+    buffer = BytesIO()
+    writer = fitz.DocumentWriter(buffer)
+    mediabox = fitz.paper_rect("a4")
+    where = mediabox + (40, 40, -40, -40)
+
+    more = True
+    while more:
+        device = writer.begin_page(mediabox)
+        more, _ = story.place(where)
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+    return buffer.getvalue()
+
+
+def render_docx(dico) -> bytes:
+    import docx
+
+    document = docx.Document(BytesIO(get_docx_template()))
+    # Résolution des styles une seule fois : la recherche par nom est coûteuse sur les longues listes
+    styles = document.styles
+    heading_2, heading_3, bullet = styles["Heading 2"], styles["Heading 3"], styles["List Bullet"]
+
+    document.add_heading(REPORT_TITLE, level=1)
+    document.add_paragraph(_subtitle())
+    for section_title, fields in report_sections(dico):
+        document.add_paragraph(section_title, style=heading_2)
+        for label, values in fields:
+            document.add_paragraph(label, style=heading_3)
+            for value in values:
+                document.add_paragraph(value, style=bullet)
+
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def render_report(dico, report_format: str) -> bytes:
+    if report_format == "pdf":
+        return render_pdf(dico)
+    if report_format == "docx":
+        return render_docx(dico)
+    raise ValueError(f"Format de rapport non supporté : {report_format}")
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+    return _executor
+
+
+async def render_and_store_report(tender_id: str, version: int, dico, report_format: str, expiration=3600):
+    """Retourne une URL présignée du rapport d'une version de l'appel d'offres. La clé de l'objet
+    porte la version : un rapport déjà déposé dans MinIO est réutilisé, sinon il est rendu dans
+    le pool de processus puis déposé."""
+    from s3_config import ensure_bucket, generate_presigned_url, object_exists, put_object
+
+    object_name = f"tenders/{tender_id}/report-v{version}.{report_format}"
+    if not await asyncio.to_thread(object_exists, REPORT_BUCKET, object_name):
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(get_executor(), render_report, dico, report_format)
+        await asyncio.to_thread(ensure_bucket, REPORT_BUCKET)
+        stored = await asyncio.to_thread(
+            put_object, REPORT_BUCKET, object_name, BytesIO(content), len(content), CONTENT_TYPES[report_format]
+        )
+        if not stored:
+            return None
+    return await asyncio.to_thread(generate_presigned_url, REPORT_BUCKET, object_name, expiration)
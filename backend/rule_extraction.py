@@ -0,0 +1,161 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+# Extraction déterministe des champs très réguliers (formule de révision, dates, pondérations,
+# délais de paiement) avant l'appel au modèle. Les motifs sont compilés une seule fois au
+# chargement du module et le texte d'un document n'est parcouru qu'une fois, ligne par ligne.
+
+MOIS = r"(?:janvier|f[ée]vrier|mars|avril|mai|juin|juillet|ao[ûu]t|septembre|octobre|novembre|d[ée]cembre)"
+
+# Ligne contenant au moins un élément susceptible d'intéresser une règle : sert de pré-filtre
+# pour éviter d'évaluer toutes les règles sur chaque ligne.
+TRIGGER = re.compile(
+    r"\bPn?\s*=|%|\bjours?\b|\d{1,2}/\d{1,2}/\d{2,4}|\b\d{1,2}(?:er)?\s+" + MOIS,
+    re.IGNORECASE,
+)
+
+FORMULE = re.compile(r"\bPn?\s*=\s*P\s*[o0₀]\b.{0,250}", re.IGNORECASE)
+# Variables d'une formule : P, Po, P0, Pn, I0-4, Im-4, etc.
+VARIABLE = re.compile(r"\b[A-Z][A-Za-z]{0,5}\d*(?:-\d+)?\b")
+# Prix révisé et prix initial : les autres variables d'une formule sont ses indices
+PRICE_VARIABLES = {"P", "Pn", "Po", "P0", "P₀"}
+DEFINITION = re.compile(r"^\s*[-•–]?\s*([A-Z][A-Za-z0-9₀-]{0,10})\s*(?::|=|est|représente|désigne)\s+(.{5,250})$")
+
+DATE = re.compile(
+    r"\b\d{1,2}(?:er)?\s+" + MOIS + r"\s+\d{4}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b",
+    re.IGNORECASE,
+)
+POURCENTAGE = re.compile(r"\b\d{1,3}(?:[.,]\d+)?\s?%")
+CRITERE = re.compile(
+    r"crit[èe]re|pond[ée]ration|valeur\s+technique|prix|co[ûu]t|d[ée]lai|m[ée]moire|environnement|social|qualit[ée]",
+    re.IGNORECASE,
+)
+DELAI_PAIEMENT = re.compile(
+    r"(?:d[ée]lai\s+(?:global\s+)?de\s+paiement|paiement|r[èe]glement|mandatement)[^.\n]{0,80}?\b\d{1,3}\s*jours\b"
+    r"|\b\d{1,3}\s*jours\b[^.\n]{0,80}?(?:paiement|r[èe]glement|facture)",
+    re.IGNORECASE,
+)
+
+MAX_LINE_LENGTH = 300
+
+
+@dataclass(frozen=True)
+class ExtractionRule:
+    field: str
+    # Une règle "complète" remplit entièrement le champ : il n'est plus demandé au modèle.
+    # Les autres règles ne font que compléter ce que le modèle trouvera.
+    satisfies: bool
+
+
+RULES = {
+    # Complètes seulement si la formule trouvée est entière et chacun de ses indices défini
+    # (voir formula_complete) : une mention isolée de « P = Po » laisse le champ au modèle
+    "formule_revision": ExtractionRule("formule_revision", satisfies=True),
+    "definitions_formule": ExtractionRule("definitions_formule", satisfies=True),
+    # Motifs larges (toute date, tout pourcentage proche d'un critère) : une seule ligne trouvée
+    # ne garantit pas le champ complet, le modèle reste interrogé tant que
+    # scripts/evaluate_rule_extraction.py ne montre pas une précision et un rappel suffisants
+    "calendrier_dates_cles": ExtractionRule("calendrier_dates_cles", satisfies=False),
+    "pourcentages_criteres": ExtractionRule("pourcentages_criteres", satisfies=False),
+    "conditions_paiement": ExtractionRule("conditions_paiement", satisfies=False),
+}
+
+
+def _clean(line: str) -> str:
+    return " ".join(line.split())[:MAX_LINE_LENGTH]
+
+
+def _append_unique(values: List[str], value: str):
+    if value and value not in values:
+        values.append(value)
+
+
+def extract_structured_fields(text: str, fields: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Applique les règles au texte d'un document et retourne les valeurs trouvées par champ.
+    Si `fields` est fourni, seules les règles portant sur ces champs sont évaluées."""
+    wanted = set(RULES) if fields is None else set(RULES) & set(fields)
+    found = {field: [] for field in wanted}
+    if not wanted or not text:
+        return {}
+
+    lines = text.splitlines()
+    formula_variables: Set[str] = set()
+    candidate_definitions = []
+
+    for index, line in enumerate(lines):
+        if "definitions_formule" in wanted:
+            definition = DEFINITION.match(line)
+            if definition and not FORMULE.search(line):
+                candidate_definitions.append((definition.group(1), _clean(line)))
+
+        if not TRIGGER.search(line):
+            continue
+
+        formula = FORMULE.search(line)
+        if formula:
+            formula_text = formula.group(0)
+            # Formule coupée en fin de ligne par l'extraction PDF : on la complète avec les lignes suivantes
+            for next_line in lines[index + 1:index + 3]:
+                if formula_text.count("[") <= formula_text.count("]") and formula_text.count("(") <= formula_text.count(")"):
+                    break
+                formula_text += " " + next_line
+            if "formule_revision" in wanted:
+                _append_unique(found["formule_revision"], _clean(formula_text))
+            formula_variables.update(VARIABLE.findall(formula_text))
+
+        if "calendrier_dates_cles" in wanted and DATE.search(line):
+            _append_unique(found["calendrier_dates_cles"], _clean(line))
+
+        if "pourcentages_criteres" in wanted and POURCENTAGE.search(line) and CRITERE.search(line):
+            _append_unique(found["pourcentages_criteres"], _clean(line))
+
+        if "conditions_paiement" in wanted:
+            delay = DELAI_PAIEMENT.search(line)
+            if delay:
+                _append_unique(found["conditions_paiement"], _clean(delay.group(0)))
+
+    # Les définitions ne sont retenues que pour les variables présentes dans une formule trouvée
+    if "definitions_formule" in wanted:
+        for variable, definition in candidate_definitions:
+            if variable in formula_variables:
+                _append_unique(found["definitions_formule"], definition)
+
+    return {field: values for field, values in found.items() if values}
+
+
+def _index_variables(formula: str) -> Set[str]:
+    # Les mots du texte qui suit la formule (« Avec », « Dans ») ne sont pas des variables :
+    # un indice contient un chiffre, est écrit en capitales ou tient en deux lettres
+    return {
+        variable for variable in VARIABLE.findall(formula)
+        if variable not in PRICE_VARIABLES
+        and (any(c.isdigit() for c in variable) or variable.isupper() or len(variable) <= 2)
+    }
+
+
+def formula_complete(extracted: Dict[str, List[str]]) -> bool:
+    """Vrai si chaque formule trouvée est équilibrée (parenthèses, crochets), porte sur au moins
+    un indice et si tous ses indices ont une définition trouvée dans le document."""
+    formulas = extracted.get("formule_revision", [])
+    defined = set()
+    for definition in extracted.get("definitions_formule", []):
+        match = DEFINITION.match(definition)
+        if match:
+            defined.add(match.group(1))
+    for formula in formulas:
+        if formula.count("(") != formula.count(")") or formula.count("[") != formula.count("]"):
+            return False
+        indices = _index_variables(formula)
+        if not indices or not indices <= defined:
+            return False
+    return bool(formulas)
+
+
+def satisfied_fields(extracted: Dict[str, List[str]]) -> Set[str]:
+    """Champs entièrement couverts par l'extraction locale, qu'il n'est plus utile de demander au modèle.
+    Une formule incomplète reste demandée au modèle ; la valeur des règles n'en est qu'un complément."""
+    satisfied = {field for field, values in extracted.items() if values and RULES[field].satisfies}
+    if not formula_complete(extracted):
+        satisfied -= {"formule_revision", "definitions_formule"}
+    return satisfied
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+import resource
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Mesures d'exécution d'un worker, exposées par /metrics/runtime pour les tests de charge :
+# - retard de la boucle d'événements : une tâche se réveille toutes les LOOP_LAG_INTERVAL secondes
+#   et mesure l'écart avec l'heure de réveil prévue (un appel bloquant dans la boucle le fait grimper) ;
+# - mémoire résidente (RSS) du processus et mémoire totale du conteneur (cgroup) ;
+# - nombre de requêtes HTTP en cours.
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+LOOP_LAG_WINDOW = 600
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+CGROUP_MEMORY_FILES = [
+    Path("/sys/fs/cgroup/memory.current"),  # cgroup v2
+    Path("/sys/fs/cgroup/memory/memory.usage_in_bytes"),  # cgroup v1
+]
+
+
+def rss_bytes() -> int:
+    """Mémoire résidente actuelle du processus (pic depuis le démarrage hors Linux)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def container_memory_bytes() -> Optional[int]:
+    for path in CGROUP_MEMORY_FILES:
+        try:
+            return int(path.read_text().strip())
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, window: int = LOOP_LAG_WINDOW):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - expected)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"last_ms": None, "p99_ms": None, "max_ms": None}
+        return {
+            "last_ms": round(self.samples[-1] * 1000, 2),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+loop_lag = LoopLagMonitor()
+started_at = time.time()
+inflight_requests = 0
+
+
+def snapshot() -> dict:
+    return {
+        "pid": os.getpid(),
+        "timestamp": time.time(),
+        "uptime_seconds": round(time.time() - started_at, 1),
+        "rss_bytes": rss_bytes(),
+        "container_memory_bytes": container_memory_bytes(),
+        "loop_lag": loop_lag.snapshot(),
+        "inflight_requests": inflight_requests,
+    }
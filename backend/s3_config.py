@@ -4,6 +4,7 @@ import json
 import io
 import logging
 import os
+import threading
 from botocore.exceptions import ClientError
 
 custom_config = Config(
@@ -14,14 +15,35 @@ custom_config = Config(
     signature_version='s3v4'
 )
 
-def get_s3_client():
-    return boto3.client('s3',
-                        endpoint_url=os.getenv('MINIO_ENDPOINT_URL'),
-                        aws_access_key_id=os.getenv('MINIO_ACCESS_KEY_ID'),
-                        aws_secret_access_key=os.getenv('MINIO_SECRET_ACCESS_KEY'),
-                        region_name=os.getenv('MINIO_REGION_NAME'),
-                        config=boto3.session.Config(signature_version='s3v4')
-                        )
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+
+def get_s3_client(public=False):
+    """Client S3 vers MinIO. Avec public=True, l'adresse est celle vue par les navigateurs
+    (MINIO_PUBLIC_ENDPOINT_URL) : à utiliser pour signer les URLs transmises au frontend.
+    Les clients boto3 sont sûrs entre threads : un seul est créé par processus et par adresse,
+    leur création (chargement des modèles de service) étant coûteuse."""
+    with _s3_clients_lock:
+        if public not in _s3_clients:
+            endpoint_url = os.getenv('MINIO_ENDPOINT_URL')
+            if public:
+                endpoint_url = os.getenv('MINIO_PUBLIC_ENDPOINT_URL', endpoint_url)
+            _s3_clients[public] = boto3.client('s3',
+                                               endpoint_url=endpoint_url,
+                                               aws_access_key_id=os.getenv('MINIO_ACCESS_KEY_ID'),
+                                               aws_secret_access_key=os.getenv('MINIO_SECRET_ACCESS_KEY'),
+                                               region_name=os.getenv('MINIO_REGION_NAME'),
+                                               config=boto3.session.Config(signature_version='s3v4')
+                                               )
+        return _s3_clients[public]
+
+def ensure_bucket(bucket_name):
+    """Crée le bucket s'il n'existe pas encore"""
+    s3_client = get_s3_client()
+    try:
+        s3_client.head_bucket(Bucket=bucket_name)
+    except ClientError:
+        s3_client.create_bucket(Bucket=bucket_name)
 
 def put_json_object(bucket_name, object_name, data):
     s3_client = get_s3_client()
@@ -54,7 +76,7 @@ def put_object(bucket_name, object_name, data, length, content_type):
 
 def generate_presigned_url(bucket_name, object_name, expiration=3600):
     """Génère une URL présignée pour permettre l'accès au fichier"""
-    s3_client = get_s3_client()
+    s3_client = get_s3_client(public=True)
     try:
         response = s3_client.generate_presigned_url('get_object',
                                                     Params={'Bucket': bucket_name,
@@ -65,6 +87,73 @@ def generate_presigned_url(bucket_name, object_name, expiration=3600):
         return None
     return response
 
+def generate_presigned_post(bucket_name, object_name, max_size, content_type="application/zip", expiration=3600):
+    """Génère un formulaire présigné (POST) permettant au client de déposer un fichier directement
+    dans MinIO ; la politique signée borne la taille du fichier à max_size octets."""
+    s3_client = get_s3_client(public=True)
+    try:
+        response = s3_client.generate_presigned_post(bucket_name, object_name,
+                                                     Fields={'Content-Type': content_type},
+                                                     Conditions=[{'Content-Type': content_type},
+                                                                 ['content-length-range', 1, max_size]],
+                                                     ExpiresIn=expiration)
+    except Exception as e:
+        logging.error(f"Erreur lors de la génération du formulaire de dépôt présigné : {str(e)}")
+        return None
+    return response
+
+def ensure_expiration_rule(bucket_name, prefix, days):
+    """Ajoute au bucket une règle de cycle de vie supprimant les objets de `prefix` après `days` jours,
+    en conservant les règles existantes"""
+    s3_client = get_s3_client()
+    rule_id = f"expire-{prefix.strip('/')}"
+    try:
+        rules = s3_client.get_bucket_lifecycle_configuration(Bucket=bucket_name)['Rules']
+    except ClientError:
+        rules = []
+    if any(rule.get('ID') == rule_id for rule in rules):
+        return
+    rules.append({'ID': rule_id, 'Filter': {'Prefix': prefix}, 'Status': 'Enabled', 'Expiration': {'Days': days}})
+    s3_client.put_bucket_lifecycle_configuration(Bucket=bucket_name, LifecycleConfiguration={'Rules': rules})
+
+def delete_object(bucket_name, object_name):
+    s3_client = get_s3_client()
+    try:
+        s3_client.delete_object(Bucket=bucket_name, Key=object_name)
+        return True
+    except Exception as e:
+        logging.error(f"Erreur lors de la suppression de l'objet {object_name} : {e}")
+        return False
+
+def object_exists(bucket_name, object_name):
+    """Vérifie par une requête HEAD qu'un objet existe (absence attendue : rien n'est journalisé)"""
+    s3_client = get_s3_client()
+    try:
+        s3_client.head_object(Bucket=bucket_name, Key=object_name)
+        return True
+    except ClientError:
+        return False
+
+def get_object_info(bucket_name, object_name, s3_client=None):
+    """Taille et ETag d'un objet (None si l'objet est introuvable)"""
+    s3_client = s3_client or get_s3_client()
+    try:
+        response = s3_client.head_object(Bucket=bucket_name, Key=object_name)
+        return {'size': response['ContentLength'], 'etag': response['ETag']}
+    except ClientError as e:
+        logging.error(f"Erreur lors de la lecture des métadonnées de l'objet {object_name} : {e}")
+        return None
+
+def get_object_range(bucket_name, object_name, start, end, s3_client=None, etag=None):
+    """Lit les octets [start, end] (bornes incluses) d'un objet avec une requête HTTP Range.
+    Avec etag, la requête échoue (412) si l'objet a été remplacé depuis la lecture de son ETag"""
+    s3_client = s3_client or get_s3_client()
+    params = {'Bucket': bucket_name, 'Key': object_name, 'Range': f"bytes={start}-{end}"}
+    if etag is not None:
+        params['IfMatch'] = etag
+    response = s3_client.get_object(**params)
+    return response['Body'].read()
+
 def get_presigned_url(bucket_name: str, object_name: str, expiration=3600):
     s3_client = get_s3_client()
     try:
@@ -92,5 +181,5 @@ def get_object(bucket_name, object_name):
         response = s3_client.get_object(Bucket=bucket_name, Key=object_name)
         return response['Body'].read()
     except Exception as e:
-        print(f"Erreur lors de la récupération de l'objet : {str(e)}")
+        logging.error(f"Erreur lors de la récupération de l'objet : {str(e)}")
         return None
@@ -0,0 +1,144 @@
+"""Mesure la mise en forme et la sérialisation du résultat d'une analyse, de la réponse du modèle
+à la réponse HTTP : chemin précédent (.dict() de chaque réponse, fusion par sets, filtrage des
+valeurs 'non spécifié' au formatage, jsonable_encoder + json.dumps, résumé envoyé deux fois)
+et chemin actuel (champs lus directement, filtrage à la fusion, orjson, résumé envoyé une fois).
+
+Usage :
+    python scripts/benchmark_serialization.py [--files 40] [--chunks 4] [--values 6] [--repeat 20]
+
+Les réponses sont synthétiques : chaque chunk de chaque fichier renseigne tous les champs de son
+modèle avec --values valeurs, dont une partie 'Non spécifié' et des doublons entre chunks.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+NOT_SPECIFIED_VALUES = ["Non spécifié", "non précisée", "Date non spécifiée"]
+
+
+def legacy_format_liste(valeur):
+    # Formatage d'origine, appelé deux fois par champ
+    if isinstance(valeur, list):
+        valeur_filtre = []
+        for v in valeur:
+            if isinstance(v, str):
+                v_minuscule = v.lower()
+                if v_minuscule == "non spécifié" or v_minuscule == "date non spécifiée" or v_minuscule == "non spécifiée" or v_minuscule == "non précisé" or v_minuscule == "non précisée":
+                    continue
+            valeur_filtre.append(v)
+        return "\n        • " + "\n        • ".join(map(str, valeur_filtre)) if valeur_filtre else ""
+    return str(valeur) if valeur else ""
+
+
+def legacy_path(responses, render_json):
+    from analyze import REPORT_SECTIONS
+
+    results = [
+        {"filename": file_name, "info": [response.dict(exclude_none=True) for response in chunks]}
+        for file_name, chunks in responses.items()
+    ]
+    merged = {}
+    for item in results:
+        for info_dict in item["info"]:
+            for key, value in info_dict.items():
+                merged.setdefault(key, set())
+                if value:
+                    merged[key].update(value)
+    merged = {key: list(values) for key, values in merged.items()}
+
+    output = []
+    for section_title, fields in REPORT_SECTIONS:
+        field_texts = [
+            f"    **{field}** : {legacy_format_liste(merged.get(key))}"
+            for field, key in fields
+            if legacy_format_liste(merged.get(key))
+        ]
+        if field_texts:
+            output.append(f"{section_title}\n" + "\n".join(field_texts))
+    text = "\n\n".join(output)
+    return render_json({"results": text, "final_results": text, "tender_id": "benchmark", "changes": {}})
+
+
+def current_path(responses, render_json):
+    from analyze import merge_results, print_file, response_fields
+
+    results = [
+        {"filename": file_name, "info": [response_fields(response) for response in chunks]}
+        for file_name, chunks in responses.items()
+    ]
+    merged = merge_results(results)
+    return render_json({"final_results": print_file(merged), "tender_id": "benchmark", "changes": {}})
+
+
+def synthetic_value(rng, name: str, field, values: int):
+    if "int" in str(field.annotation):
+        return rng.randrange(values * 2)
+    if rng.random() < 0.2:
+        return rng.choice(NOT_SPECIFIED_VALUES)
+    return f"{name} valeur {rng.randrange(values * 2)}"
+
+
+def synthetic_responses(files: int, chunks: int, values: int, seed: int = 0):
+    from FileAnalyzerRegistry import FileAnalyzerRegistry
+
+    FileAnalyzerRegistry.initialize_registry()
+    models = [analyzer.get_response_model() for analyzer in FileAnalyzerRegistry._instances.values()]
+    rng = random.Random(seed)
+    responses = {}
+    for index in range(files):
+        model = models[index % len(models)]
+        responses[f"document_{index}.pdf"] = [
+            model(**{
+                name: [synthetic_value(rng, name, field, values) for _ in range(values)]
+                for name, field in model.model_fields.items()
+            })
+            for _ in range(chunks)
+        ]
+    return responses
+
+
+def measure(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--values", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+
+    responses = synthetic_responses(args.files, args.chunks, args.values)
+
+    def legacy_json(content):
+        return JSONResponse(jsonable_encoder(content)).body
+
+    def current_json(content):
+        return ORJSONResponse(content).body
+
+    legacy_body = legacy_path(responses, legacy_json)
+    current_body = current_path(responses, current_json)
+    assert json.loads(legacy_body)["final_results"].count("•") == json.loads(current_body)["final_results"].count("•")
+
+    legacy_ms = measure(lambda: legacy_path(responses, legacy_json), args.repeat)
+    current_ms = measure(lambda: current_path(responses, current_json), args.repeat)
+    print(f"{args.files} fichiers x {args.chunks} chunks, {args.values} valeurs par champ")
+    print(f"{'chemin':<10}{'ms':>10}{'octets':>10}")
+    print(f"{'précédent':<10}{legacy_ms:>10.2f}{len(legacy_body):>10}")
+    print(f"{'actuel':<10}{current_ms:>10.2f}{len(current_body):>10}")
+
+
+if __name__ == "__main__":
+    main()
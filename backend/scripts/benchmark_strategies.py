@@ -0,0 +1,130 @@
+"""Compare les stratégies d'appels au modèle (analysis_planner) sur un corpus de DCE : coût, durée
+et rappel des champs.
+
+Usage :
+    python scripts/benchmark_strategies.py <dossier_corpus> [--strategies single,grouped,fanout,auto]
+        [--output resultats.json]
+
+Chaque archive `*.zip` du dossier est analysée avec chaque stratégie imposée (ANALYSIS_STRATEGY),
+par le pipeline complet et les fournisseurs configurés (LLM_PROVIDERS, OPENAI_BASE_URL, ...).
+Le rappel est la part des valeurs de référence retrouvées, fichier par fichier et champ par
+champ (même correspondance approchée que scripts/evaluate_rule_extraction.py). La référence est
+`X.llm.json` quand elle existe (produite par evaluate_rule_extraction.py --run-llm), sinon le
+résultat de la stratégie fanout. Le script affiche aussi l'estimation du planificateur, pour
+vérifier que son choix (auto) correspond à la stratégie la moins chère et la plus rapide mesurée.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from evaluate_rule_extraction import matches  # noqa: E402
+
+
+async def run_strategy(client, files, strategy: str) -> dict:
+    from analyze import merge_results
+    from pipeline import AnalysisPipeline
+    from usage_accounting import UsageRecorder
+
+    usage = UsageRecorder("benchmark")
+    pipeline = AnalysisPipeline(client, usage=usage, strategy=strategy)
+    start = time.monotonic()
+    # Le pipeline libère le contenu des fichiers : chaque exécution reçoit ses propres copies
+    results = await pipeline.run([dict(file) for file in files])
+    elapsed = time.monotonic() - start
+    summary = usage.summary()
+    return {
+        "strategy": pipeline.plan.strategy if pipeline.plan is not None else "fanout",
+        "wall_seconds": round(elapsed, 2),
+        "calls": round(summary["calls"]),
+        "input_tokens": summary["input_tokens"],
+        "output_tokens": summary["output_tokens"],
+        "cost_usd": summary["cost_usd"],
+        "plan": pipeline.plan.summary() if pipeline.plan is not None else None,
+        "fields": {file_name: merge_results([result]) for file_name, result in results.items()},
+    }
+
+
+def recall(fields: dict, reference: dict) -> tuple:
+    """(valeurs de référence retrouvées, valeurs de référence)."""
+    found = total = 0
+    for file_name, reference_fields in reference.items():
+        for field, values in reference_fields.items():
+            candidates = fields.get(file_name.lower(), fields.get(file_name, {})).get(field, [])
+            for value in values:
+                if not value:
+                    continue
+                total += 1
+                found += matches(value, candidates)
+    return found, total
+
+
+async def benchmark(corpus: Path, strategies):
+    from dotenv import load_dotenv
+
+    from file_extraction import extract_files_from_zip
+    from FileAnalyzerRegistry import FileAnalyzerRegistry
+    from LLMRouter import LLMRouter
+
+    load_dotenv()
+    client = LLMRouter.from_env()
+    FileAnalyzerRegistry.initialize_registry()
+
+    rows = []
+    for archive in sorted(corpus.glob("*.zip")):
+        with open(archive, "rb") as f:
+            files, _, _ = extract_files_from_zip(f)
+
+        runs = {}
+        # fanout d'abord : c'est la référence quand X.llm.json est absent
+        for strategy in sorted(strategies, key=lambda name: name != "fanout"):
+            runs[strategy] = await run_strategy(client, files, strategy)
+
+        reference_path = archive.with_suffix(".llm.json")
+        if reference_path.exists():
+            reference = json.loads(reference_path.read_text(encoding="utf-8"))
+        else:
+            reference = runs["fanout"]["fields"] if "fanout" in runs else {}
+
+        for strategy, run in runs.items():
+            found, total = recall(run["fields"], reference)
+            rows.append({
+                "archive": archive.name,
+                "requested": strategy,
+                **{key: value for key, value in run.items() if key != "fields"},
+                "recall": round(found / total, 3) if total else None,
+                "reference_values": total,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path)
+    parser.add_argument("--strategies", default="single,grouped,fanout,auto")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    rows = asyncio.run(benchmark(args.corpus, [name.strip() for name in args.strategies.split(",")]))
+
+    print(f"{'archive':<20}{'demandée':<10}{'retenue':<10}{'appels':>7}{'tokens in':>11}{'tokens out':>11}"
+          f"{'coût $':>10}{'durée s':>9}{'rappel':>8}{'estim. $':>10}{'estim. s':>10}")
+    for row in rows:
+        recall_value = f"{row['recall']:.2f}" if row["recall"] is not None else "-"
+        # Estimation du planificateur pour la stratégie retenue
+        estimate = row["plan"]["estimates"][row["strategy"]] if row["plan"] else None
+        estimated = f"{estimate['cost_usd']:>10.4f}{estimate['wall_seconds']:>10.1f}" if estimate else f"{'-':>10}{'-':>10}"
+        print(f"{row['archive']:<20}{row['requested']:<10}{row['strategy']:<10}{row['calls']:>7}"
+              f"{row['input_tokens']:>11}{row['output_tokens']:>11}{row['cost_usd']:>10.4f}"
+              f"{row['wall_seconds']:>9.1f}{recall_value:>8}{estimated}")
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(rows, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
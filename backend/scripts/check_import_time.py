@@ -0,0 +1,67 @@
+"""Vérifie le budget de temps d'import de l'application (démarrage à froid des workers).
+
+Usage :
+    python scripts/check_import_time.py [--budget-ms 800] [--module main]
+
+Le module est importé dans un interpréteur neuf avec `python -X importtime`. Le script échoue si :
+- le temps d'import cumulé dépasse le budget (IMPORT_TIME_BUDGET_MS, 800 ms par défaut) ;
+- un module lourd, qui doit n'être importé qu'au premier usage, est chargé au démarrage.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules à n'importer qu'à la première utilisation
+LAZY_MODULES = ["anthropic", "boto3", "docx", "fitz", "numpy", "openai", "openpyxl", "pandas", "pdfplumber"]
+
+
+def measure(module: str):
+    """Retourne le temps cumulé d'import du module (ms) et la liste des modules de premier niveau importés."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"L'import de '{module}' a échoué :\n{completed.stderr}")
+
+    cumulative_us = 0
+    imported = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "800")))
+    parser.add_argument("--module", default="main")
+    args = parser.parse_args()
+
+    import_ms, imported = measure(args.module)
+    eager = sorted(module for module in LAZY_MODULES if module in imported)
+
+    print(f"Import de '{args.module}' : {import_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if import_ms > args.budget_ms:
+        print("Budget dépassé.")
+        failed = True
+    if eager:
+        print(f"Modules importés au démarrage au lieu d'être différés : {', '.join(eager)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare l'extraction locale (rule_extraction) aux réponses du modèle sur un corpus de DCE.
+
+Usage :
+    python scripts/evaluate_rule_extraction.py <dossier_corpus> [--run-llm]
+
+Le dossier contient des archives `*.zip`. Pour chaque archive `X.zip`, les réponses de référence
+du modèle sont lues dans `X.llm.json` ({fichier: {champ: [valeurs]}}). Avec `--run-llm`, les
+références manquantes sont produites en appelant le modèle avec le prompt et le schéma complets
+(sans extraction locale), puis enregistrées pour les exécutions suivantes.
+
+Pour chaque champ couvert par une règle, le script affiche :
+- la précision : part des valeurs extraites localement retrouvées dans la réponse du modèle ;
+- le rappel : part des valeurs du modèle retrouvées par l'extraction locale.
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from file_extraction import extract_files_from_zip, extract_text_from_file  # noqa: E402
+from rule_extraction import RULES, extract_structured_fields  # noqa: E402
+
+MATCH_THRESHOLD = 0.6
+
+
+def normalize(value: str) -> set:
+    return set(re.findall(r"\w+", str(value).lower()))
+
+
+def matches(value: str, candidates) -> bool:
+    """Deux valeurs correspondent si l'une contient l'autre ou si leurs mots se recouvrent suffisamment."""
+    words = normalize(value)
+    if not words:
+        return False
+    for candidate in candidates:
+        other = normalize(candidate)
+        if not other:
+            continue
+        if words <= other or other <= words:
+            return True
+        if len(words & other) / len(words | other) >= MATCH_THRESHOLD:
+            return True
+    return False
+
+
+async def build_reference(client, texts):
+    from analyze import analyze_content_with_gpt, merge_results
+
+    reference = {}
+    for file_name, text in texts.items():
+        result = await analyze_content_with_gpt(client, file_name.lower(), text, use_rules=False)
+        reference[file_name] = merge_results([result])
+    return reference
+
+
+async def evaluate(corpus: Path, run_llm: bool):
+    client = None
+    if run_llm:
+        from dotenv import load_dotenv
+        from FileAnalyzerRegistry import FileAnalyzerRegistry
+        from LLMRouter import LLMRouter
+
+        load_dotenv()
+        client = LLMRouter.from_env()
+        FileAnalyzerRegistry.initialize_registry()
+
+    # champ -> [valeurs locales, valeurs locales confirmées, valeurs modèle, valeurs modèle retrouvées]
+    counts = defaultdict(lambda: [0, 0, 0, 0])
+
+    for archive in sorted(corpus.glob("*.zip")):
+        with open(archive, "rb") as f:
+            processed_files, _, _ = extract_files_from_zip(f)
+        texts = {file["filename"]: extract_text_from_file(file) for file in processed_files}
+
+        reference_path = archive.with_suffix(".llm.json")
+        if reference_path.exists():
+            reference = json.loads(reference_path.read_text(encoding="utf-8"))
+        elif run_llm:
+            reference = await build_reference(client, texts)
+            reference_path.write_text(json.dumps(reference, ensure_ascii=False, indent=2), encoding="utf-8")
+        else:
+            print(f"Référence absente pour {archive.name}, archive ignorée (utiliser --run-llm).")
+            continue
+
+        for file_name, text in texts.items():
+            llm_fields = reference.get(file_name, {})
+            local_fields = extract_structured_fields(text, llm_fields.keys())
+            for field in RULES:
+                if field not in llm_fields:
+                    continue
+                local_values = local_fields.get(field, [])
+                llm_values = [v for v in llm_fields[field] if v]
+                counts[field][0] += len(local_values)
+                counts[field][1] += sum(matches(v, llm_values) for v in local_values)
+                counts[field][2] += len(llm_values)
+                counts[field][3] += sum(matches(v, local_values) for v in llm_values)
+
+    print(f"{'champ':<25}{'local':>8}{'modèle':>8}{'précision':>12}{'rappel':>10}{'complet':>9}")
+    for field, (local, confirmed, llm, found) in sorted(counts.items()):
+        precision = confirmed / local if local else float("nan")
+        recall = found / llm if llm else float("nan")
+        print(f"{field:<25}{local:>8}{llm:>8}{precision:>12.2f}{recall:>10.2f}{str(RULES[field].satisfies):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path)
+    parser.add_argument("--run-llm", action="store_true", help="Produire les références manquantes avec le modèle")
+    args = parser.parse_args()
+    asyncio.run(evaluate(args.corpus, args.run_llm))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Test de charge de l'API : rejoue un corpus de DCE (archives ZIP) contre un backend lancé.
+
+Usage :
+    python scripts/load_test.py <dossier_corpus> [--url http://localhost:8000]
+        [--concurrency 8] [--rate 0.5] [--requests 100 | --duration 300]
+        [--mode read-file|upload] [--output resultats.json]
+
+Préparation, pour mesurer le service et non l'API OpenAI :
+    python scripts/mock_openai.py --latency-ms 3000 &
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=mock WEEKLY_REQUEST_LIMIT=1000000 \\
+        gunicorn -c gunicorn.conf.py main:app
+
+Les requêtes arrivent selon un processus de Poisson de débit --rate (requêtes/s) ; avec --rate 0,
+chacun des --concurrency clients renvoie une requête dès la précédente terminée. --concurrency
+borne toujours le nombre de requêtes en cours : en boucle ouverte, une requête qui attend une place
+compte cette attente dans sa latence, mesurée depuis son instant d'arrivée prévu (sans quoi un
+service saturé paraîtrait rapide). Les archives sont lues avant le test. `--mode upload` passe par
+le dépôt direct dans MinIO (/uploads puis /analyze-upload) au lieu de /read-file.
+
+Pendant le test, /metrics/runtime est interrogé toutes les --sample-interval secondes : chaque
+réponse vient d'un worker, la mémoire affichée est la somme du dernier RSS connu de chaque
+worker, et la mémoire du conteneur (cgroup) quand elle est disponible. À la fin, le script
+affiche les latences p50/p95/p99, les taux d'erreur par statut, le débit, le retard maximal de
+la boucle d'événements et le pic mémoire.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+MB = 1024 * 1024
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoadTest:
+    def __init__(self, args, archives):
+        self.args = args
+        self.archives = archives
+        # Lues une fois pour toutes : ni disque ni lecture bloquante pendant la mesure
+        self.contents = {archive: archive.read_bytes() for archive in archives}
+        self.records = []
+        self.samples = []
+        self.workers = {}
+        self.inflight = 0
+        self.started = None
+        self.stopping = False
+
+    async def send(self, client: httpx.AsyncClient, archive: Path):
+        content = self.contents[archive]
+        if self.args.mode == "upload":
+            upload = (await client.post("uploads")).raise_for_status().json()
+            (await client.post(upload["url"], data=upload["fields"], files={"file": (archive.name, content, "application/zip")})).raise_for_status()
+            return await client.post("analyze-upload", data={"object_key": upload["object_key"]})
+        return await client.post("read-file", files={"zip_file": (archive.name, content, "application/zip")})
+
+    async def run_one(self, client, semaphore, archive, arrival=None):
+        # Latence mesurée depuis l'arrivée prévue de la requête, attente d'une place comprise
+        start = arrival if arrival is not None else time.monotonic()
+        async with semaphore:
+            self.inflight += 1
+            sent = time.monotonic()
+            status = None
+            try:
+                response = await self.send(client, archive)
+                status = response.status_code
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            finally:
+                self.inflight -= 1
+            self.records.append({
+                "archive": archive.name,
+                "start": start - self.started,
+                "queued": sent - start,
+                "latency": time.monotonic() - start,
+                "status": status,
+            })
+
+    def next_archive(self):
+        return random.choice(self.archives)
+
+    def finished_sending(self, sent):
+        if self.args.requests is not None and sent >= self.args.requests:
+            return True
+        return self.args.duration is not None and time.monotonic() - self.started >= self.args.duration
+
+    async def open_loop(self, client, semaphore):
+        tasks = []
+        sent = 0
+        # Instants d'arrivée calculés à l'avance : un retard de la boucle ne décale pas les suivants
+        arrival = self.started
+        while not self.finished_sending(sent):
+            await asyncio.sleep(max(0.0, arrival - time.monotonic()))
+            tasks.append(asyncio.create_task(self.run_one(client, semaphore, self.next_archive(), arrival)))
+            sent += 1
+            arrival += random.expovariate(self.args.rate)
+        await asyncio.gather(*tasks)
+
+    async def closed_loop(self, client, semaphore):
+        sent = 0
+
+        async def user():
+            nonlocal sent
+            while not self.finished_sending(sent):
+                sent += 1
+                await self.run_one(client, semaphore, self.next_archive())
+
+        await asyncio.gather(*(user() for _ in range(self.args.concurrency)))
+
+    async def sample_metrics(self, client):
+        while not self.stopping:
+            start = time.monotonic()
+            try:
+                metrics = (await client.get("metrics/runtime", timeout=10)).json()
+            except httpx.HTTPError:
+                metrics = None
+            response_time = time.monotonic() - start
+            if metrics is not None:
+                self.workers[metrics["pid"]] = metrics
+                sample = {
+                    "t": round(time.monotonic() - self.started, 1),
+                    "completed": len(self.records),
+                    "inflight": self.inflight,
+                    "errors": sum(1 for record in self.records if record["status"] != 200),
+                    "workers": len(self.workers),
+                    "rss_mb": round(sum(worker["rss_bytes"] for worker in self.workers.values()) / MB, 1),
+                    "container_mb": round(metrics["container_memory_bytes"] / MB, 1) if metrics["container_memory_bytes"] else None,
+                    "loop_lag_p99_ms": metrics["loop_lag"]["p99_ms"],
+                    "loop_lag_max_ms": max((worker["loop_lag"]["max_ms"] or 0) for worker in self.workers.values()),
+                    "metrics_response_ms": round(response_time * 1000, 1),
+                }
+                self.samples.append(sample)
+                if not self.args.quiet:
+                    print(
+                        f"[{sample['t']:>6}s] terminées={sample['completed']} en cours={sample['inflight']} "
+                        f"erreurs={sample['errors']} rss={sample['rss_mb']} Mo ({sample['workers']} worker(s)) "
+                        f"retard boucle p99={sample['loop_lag_p99_ms']} ms max={sample['loop_lag_max_ms']} ms",
+                        flush=True,
+                    )
+            await asyncio.sleep(max(0.0, self.args.sample_interval - response_time))
+
+    async def run(self):
+        timeout = httpx.Timeout(self.args.timeout, connect=10)
+        limits = httpx.Limits(max_connections=self.args.concurrency + 2)
+        async with httpx.AsyncClient(base_url=self.args.url, timeout=timeout, limits=limits) as client:
+            semaphore = asyncio.Semaphore(self.args.concurrency)
+            self.started = time.monotonic()
+            sampler = asyncio.create_task(self.sample_metrics(client))
+            if self.args.rate > 0:
+                await self.open_loop(client, semaphore)
+            else:
+                await self.closed_loop(client, semaphore)
+            elapsed = time.monotonic() - self.started
+            self.stopping = True
+            await sampler
+        return elapsed
+
+    def summary(self, elapsed):
+        latencies = [record["latency"] for record in self.records if record["status"] == 200]
+        statuses = Counter(str(record["status"]) for record in self.records)
+        errors = sum(count for status, count in statuses.items() if status != "200")
+        container = [sample["container_mb"] for sample in self.samples if sample["container_mb"] is not None]
+        return {
+            "requests": len(self.records),
+            "duration_seconds": round(elapsed, 1),
+            "throughput_per_minute": round(len(latencies) / elapsed * 60, 2) if elapsed else None,
+            "concurrency": self.args.concurrency,
+            "rate": self.args.rate,
+            "queued_max_seconds": round(max((record["queued"] for record in self.records), default=0.0), 2),
+            "latency_seconds": {
+                name: round(value, 2) if value is not None else None
+                for name, value in (
+                    ("p50", percentile(latencies, 0.50)),
+                    ("p95", percentile(latencies, 0.95)),
+                    ("p99", percentile(latencies, 0.99)),
+                    ("max", max(latencies, default=None)),
+                )
+            },
+            "error_rate": round(errors / len(self.records), 3) if self.records else None,
+            "statuses": dict(statuses),
+            "loop_lag_max_ms": max((sample["loop_lag_max_ms"] for sample in self.samples), default=None),
+            "peak_rss_mb": max((sample["rss_mb"] for sample in self.samples), default=None),
+            "peak_container_mb": max(container, default=None),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path)
+    parser.add_argument("--url", default="http://localhost:8000/")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.0, help="requêtes/s (0 : boucle fermée)")
+    parser.add_argument("--requests", type=int, default=None)
+    parser.add_argument("--duration", type=float, default=None, help="durée d'envoi en secondes")
+    parser.add_argument("--mode", choices=["read-file", "upload"], default="read-file")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--sample-interval", type=float, default=2.0)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    archives = sorted(args.corpus.glob("*.zip"))
+    if not archives:
+        sys.exit(f"Aucune archive .zip dans {args.corpus}")
+    if args.requests is None and args.duration is None:
+        args.requests = len(archives)
+
+    test = LoadTest(args, archives)
+    elapsed = asyncio.run(test.run())
+    summary = test.summary(elapsed)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(
+            {"summary": summary, "samples": test.samples, "requests": test.records}, indent=2, ensure_ascii=False
+        ))
+
+
+if __name__ == "__main__":
+    main()
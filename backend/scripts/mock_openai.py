@@ -0,0 +1,141 @@
+"""Serveur OpenAI simulé pour les tests de charge : répond à /v1/chat/completions avec un JSON
+conforme au schéma demandé (response_format), après une latence réglable.
+
+Usage :
+    python scripts/mock_openai.py [--port 8100] [--latency-ms 3000] [--sigma 0.4] [--error-rate 0] [--first-token-ms 300]
+
+Puis lancer le backend avec :
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=mock gunicorn -c gunicorn.conf.py main:app
+
+La latence suit une loi log-normale de médiane --latency-ms (dispersion --sigma, 0 pour une
+latence fixe). Une part --error-rate des appels répond 429 ou 500, comme l'API réelle sous charge.
+Les requêtes en streaming (stream: true) reçoivent le premier fragment après --first-token-ms,
+puis le reste de la réponse réparti sur la latence tirée.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+settings = argparse.Namespace(latency_ms=3000.0, sigma=0.4, error_rate=0.0, completion_tokens=400, first_token_ms=300.0)
+STREAM_FRAGMENT_SIZE = 16
+
+
+def sample_value(schema: dict, definitions: dict):
+    """Construit une valeur minimale mais valide pour un schéma JSON (sous-ensemble utilisé par pydantic)."""
+    if "$ref" in schema:
+        return sample_value(definitions[schema["$ref"].split("/")[-1]], definitions)
+    if "anyOf" in schema:
+        return sample_value(schema["anyOf"][0], definitions)
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    schema_type = schema.get("type")
+    if schema_type == "object":
+        return {name: sample_value(child, definitions) for name, child in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        return [sample_value(schema.get("items", {}), definitions)]
+    if schema_type == "integer":
+        return 1
+    if schema_type == "number":
+        return 1.0
+    if schema_type == "boolean":
+        return True
+    if schema_type == "null":
+        return None
+    return "valeur simulée"
+
+
+def completion_content(body: dict) -> str:
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema = response_format["json_schema"]["schema"]
+        return json.dumps(sample_value(schema, schema.get("$defs", {})), ensure_ascii=False)
+    return "Réponse simulée."
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    delay = settings.latency_ms / 1000
+    if settings.sigma > 0:
+        delay *= random.lognormvariate(0, settings.sigma)
+    first_token = min(delay, settings.first_token_ms / 1000) if body.get("stream") else delay
+    await asyncio.sleep(first_token)
+
+    if random.random() < settings.error_rate:
+        status = random.choice([429, 500])
+        return JSONResponse(status_code=status, content={"error": {"message": "Erreur simulée", "type": "mock", "code": status}})
+
+    prompt_tokens = sum(len(str(message.get("content", ""))) for message in body.get("messages", [])) // 4
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": settings.completion_tokens,
+        "total_tokens": prompt_tokens + settings.completion_tokens,
+    }
+    header = {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+    }
+    if body.get("stream"):
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        return StreamingResponse(
+            stream_chunks(header, completion_content(body), delay - first_token, usage if include_usage else None),
+            media_type="text/event-stream",
+        )
+    return {
+        **header,
+        "object": "chat.completion",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": completion_content(body), "refusal": None},
+            "finish_reason": "stop",
+            "logprobs": None,
+        }],
+        "usage": usage,
+    }
+
+
+async def stream_chunks(header: dict, content: str, duration: float, usage):
+    """Réponse découpée en fragments au format SSE de l'API, répartis sur `duration` secondes."""
+    def event(choices, **extra):
+        return "data: " + json.dumps({**header, "object": "chat.completion.chunk", "choices": choices, **extra}) + "\n\n"
+
+    fragments = [content[i:i + STREAM_FRAGMENT_SIZE] for i in range(0, len(content), STREAM_FRAGMENT_SIZE)]
+    for index, fragment in enumerate(fragments):
+        if index:
+            await asyncio.sleep(duration / len(fragments))
+        delta = {"content": fragment} if index else {"role": "assistant", "content": fragment}
+        yield event([{"index": 0, "delta": delta, "finish_reason": None, "logprobs": None}])
+    yield event([{"index": 0, "delta": {}, "finish_reason": "stop", "logprobs": None}])
+    if usage is not None:
+        yield event([], usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=3000.0)
+    parser.add_argument("--sigma", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int, default=400)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    for name in ("latency_ms", "sigma", "error_rate", "completion_tokens", "first_token_ms"):
+        setattr(settings, name, getattr(args, name))
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
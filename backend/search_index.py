@@ -0,0 +1,165 @@
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# Index plein texte (SQLite FTS5) des analyses passées :
+# - tender_values : une ligne par valeur du résultat fusionné, avec son champ (penalites,
+#   formule_revision, criteres_attribution, ...) pour pouvoir chercher dans un champ donné. Le
+#   champ est une colonne indexée (« _ » compris dans les mots : un nom de champ est un seul
+#   terme) : la recherche dans un champ est un filtre de colonne de la requête FTS5, le
+#   classement BM25 et la limite portent sur les seules valeurs de ce champ ;
+# - tender_documents : le texte extrait de chaque fichier du DCE.
+# L'ingestion est incrémentale : seules les valeurs de l'appel d'offres analysé et les textes
+# des fichiers ajoutés, modifiés ou supprimés sont réécrits.
+DB_NAME = "search.sqlite"
+DOCUMENTS_FIELD = "texte"
+TOKENIZER = "unicode61 remove_diacritics 2"
+VALUES_TOKENIZER = f"{TOKENIZER} tokenchars '_'"
+VALUES_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS tender_values USING fts5("
+    f"tender_id UNINDEXED, field, value, tokenize=\"{VALUES_TOKENIZER}\")"
+)
+
+SCHEMA = [
+    VALUES_TABLE,
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS tender_documents USING fts5("
+    f"tender_id UNINDEXED, file_name UNINDEXED, text, tokenize='{TOKENIZER}')",
+    "CREATE TABLE IF NOT EXISTS tenders (tender_id TEXT PRIMARY KEY, version INTEGER, indexed_at TEXT)",
+]
+
+TERM = re.compile(r"\w+\*?")
+
+_schema_ready = False
+
+
+def _connect():
+    global _schema_ready
+    connection = connect(DB_NAME)
+    if not _schema_ready:
+        _migrate_values_table(connection)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        _schema_ready = True
+    return connection
+
+
+def _migrate_values_table(connection):
+    # Index créé avant l'indexation du champ (field UNINDEXED) : reconstruit avec ses valeurs
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        row = connection.execute("SELECT sql FROM sqlite_master WHERE name = 'tender_values'").fetchone()
+        if row is not None and "field UNINDEXED" in row[0]:
+            logger.info("Reconstruction de l'index des valeurs avec le champ indexé")
+            connection.execute("ALTER TABLE tender_values RENAME TO tender_values_old")
+            connection.execute(VALUES_TABLE)
+            connection.execute(
+                "INSERT INTO tender_values (tender_id, field, value) SELECT tender_id, field, value FROM tender_values_old"
+            )
+            connection.execute("DROP TABLE tender_values_old")
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+
+def to_match_query(query: str) -> Optional[str]:
+    """Transforme la saisie libre en requête FTS5 : chaque mot doit apparaître, `mot*` cherche un préfixe."""
+    terms = []
+    for term in TERM.findall(query):
+        prefix = term.endswith("*")
+        terms.append(f'"{term.rstrip("*")}"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+
+def index_document(tender_id: str, file_name: str, text: str):
+    """(Ré)indexe le texte extrait d'un fichier du DCE."""
+    connection = _connect()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute(
+            "DELETE FROM tender_documents WHERE tender_id = ? AND file_name = ?", (tender_id, file_name)
+        )
+        if text:
+            connection.execute(
+                "INSERT INTO tender_documents (tender_id, file_name, text) VALUES (?, ?, ?)",
+                (tender_id, file_name, text),
+            )
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+
+def index_tender(tender_id: str, version: int, merged: Dict[str, List[Any]], removed_files: Iterable[str] = ()):
+    """Remplace les valeurs indexées d'un appel d'offres par son dernier résultat fusionné."""
+    connection = _connect()
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute("DELETE FROM tender_values WHERE tender_id = ?", (tender_id,))
+        connection.executemany(
+            "INSERT INTO tender_values (tender_id, field, value) VALUES (?, ?, ?)",
+            [
+                (tender_id, field, str(value))
+                for field, values in merged.items()
+                for value in values
+                if value
+            ],
+        )
+        connection.executemany(
+            "DELETE FROM tender_documents WHERE tender_id = ? AND file_name = ?",
+            [(tender_id, file_name) for file_name in removed_files],
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO tenders (tender_id, version, indexed_at) VALUES (?, ?, ?)",
+            (tender_id, version, datetime.utcnow().isoformat()),
+        )
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+
+def search(query: str, field: Optional[str] = None, tender_id: Optional[str] = None, limit: int = 20):
+    """Recherche classée (BM25) dans les valeurs d'un champ, dans tous les champs (field=None)
+    ou dans le texte des documents (field="texte")."""
+    match_query = to_match_query(query)
+    if match_query is None:
+        return []
+
+    if field == DOCUMENTS_FIELD:
+        sql = (
+            "SELECT tender_id, ?, file_name, snippet(tender_documents, 2, '[', ']', '…', 16), "
+            "bm25(tender_documents) AS score FROM tender_documents WHERE tender_documents MATCH ?"
+        )
+        params = [DOCUMENTS_FIELD, match_query]
+    else:
+        # Termes cherchés dans les valeurs seulement, champ éventuel en filtre de colonne ;
+        # le nom du champ ne compte pas dans le score
+        match_query = f"value : ({match_query})"
+        if field is not None:
+            quoted_field = field.replace('"', '""')
+            match_query = f'field : "{quoted_field}" AND {match_query}'
+        sql = (
+            "SELECT tender_id, field, NULL, snippet(tender_values, 2, '[', ']', '…', 16), "
+            "bm25(tender_values, 0.0, 0.0, 1.0) AS score FROM tender_values WHERE tender_values MATCH ?"
+        )
+        params = [match_query]
+    if tender_id is not None:
+        sql += " AND tender_id = ?"
+        params.append(tender_id)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+
+    connection = _connect()
+    try:
+        rows = connection.execute(sql, params).fetchall()
+    finally:
+        connection.close()
+
+    return [
+        {"tender_id": row[0], "field": row[1], "file_name": row[2], "snippet": row[3], "score": -row[4]}
+        for row in rows
+    ]
@@ -0,0 +1,15 @@
+import os
+import sqlite3
+
+# Répertoire des bases SQLite locales. Il est partagé par tous les workers d'un même conteneur ;
+# le monter sur un volume pour conserver les données entre deux déploiements.
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+
+def connect(file_name: str) -> sqlite3.Connection:
+    """Ouvre une base du répertoire de données, en mode WAL pour les accès concurrents entre workers."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    connection = sqlite3.connect(os.path.join(DATA_DIR, file_name), timeout=30, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA busy_timeout=30000")
+    return connection
@@ -0,0 +1,121 @@
+import json
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Lecture incrémentale d'un objet JSON généré au fil de l'eau par un modèle :
+#   {"penalites": ["...", "..."], "duree_marche": ["..."], ...}
+# Chaque élément d'une liste de premier niveau est émis dès qu'il est complet (valeur scalaire
+# ou objet), sans attendre la fin de la réponse ; un champ qui n'est pas une liste est émis
+# quand sa valeur est complète.
+OnItem = Callable[[str, Any], None]
+
+
+class IncrementalJSONParser:
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.key: Optional[str] = None
+        self.key_chars: Optional[List[str]] = None
+        self.after_colon = False
+        self.in_array = False
+        # Caractères de l'élément (ou de la valeur) en cours, et profondeur à laquelle il se termine
+        self.item: Optional[List[str]] = None
+        self.item_depth = 0
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consomme un fragment de la réponse et retourne les (champ, valeur) complétés."""
+        completed = []
+        for char in text:
+            self._consume(char, completed)
+        return completed
+
+    def _emit(self, completed):
+        raw = "".join(self.item).strip()
+        self.item = None
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            logger.debug(f"Élément JSON illisible pour '{self.key}' : {raw[:80]}")
+            return
+        if value is not None:
+            completed.append((self.key, value))
+
+    def _consume(self, char: str, completed):
+        if self.in_string:
+            if self.item is not None:
+                self.item.append(char)
+            if self.escape:
+                self.escape = False
+            elif char == "\\":
+                self.escape = True
+            elif char == '"':
+                self.in_string = False
+                if self.key_chars is not None:
+                    self.key = json.loads('"' + "".join(self.key_chars) + '"')
+                    self.key_chars = None
+                    return
+            if self.key_chars is not None:
+                self.key_chars.append(char)
+            return
+
+        if self.item is not None:
+            # Fin de l'élément : séparateur ou fermeture au niveau où il a commencé
+            if self.depth == self.item_depth and char in ",]}":
+                self._emit(completed)
+            else:
+                self.item.append(char)
+                if char == '"':
+                    self.in_string = True
+                elif char in "[{":
+                    self.depth += 1
+                elif char in "]}":
+                    self.depth -= 1
+                return
+
+        if self.depth == 0:
+            if char == "{":
+                self.depth = 1
+        elif self.depth == 1 and not self.after_colon:
+            if char == '"':
+                self.in_string = True
+                self.key_chars = []
+            elif char == ":":
+                self.after_colon = True
+            elif char == "}":
+                self.depth = 0
+        elif self.depth == 1:
+            if char.isspace():
+                return
+            self.after_colon = False
+            if char == "[":
+                self.depth = 2
+                self.in_array = True
+            else:
+                self._start_item(char, 1)
+        elif self.depth == 2 and self.in_array:
+            if char == "]":
+                self.depth = 1
+                self.in_array = False
+            elif not char.isspace() and char != ",":
+                self._start_item(char, 2)
+
+    def _start_item(self, char: str, depth: int):
+        self.item = [char]
+        self.item_depth = depth
+        if char == '"':
+            self.in_string = True
+        elif char in "[{":
+            self.depth += 1
+
+
+def emit_fields(data: dict, on_item: OnItem):
+    """Émet les éléments d'une réponse complète, pour les fournisseurs sans streaming."""
+    for field, value in data.items():
+        if isinstance(value, list):
+            for item in value:
+                on_item(field, item)
+        elif value is not None:
+            on_item(field, value)
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Le manifeste d'un appel d'offres garde, pour chaque fichier du DCE, l'empreinte SHA-256
+# du contenu et le résultat d'analyse correspondant, ainsi que le dernier résultat fusionné.
+# Il est stocké dans MinIO pour être partagé entre les workers et les conteneurs.
+TENDER_BUCKET = os.getenv("MINIO_BUCKET_NAME", "gonogo")
+
+
+def manifest_key(tender_id: str) -> str:
+    return f"tenders/{tender_id}/manifest.json"
+
+
+def new_manifest(tender_id: str) -> Dict[str, Any]:
+    return {"tender_id": tender_id, "version": 0, "files": {}, "merged": {}}
+
+
+async def load_manifest(tender_id: str) -> Optional[Dict[str, Any]]:
+    """Charge le manifeste d'un appel d'offres. Retourne None s'il n'existe pas ou n'est pas lisible."""
+    from s3_config import get_json_object  # boto3 n'est importé qu'au premier accès à MinIO
+
+    try:
+        return await asyncio.to_thread(get_json_object, TENDER_BUCKET, manifest_key(tender_id))
+    except Exception as e:
+        logger.error(f"Impossible de lire le manifeste de '{tender_id}': {e}")
+        return None
+
+
+async def save_manifest(manifest: Dict[str, Any]) -> bool:
+    from s3_config import ensure_bucket, put_json_object
+
+    tender_id = manifest["tender_id"]
+    try:
+        await asyncio.to_thread(ensure_bucket, TENDER_BUCKET)
+        await asyncio.to_thread(put_json_object, TENDER_BUCKET, manifest_key(tender_id), manifest)
+        return True
+    except Exception as e:
+        # L'analyse reste valide : seul le prochain dépôt devra tout ré-analyser
+        logger.error(f"Impossible d'enregistrer le manifeste de '{tender_id}': {e}")
+        return False
+
+
+def classify_file(manifest: Dict[str, Any], file_name: str, file_hash: str) -> str:
+    """Compare un fichier d'un nouveau dépôt à l'empreinte du manifeste : added, modified ou unchanged."""
+    entry = manifest.get("files", {}).get(file_name)
+    if entry is None:
+        return "added"
+    return "unchanged" if entry["sha256"] == file_hash else "modified"
+
+
+def diff_fields(previous: Optional[Dict[str, list]], merged: Dict[str, list]) -> List[str]:
+    """Liste les champs du résultat fusionné dont les valeurs ont changé (l'ordre des valeurs est ignoré)."""
+    if previous is None:
+        return sorted(key for key, value in merged.items() if value)
+
+    keys = set(previous) | set(merged)
+    return sorted(
+        key for key in keys
+        if set(map(str, previous.get(key, []))) != set(map(str, merged.get(key, [])))
+    )
@@ -0,0 +1,70 @@
+import copy
+import functools
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+# Les modules du backend sont importés à plat, comme depuis main.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Bases SQLite (index, consommation, points de reprise) dans un répertoire temporaire."""
+    import chunk_checkpoints
+    import search_index
+    import usage_accounting
+
+    monkeypatch.setattr("sqlite_store.DATA_DIR", str(tmp_path))
+    for module in (chunk_checkpoints, search_index, usage_accounting):
+        monkeypatch.setattr(module, "_schema_ready", False)
+    return tmp_path
+
+
+@pytest.fixture
+def manifests(data_dir, monkeypatch):
+    """Manifestes des appels d'offres gardés en mémoire au lieu de MinIO."""
+    import pipeline
+
+    store = {}
+
+    async def load(tender_id):
+        return copy.deepcopy(store.get(tender_id))
+
+    async def save(manifest):
+        store[manifest["tender_id"]] = copy.deepcopy(manifest)
+        return True
+
+    monkeypatch.setattr(pipeline, "load_manifest", load)
+    monkeypatch.setattr(pipeline, "save_manifest", save)
+    return store
+
+
+# Mémorisé : le document Word horodate sa création, deux rendus du même texte n'auraient pas la même empreinte
+@functools.lru_cache(maxsize=None)
+def docx_bytes(*paragraphs: str) -> bytes:
+    import docx
+
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def tender_zip():
+    """Construit une archive de DCE : {nom: texte (document Word) ou octets (contenu brut)}."""
+
+    def build(files) -> bytes:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as z:
+            for name, content in files.items():
+                z.writestr(name, content if isinstance(content, bytes) else docx_bytes(content))
+        return buffer.getvalue()
+
+    return build
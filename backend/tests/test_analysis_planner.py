@@ -0,0 +1,61 @@
+import pytest
+
+from analysis_planner import PlannedDocument, Planner, group_output_tokens, wall_seconds
+from LLMRouter import LLMRouter
+from Providers.FakeProvider import FakeProvider
+
+PROVIDER = FakeProvider(input_cost=0.15, output_cost=0.6)
+
+
+def documents(count: int, analyzer: str = "CCAP", tokens: int = 800, chunks: int = 1, fields: int = 28):
+    return [
+        PlannedDocument(f"{analyzer.lower()}_{index}.pdf", analyzer, 1500, tokens, fields, chunks)
+        for index in range(count)
+    ]
+
+
+def test_merged_call_emits_each_field_once():
+    ccap = documents(3)
+    cctp = documents(2, "CCTP", fields=20)
+    assert group_output_tokens(ccap) == group_output_tokens(ccap[:1])
+    assert group_output_tokens(ccap + cctp) == group_output_tokens(ccap[:1]) + group_output_tokens(cctp[:1])
+
+
+def test_calls_are_spread_over_workers_longest_first():
+    assert wall_seconds([5, 4, 3, 3, 3], 2) == 10
+    assert wall_seconds([5, 4, 3], 8) == 5
+    assert wall_seconds([], 8) == 0
+
+
+@pytest.mark.parametrize("tender, strategy", [
+    # Petits documents d'un même type : le prompt et la sortie ne sont payés qu'une fois
+    (documents(6), "single"),
+    # Trop de texte pour un appel, documents regroupés en deux appels parallèles plutôt que 36 chunks
+    (documents(12, tokens=6000, chunks=3), "grouped"),
+    # Documents de types différents : leurs réponses sont générées en parallèle
+    (documents(1) + documents(1, "CCTP") + documents(1, "BPU"), "fanout"),
+    # Document trop long pour un appel : découpé quelle que soit la stratégie
+    (documents(1, tokens=60000, chunks=30), "fanout"),
+])
+def test_each_strategy_wins_where_it_should(tender, strategy):
+    plan = Planner(PROVIDER, concurrency=8).plan(tender, "auto")
+    assert plan.strategy == strategy
+    scores = {name: estimate.score for name, estimate in plan.estimates.items() if estimate.feasible}
+    assert min(scores, key=scores.get) == strategy
+
+
+def test_grouped_calls_fit_the_call_limit():
+    planner = Planner(PROVIDER, concurrency=8)
+    plan = planner.plan(documents(12, tokens=6000, chunks=3), "grouped")
+    assert [len(group) for group in plan.groups] == [6, 6]
+    assert all(planner.fits(group) for group in plan.groups)
+    assert not plan.estimates["single"].feasible
+    # Stratégie imposée impossible : choix automatique
+    assert planner.plan(documents(1, tokens=60000, chunks=30), "single").strategy == "fanout"
+
+
+def test_planner_uses_the_best_provider_without_exploration():
+    cheap = FakeProvider("cheap", input_cost=0.15, output_cost=0.6)
+    costly = FakeProvider("costly", input_cost=3, output_cost=15)
+    router = LLMRouter([costly, cheap], exploration_rate=1, seed=1)
+    assert {Planner.for_client(router, 8).provider.name for _ in range(20)} == {"cheap"}
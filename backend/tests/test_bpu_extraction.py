@@ -0,0 +1,72 @@
+import io
+import math
+
+import openpyxl
+import pandas as pd
+
+from bpu_extraction import extract_bpu_table, to_numbers
+
+REMARK = "Les prix incluent les frais de déplacement et de restauration du personnel"
+
+
+def workbook_bytes(sheets) -> bytes:
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_french_numbers_are_parsed():
+    values = to_numbers(pd.Series(["1.234,50 €", "1 234,50", "25", "sans objet"]))
+    assert list(values[:3]) == [1234.5, 1234.5, 25.0]
+    assert math.isnan(values[3])
+
+
+def test_header_is_found_below_the_title_and_totals_are_computed():
+    content = workbook_bytes({
+        "Lot 1": [
+            ["Bordereau des prix unitaires"],
+            [],
+            ["Désignation", "Unité", "Quantité", "Prix unitaire HT", "Montant HT"],
+            ["Agent de sécurité", "h", 100, 25.5, None],
+            ["Chef d'équipe", "heure", "10", "30,00 €", None],
+            ["Fourniture de badges", "u", 5, 2, None],
+            # Ligne de total du classeur : non recomptée
+            ["Total HT", None, None, None, 9999],
+            [REMARK],
+        ],
+    })
+    extraction = extract_bpu_table(content)
+    assert extraction.fields["autres_details"] == [
+        "Lot 1 : 3 lignes de prix, montant total HT 2 860,00 €, volume horaire 110 h"
+    ]
+    assert extraction.satisfied == set()
+    assert extraction.remarks == f"Lot 1 :\n{REMARK}"
+
+
+def test_headcount_columns_satisfy_the_headcount_fields():
+    content = workbook_bytes({
+        "Effectifs": [
+            ["Poste", "Nombre d'agents", "CDI", "CDD"],
+            ["Jour", 4, 3, 1],
+            ["Nuit", 2, 2, 0],
+        ],
+        "Notes": [["Document sans tableau de prix"]],
+    })
+    extraction = extract_bpu_table(content)
+    assert extraction.fields["nombre_agents"] == [6]
+    assert extraction.fields["nombre_cdi"] == [5]
+    assert extraction.fields["nombre_cdd"] == [1]
+    assert extraction.satisfied == {"nombre_agents", "nombre_cdi", "nombre_cdd"}
+    assert extraction.fields["autres_details"] == ["Effectifs : 2 lignes de prix"]
+
+
+def test_workbook_without_a_price_table_is_read_as_text():
+    content = workbook_bytes({"Notes": [["Conditions générales"], [REMARK]]})
+    assert extract_bpu_table(content) is None
+    assert extract_bpu_table(b"pas un classeur") is None
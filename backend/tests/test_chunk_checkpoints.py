@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+import chunk_checkpoints
+from chunk_checkpoints import (
+    ERROR,
+    EXPIRED,
+    OK,
+    REFUSED,
+    ChunkCheckpoints,
+    RetryPolicy,
+    provider_call,
+    run_checkpointed,
+)
+from deadline import Deadline
+
+POLICY = RetryPolicy(attempts=3, backoff=0.01, retry_refusals=True)
+
+
+@pytest.fixture
+def checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr("sqlite_store.DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(chunk_checkpoints, "_schema_ready", False)
+    return ChunkCheckpoints("t1")
+
+
+def flaky(failures, result=None):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise RuntimeError("fournisseur indisponible")
+        return result
+
+    return calls, lambda: provider_call(call)
+
+
+def test_provider_errors_are_retried_and_checkpointed(checkpoints):
+    calls, call = flaky(2, {"penalites": ["A"]})
+    outcome = asyncio.run(run_checkpointed(call, "ccap.docx", 0, "k", checkpoints, POLICY))
+    assert (outcome.status, outcome.info, outcome.attempts, len(calls)) == (OK, {"penalites": ["A"]}, 3, 3)
+
+    # Au dépôt suivant, le chunk est repris sans appel
+    reloaded = ChunkCheckpoints("t1")
+    reloaded.load()
+    again = asyncio.run(run_checkpointed(call, "ccap.docx", 0, "k", reloaded, POLICY))
+    assert (again.status, again.attempts, len(calls)) == (OK, 0, 3)
+
+
+def test_exhausted_retries_and_refusals_are_reported(checkpoints):
+    calls, call = flaky(5)
+    outcome = asyncio.run(run_checkpointed(call, "ccap.docx", 1, "k1", checkpoints, POLICY))
+    assert (outcome.status, outcome.attempts, len(calls)) == (ERROR, 3, 3)
+    assert outcome.missing(1) == {"chunk": 1, "status": ERROR, "error": outcome.error, "attempts": 3}
+
+    calls, call = flaky(0, None)
+    outcome = asyncio.run(run_checkpointed(call, "ccap.docx", 2, "k2", checkpoints, RetryPolicy(3, 0.01, False)))
+    assert (outcome.status, len(calls)) == (REFUSED, 1)
+
+
+def test_errors_outside_the_provider_call_are_not_retried(checkpoints):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        raise ValueError("erreur d'ordonnancement")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_checkpointed(call, "ccap.docx", 0, "k", checkpoints, POLICY))
+    assert len(calls) == 1
+
+
+def test_failures_after_the_deadline_are_neither_retried_nor_recorded(checkpoints):
+    calls, call = flaky(5)
+    outcome = asyncio.run(run_checkpointed(call, "ccap.docx", 0, "k", checkpoints, POLICY, Deadline(0)))
+    assert (outcome.status, len(calls)) == (EXPIRED, 1)
+
+    checkpoints.load()
+    connection = chunk_checkpoints._connect()
+    try:
+        assert connection.execute("SELECT COUNT(*) FROM chunk_checkpoints").fetchone()[0] == 0
+    finally:
+        connection.close()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+
+from deadline import Deadline, LatencyTracker, hedged_call
+from llm_scheduler import FairScheduler
+from pipeline import analyze_tender
+from Providers.FakeProvider import FakeProvider
+from test_tender_manifest import CountingZipFile, marked_response
+
+
+def tracker_with(latency: float, samples: int = 5) -> LatencyTracker:
+    tracker = LatencyTracker(min_samples=samples)
+    for _ in range(samples):
+        tracker.record(latency)
+    return tracker
+
+
+def test_deadline_and_latency_percentile():
+    assert Deadline(0).expired
+    assert 9 < Deadline(10).remaining() <= 10
+
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record(1.0)
+    assert tracker.percentile(0.95) is None
+    tracker.record(2.0)
+    tracker.record(3.0)
+    assert tracker.percentile(0.5) == 2.0
+    assert tracker.percentile(0.95) == 3.0
+
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    calls, cancelled = [], []
+
+    async def call():
+        attempt = len(calls)
+        calls.append(attempt)
+        try:
+            await asyncio.sleep(1.0 if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return attempt
+
+    async def scenario():
+        start = time.monotonic()
+        result = await hedged_call(call, tracker_with(0.02))
+        await asyncio.sleep(0)
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(scenario())
+    assert (result, calls, cancelled) == (1, [0, 1], [0])
+    assert elapsed < 0.5
+
+
+def test_fast_call_is_not_hedged_and_errors_propagate():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "ok"
+
+    assert asyncio.run(hedged_call(call, tracker_with(1.0))) == "ok"
+    assert asyncio.run(hedged_call(call, LatencyTracker())) == "ok"
+    assert len(calls) == 2
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("indisponible")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedged_call(failing, tracker_with(0.01)))
+    # Appel initial et doublon ont échoué
+    assert len(calls) == 4
+
+
+def test_expired_deadline_returns_a_partial_result(manifests, tender_zip):
+    fast = FakeProvider(responder=marked_response)
+    archive = {"ccap.docx": "Clause MARK-A", "cctp.docx": "Clause MARK-B"}
+    asyncio.run(analyze_tender(fast, "t1", CountingZipFile(tender_zip(archive))))
+
+    # CCTP modifié, modèle trop lent pour le délai : résultat partiel, CCTP à relire au prochain dépôt
+    slow = FakeProvider(responder=marked_response, latency=2.0)
+    archive["cctp.docx"] = "Clause MARK-C"
+    start = time.monotonic()
+    merged, report = asyncio.run(analyze_tender(slow, "t1", CountingZipFile(tender_zip(archive)), Deadline(0.3)))
+    assert time.monotonic() - start < 1.5
+    assert report["complete"] is False
+    assert report["pending_files"] == ["cctp.docx"]
+    assert "MARK-B" not in merged["penalites"]
+    assert "MARK-A" in merged["penalites"]
+    assert sorted(manifests["t1"]["files"]) == ["ccap.docx"]
+
+
+def test_hedge_duplicate_takes_its_own_scheduler_slot():
+    calls, running = [], []
+
+    async def call():
+        attempt = len(calls)
+        calls.append(attempt)
+        running.append(scheduler.running)
+        await asyncio.sleep(0.2 if attempt == 0 else 0.01)
+        return attempt
+
+    async def scenario():
+        slot = lambda: scheduler.slot("t1", 100)
+        result = await hedged_call(call, tracker_with(0.02), slot=slot)
+        # Appel perdant annulé : sa place est rendue
+        await asyncio.sleep(0.01)
+        return result, scheduler.running
+
+    # Place libre : le doublon est servi par le planificateur et répond le premier
+    scheduler = FairScheduler(2)
+    assert asyncio.run(scenario()) == (1, 0)
+    assert running == [1, 2]
+
+    # Aucune place libre : le doublon attend la fin de l'appel initial, qui répond le premier
+    calls.clear()
+    running.clear()
+    scheduler = FairScheduler(1)
+    assert asyncio.run(scenario()) == (0, 0)
+    assert running[0] == 1 and max(running) == 1
+
+
+def test_hedge_delay_starts_once_the_call_has_its_slot():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def scenario():
+        scheduler = FairScheduler(1)
+        slot = lambda: scheduler.slot("t1", 100)
+
+        async def busy():
+            async with slot():
+                await asyncio.sleep(0.2)
+
+        other = asyncio.ensure_future(busy())
+        await asyncio.sleep(0)
+        # Attente de la place plus longue que le délai de relance : pas de doublon pour autant
+        result = await hedged_call(call, tracker_with(0.1), slot=slot)
+        await other
+        return result
+
+    assert asyncio.run(scenario()) == "ok"
+    assert calls == [1]
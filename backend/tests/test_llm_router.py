@@ -0,0 +1,91 @@
+import asyncio
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+import LLMRouter as router_module
+from LLMRouter import LLMRouter
+from Providers.FakeProvider import FakeProvider, FakeProviderError
+
+
+class Reponse(BaseModel):
+    penalites: List[str]
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def parse(router: LLMRouter):
+    return asyncio.run(router.parse("système", "prompt", Reponse))
+
+
+def names(providers):
+    return [provider.name for provider in providers]
+
+
+def test_cheaper_provider_first_until_latencies_are_measured():
+    cheap = FakeProvider("cheap", input_cost=1, output_cost=1)
+    costly = FakeProvider("costly", input_cost=10, output_cost=10)
+    router = LLMRouter([costly, cheap], exploration_rate=0)
+    assert names(router.ranked()) == ["cheap", "costly"]
+
+    # p95 mesuré : 20 s de latence pèsent plus que 9 $/Mtok d'écart de coût
+    for _ in range(router_module.LLM_MIN_SAMPLES):
+        router.stats["cheap"].latency.record(20.0)
+        router.stats["costly"].latency.record(1.0)
+    assert names(router.ranked()) == ["costly", "cheap"]
+
+
+def test_failed_call_fails_over_and_errors_lower_the_score():
+    broken = FakeProvider("broken", error_rate=1)
+    backup = FakeProvider("backup", input_cost=5, output_cost=5)
+    router = LLMRouter([broken, backup], exploration_rate=0)
+    assert names(router.ranked()) == ["broken", "backup"]
+
+    assert parse(router).provider == "backup"
+    assert router.stats["broken"].error_rate == 1.0
+    assert names(router.ranked()) == ["backup", "broken"]
+    parse(router)
+    assert (broken.calls, backup.calls) == (1, 2)
+
+
+def test_repeated_failures_cool_the_provider_down():
+    broken = FakeProvider("broken", error_rate=1)
+    router = LLMRouter([broken], exploration_rate=0)
+    for _ in range(router_module.LLM_MAX_FAILURES - 1):
+        with pytest.raises(FakeProviderError):
+            parse(router)
+        assert not router.snapshot()[0]["cooling_down"]
+    with pytest.raises(FakeProviderError):
+        parse(router)
+    # Fournisseur écarté, mais toujours essayé en dernier recours
+    assert router.snapshot()[0]["cooling_down"]
+    assert names(router.ranked()) == ["broken"]
+
+
+def test_rate_limited_provider_is_cooled_down_at_once():
+    def rate_limited(prompt, response_model):
+        raise RateLimited("429 Too Many Requests")
+
+    limited = FakeProvider("limited", responder=rate_limited)
+    backup = FakeProvider("backup", input_cost=5, output_cost=5)
+    router = LLMRouter([limited, backup], exploration_rate=0)
+    assert parse(router).provider == "backup"
+    assert [entry["cooling_down"] for entry in router.snapshot()] == [True, False]
+
+
+def test_last_error_is_raised_when_every_provider_fails():
+    router = LLMRouter([FakeProvider("a", error_rate=1), FakeProvider("b", error_rate=1)], exploration_rate=0)
+    with pytest.raises(FakeProviderError):
+        parse(router)
+    assert [entry["failures"] for entry in router.snapshot()] == [1, 1]
+
+
+def test_exploration_sends_some_calls_to_another_healthy_provider():
+    cheap = FakeProvider("cheap")
+    costly = FakeProvider("costly", input_cost=10, output_cost=10)
+    assert names(LLMRouter([cheap, costly], exploration_rate=1, seed=1).ranked()) == ["costly", "cheap"]
+    with pytest.raises(ValueError):
+        LLMRouter([])
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from llm_scheduler import FairScheduler
+
+
+def assert_idle(scheduler: FairScheduler):
+    snapshot = scheduler.snapshot()
+    assert snapshot["running"] == 0
+    assert snapshot["queued"] == 0
+    assert not scheduler.active
+
+
+def test_cancel_waiter_while_slot_is_released():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, quantum=10)
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot("a", 1):
+                await release.wait()
+
+        async def waiter():
+            async with scheduler.slot("b", 1):
+                pytest.fail("place attribuée à une attente annulée")
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        # Le future d'attente est annulé avant que la place ne se libère : _dispatch le retire
+        # de la file avant que la tâche annulée ne reprenne la main
+        release.set()
+        second.cancel()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await second
+
+        assert_idle(scheduler)
+        async with scheduler.slot("c", 1):
+            assert scheduler.running == 1
+        assert_idle(scheduler)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_after_slot_is_granted_releases_it():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, quantum=10)
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot("a", 1):
+                await release.wait()
+
+        async def waiter():
+            async with scheduler.slot("b", 1):
+                await asyncio.sleep(10)
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        release.set()
+        await first
+        # La place est attribuée mais la tâche n'a pas encore repris la main
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        assert_idle(scheduler)
+
+    asyncio.run(scenario())
+
+
+def test_mass_cancel_under_deadline():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=2, quantum=10)
+        started = []
+
+        async def call(index):
+            async with scheduler.slot(index % 2, 5):
+                started.append(index)
+                await asyncio.sleep(1)
+
+        tasks = [asyncio.create_task(call(index)) for index in range(6)]
+        # Délai dépassé : les deux appels en cours rendent leur place pendant que les quatre
+        # attentes sont annulées
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.gather(*tasks), 0.05)
+
+        # Toutes les tâches sont annulées (aucune ValueError), et rien ne démarre ensuite
+        await asyncio.sleep(0.05)
+        assert all(task.cancelled() for task in tasks)
+        assert len(started) == 2
+        assert_idle(scheduler)
+
+    asyncio.run(scenario())
+
+
+def test_small_queue_is_not_stuck_behind_a_large_backlog():
+    async def scenario():
+        # Quantum d'un appel par tour (poids 4 des petites files) : les files alternent
+        scheduler = FairScheduler(max_concurrency=1, quantum=25)
+        order = []
+
+        async def call(key, index):
+            async with scheduler.slot(key, 100):
+                order.append((key, index))
+                await asyncio.sleep(0)
+
+        big = [asyncio.create_task(call("big", index)) for index in range(10)]
+        await asyncio.sleep(0)
+        small = asyncio.create_task(call("small", 0))
+        await asyncio.gather(*big, small)
+
+        # En FIFO, le petit appel passerait en dernier ; ici au plus un ou deux appels du gros
+        # DCE (déjà servis avant son arrivée) le précèdent
+        assert order.index(("small", 0)) <= 2
+        assert_idle(scheduler)
+
+    asyncio.run(scenario())
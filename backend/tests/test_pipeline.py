@@ -0,0 +1,48 @@
+import asyncio
+
+import fitz
+
+from analyze import CHUNK_WORDS
+from file_extraction import iter_files_from_zip
+from pipeline import AnalysisPipeline, analyze_tender
+from Providers.FakeProvider import FakeProvider
+from test_tender_manifest import CountingZipFile, marked_response
+
+
+def test_large_document_is_analyzed_chunk_by_chunk_in_order(data_dir, tender_zip):
+    client = FakeProvider(responder=marked_response)
+    words = [f"mot{i}" for i in range(CHUNK_WORDS * 3)]
+    for chunk in range(3):
+        words[chunk * CHUNK_WORDS] = f"MARK-{chunk}"
+    z = CountingZipFile(tender_zip({"ccap.docx": " ".join(words), "cctp.docx": "MARK-X"}))
+
+    pipeline = AnalysisPipeline(client, strategy="fanout")
+    results = asyncio.run(pipeline.run(iter_files_from_zip(z)))
+    assert client.calls == 4
+    assert [info["penalites"] for info in results["ccap.docx"]["info"]] == [["MARK-0"], ["MARK-1"], ["MARK-2"]]
+    assert [info["penalites"] for info in results["cctp.docx"]["info"]] == [["MARK-X"]]
+    assert not pipeline.pending
+
+
+def pdf_bytes(text: str) -> bytes:
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), text)
+    return document.tobytes()
+
+
+def test_unreadable_file_does_not_abort_the_tender(manifests, tender_zip):
+    client = FakeProvider(responder=marked_response)
+    archive = {"ccap.docx": "Clause MARK-A", "cctp.pdf": pdf_bytes("Clause MARK-B")}
+    merged, report = asyncio.run(analyze_tender(client, "t1", CountingZipFile(tender_zip(archive))))
+    assert set(merged["penalites"]) == {"MARK-A", "MARK-B"}
+
+    # CCTP remplacé par un PDF corrompu, RC illisible ajouté
+    archive = {"ccap.docx": "Clause MARK-A", "cctp.pdf": b"%PDF-1.7 tronque", "rc.pdf": b"%PDF-1.4"}
+    merged, report = asyncio.run(analyze_tender(client, "t1", CountingZipFile(tender_zip(archive))))
+    assert sorted(report["failed_files"]) == ["cctp.pdf", "rc.pdf"]
+    assert sorted(report["extraction_errors"]) == ["cctp.pdf", "rc.pdf"]
+    assert report["files"]["unchanged"] == ["ccap.docx"]
+    assert report["files"]["removed"] == []
+    # L'ancien résultat du CCTP n'est plus fusionné, et le fichier sera relu au prochain dépôt
+    assert merged["penalites"] == ["MARK-A"]
+    assert sorted(manifests["t1"]["files"]) == ["ccap.docx"]
@@ -0,0 +1,83 @@
+import io
+import zipfile
+
+import pytest
+from botocore.exceptions import ClientError
+
+from ranged_object import RangedObjectReader
+
+
+class FakeBucket:
+    """Client S3 minimal : get_object avec Range et IfMatch sur des objets en mémoire."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.etag = '"v1"'
+        self.ranges = []
+
+    def replace(self, data: bytes):
+        self.data = data
+        self.etag = '"v2"'
+
+    def get_object(self, Bucket, Key, Range, IfMatch=None):
+        if IfMatch is not None and IfMatch != self.etag:
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "GetObject")
+        start, end = map(int, Range.removeprefix("bytes=").split("-"))
+        self.ranges.append((start, end))
+        return {"Body": io.BytesIO(self.data[start:end + 1])}
+
+
+def reader_for(bucket: FakeBucket, etag=None) -> RangedObjectReader:
+    return RangedObjectReader("uploads", "dce.zip", len(bucket.data), bucket, block_size=16, etag=etag)
+
+
+def test_seek_and_read_use_cached_blocks_and_single_large_ranges():
+    data = bytes(range(100))
+    bucket = FakeBucket(data)
+    reader = reader_for(bucket)
+
+    assert reader.seek(-10, io.SEEK_END) == 90
+    assert reader.read() == data[90:]
+    assert reader.read() == b""
+    reader.seek(20)
+    assert reader.read(8) == data[20:28]
+    assert reader.read(4) == data[28:32]
+    # Deux lectures dans le même bloc : une seule requête
+    assert bucket.ranges == [(80, 95), (96, 99), (16, 31)]
+
+    reader.seek(5)
+    assert reader.read(60) == data[5:65]
+    assert bucket.ranges[-1] == (5, 64)
+    assert reader.bytes_fetched == 16 + 4 + 16 + 60
+    with pytest.raises(ValueError):
+        reader.seek(-1)
+
+
+def test_zip_members_are_read_through_ranges():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr("ccap.txt", "Pénalités de retard " * 20)
+    bucket = FakeBucket(buffer.getvalue())
+    with zipfile.ZipFile(reader_for(bucket, bucket.etag)) as z:
+        assert z.read("ccap.txt").decode() == "Pénalités de retard " * 20
+
+
+def test_object_replaced_by_a_shorter_one_fails_instead_of_looping():
+    bucket = FakeBucket(bytes(100))
+    reader = reader_for(bucket)
+    bucket.replace(bytes(50))
+    reader.seek(40)
+    with pytest.raises(IOError):
+        reader.read(16)
+    with pytest.raises(IOError):
+        reader.read()
+
+
+def test_reads_are_pinned_to_the_etag_of_the_opened_object():
+    bucket = FakeBucket(bytes(100))
+    reader = reader_for(bucket, bucket.etag)
+    assert reader.read(10) == bytes(10)
+    bucket.replace(bytes(range(100)))
+    reader.seek(50)
+    with pytest.raises(IOError):
+        reader.read(10)
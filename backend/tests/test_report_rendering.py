@@ -0,0 +1,60 @@
+import asyncio
+import io
+
+import docx
+
+import report_rendering
+import s3_config
+from report_rendering import render_and_store_report, render_docx, render_html, render_pdf
+
+RESULT = {
+    "penalites": ["Retard : 100 € par jour", "Absence <non justifiée> : 50 €", "Non spécifié"],
+    "rse": [],
+}
+
+
+def test_html_report_escapes_values_and_skips_unspecified():
+    page = render_html(RESULT)
+    assert "Retard : 100 € par jour" in page
+    assert "Absence &lt;non justifiée&gt; : 50 €" in page
+    assert "Non spécifié" not in page
+
+
+def test_docx_and_pdf_reports_contain_the_values():
+    paragraphs = [paragraph.text for paragraph in docx.Document(io.BytesIO(render_docx(RESULT))).paragraphs]
+    assert "Retard : 100 € par jour" in paragraphs
+    assert "Non spécifié" not in paragraphs
+    assert render_pdf(RESULT).startswith(b"%PDF")
+
+
+def test_stored_report_of_a_version_is_not_rendered_again(monkeypatch):
+    bucket, renders = {}, []
+
+    def put_object(bucket_name, object_name, data, length, content_type):
+        bucket[object_name] = data.read()
+        return True
+
+    def render(dico, report_format):
+        renders.append(report_format)
+        return b"rapport"
+
+    monkeypatch.setattr(s3_config, "object_exists", lambda bucket_name, object_name: object_name in bucket)
+    monkeypatch.setattr(s3_config, "ensure_bucket", lambda bucket_name: None)
+    monkeypatch.setattr(s3_config, "put_object", put_object)
+    monkeypatch.setattr(s3_config, "generate_presigned_url", lambda bucket_name, object_name, expiration: f"url/{object_name}")
+    # Rendu dans le pool de threads par défaut : la fonction remplacée n'existe pas dans les processus du pool
+    monkeypatch.setattr(report_rendering, "get_executor", lambda: None)
+    monkeypatch.setattr(report_rendering, "render_report", render)
+
+    async def scenario():
+        first = await render_and_store_report("t1", 1, RESULT, "pdf")
+        again = await render_and_store_report("t1", 1, RESULT, "pdf")
+        docx_url = await render_and_store_report("t1", 1, RESULT, "docx")
+        next_version = await render_and_store_report("t1", 2, RESULT, "pdf")
+        return first, again, docx_url, next_version
+
+    first, again, docx_url, next_version = asyncio.run(scenario())
+    assert first == again == "url/tenders/t1/report-v1.pdf"
+    assert docx_url == "url/tenders/t1/report-v1.docx"
+    assert next_version == "url/tenders/t1/report-v2.pdf"
+    assert renders == ["pdf", "docx", "pdf"]
@@ -0,0 +1,59 @@
+from rule_extraction import extract_structured_fields, satisfied_fields
+
+REVISION = """Article 5 - Révision des prix
+Les prix sont révisés selon la formule : Pn = P0 x (0,15 + 0,85 x ICHT/ICHT0)
+Avec :
+- Pn : prix révisé du mois n
+- P0 : prix initial du marché
+- ICHT : indice du coût horaire du travail du mois n
+- ICHT0 : valeur de l'indice au mois zéro
+- M : montant des pénalités prévues à l'article 9
+"""
+
+
+def test_complete_formula_with_its_index_definitions_replaces_the_model():
+    extracted = extract_structured_fields(REVISION)
+    assert extracted["formule_revision"] == ["Pn = P0 x (0,15 + 0,85 x ICHT/ICHT0)"]
+    # Seules les définitions des variables de la formule sont retenues
+    assert [line.split(" :")[0] for line in extracted["definitions_formule"]] == ["- Pn", "- P0", "- ICHT", "- ICHT0"]
+    assert satisfied_fields(extracted) == {"formule_revision", "definitions_formule"}
+
+
+def test_undefined_index_keeps_the_formula_for_the_model():
+    text = REVISION.replace("- ICHT0 : valeur de l'indice au mois zéro\n", "")
+    extracted = extract_structured_fields(text)
+    assert extracted["formule_revision"]
+    assert satisfied_fields(extracted) == set()
+
+
+def test_incidental_match_does_not_satisfy_the_field():
+    text = "Le prix P = Po reste ferme pendant la première année. Avec ce mécanisme, aucune révision.\n"
+    extracted = extract_structured_fields(text)
+    assert extracted["formule_revision"]
+    assert satisfied_fields(extracted) == set()
+
+
+def test_truncated_formula_does_not_satisfy_the_field():
+    text = "Formule : P = Po x [0,125 + 0,875 x (I / I0\n- I : indice du mois\n- I0 : indice initial\n"
+    extracted = extract_structured_fields(text)
+    assert satisfied_fields(extracted) == set()
+
+
+def test_dates_percentages_and_payment_terms_complement_the_model():
+    text = (
+        "La date limite de remise des offres est le 15 mars 2025.\n"
+        "Valeur technique : 60 % ; prix : 40 %\n"
+        "Remise de 5 % sur les fournitures.\n"
+        "Le délai global de paiement est fixé à 30 jours à compter de la réception de la facture.\n"
+        "Le titulaire dispose de 8 jours pour intervenir.\n"
+    )
+    extracted = extract_structured_fields(text)
+    assert extracted["calendrier_dates_cles"] == ["La date limite de remise des offres est le 15 mars 2025."]
+    assert extracted["pourcentages_criteres"] == ["Valeur technique : 60 % ; prix : 40 %"]
+    assert extracted["conditions_paiement"] == ["délai global de paiement est fixé à 30 jours"]
+    assert satisfied_fields(extracted) == set()
+
+
+def test_only_requested_fields_are_evaluated():
+    extracted = extract_structured_fields(REVISION + "Date : 15 mars 2025\n", fields=["calendrier_dates_cles"])
+    assert list(extracted) == ["calendrier_dates_cles"]
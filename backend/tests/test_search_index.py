@@ -0,0 +1,58 @@
+import search_index
+from search_index import index_document, index_tender, search, to_match_query
+from sqlite_store import connect
+
+
+def hits(results):
+    return [(hit["tender_id"], hit["field"], hit["file_name"]) for hit in results]
+
+
+def test_match_query_quotes_terms_and_keeps_prefixes():
+    assert to_match_query('retard "OR" pénal*') == '"retard" "OR" "pénal"*'
+    assert to_match_query("  -- ") is None
+
+
+def test_field_search_is_scoped_by_the_match(data_dir):
+    index_tender("t1", 1, {
+        "formations": ["Formation SSIAP en cas de retard"],
+        "formations_requises": ["retard retard retard"] * 3,
+        "penalites": ["Retard : 100 € par jour de retard"],
+    })
+    assert hits(search("retard", field="formations", limit=1)) == [("t1", "formations", None)]
+    assert hits(search("retard", field="penalites")) == [("t1", "penalites", None)]
+    assert {field for _, field, _ in hits(search("retard"))} == {"formations", "formations_requises", "penalites"}
+    # Les noms de champs ne sont pas cherchés comme des valeurs
+    assert search("penalites") == []
+
+
+def test_search_ignores_accents_and_filters_by_tender(data_dir):
+    index_tender("t1", 1, {"penalites": ["Pénalités de retard"]})
+    index_tender("t2", 1, {"penalites": ["Pénalité forfaitaire"]})
+    assert sorted(hits(search("penalite*"))) == [("t1", "penalites", None), ("t2", "penalites", None)]
+    assert hits(search("penalite*", tender_id="t2")) == [("t2", "penalites", None)]
+
+    # Nouvelle version : les anciennes valeurs de l'appel d'offres sont remplacées
+    index_tender("t1", 2, {"penalites": ["Aucune"]})
+    assert hits(search("penalite*")) == [("t2", "penalites", None)]
+
+
+def test_document_text_search_and_removed_files(data_dir):
+    index_document("t1", "ccap.pdf", "Le titulaire fournit les tenues de travail.")
+    index_document("t1", "cctp.pdf", "Les tenues sont fournies par l'acheteur.")
+    assert sorted(hits(search("tenues", field="texte"))) == [("t1", "texte", "ccap.pdf"), ("t1", "texte", "cctp.pdf")]
+    assert "[tenues]" in search("tenues", field="texte")[0]["snippet"]
+
+    index_tender("t1", 1, {}, removed_files=["cctp.pdf"])
+    assert hits(search("tenues", field="texte")) == [("t1", "texte", "ccap.pdf")]
+
+
+def test_index_created_with_an_unindexed_field_is_rebuilt(data_dir):
+    connection = connect(search_index.DB_NAME)
+    connection.execute(
+        "CREATE VIRTUAL TABLE tender_values USING fts5(tender_id UNINDEXED, field UNINDEXED, value, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    connection.execute("INSERT INTO tender_values VALUES ('t1', 'penalites', 'Retard de livraison')")
+    connection.close()
+
+    assert hits(search("retard", field="penalites")) == [("t1", "penalites", None)]
@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+import main
+from analyze import merge_results, print_file
+from deadline import Deadline
+from Providers.FakeProvider import FakeProvider
+from test_tender_manifest import CountingZipFile, marked_response
+
+
+def test_merged_values_are_unique_in_first_seen_order_and_specified():
+    merged = merge_results([
+        {"filename": "ccap.docx", "info": [
+            {"penalites": ["B", "Non spécifié", "A", ""], "nombre_agents": 4},
+            {"penalites": ["A", "C"], "duree_marche": "non spécifiée"},
+        ]},
+        {"filename": "rc.pdf", "info": "Fichier non reconnu"},
+        {"filename": "cctp.docx", "info": [{"penalites": ["B"], "nombre_agents": 4, "rse": []}]},
+    ])
+    assert merged == {"penalites": ["B", "A", "C"], "nombre_agents": [4], "duree_marche": [], "rse": []}
+    assert "Non spécifié" not in print_file(merged)
+
+
+def test_analysis_response_is_serialized_as_is_by_orjson(manifests, tender_zip, monkeypatch):
+    monkeypatch.setattr(main, "get_client", lambda: FakeProvider(responder=marked_response))
+    archive = CountingZipFile(tender_zip({"ccap.docx": "Clause MARK-A", "cctp.docx": "Clause MARK-B"}))
+    response = asyncio.run(main.run_analysis("t1", archive, Deadline(10)))
+
+    # Types simples uniquement : même document qu'après jsonable_encoder, sans conversion préalable
+    assert orjson.loads(orjson.dumps(response)) == json.loads(json.dumps(jsonable_encoder(response)))
+    assert "MARK-A" in response["final_results"]
+    assert response["changes"]["files"]["added"] == ["ccap.docx", "cctp.docx"]
+
+
+def test_streamed_events_are_ndjson_lines():
+    async def analysis(on_item):
+        on_item("ccap.docx", "penalites", "Retard : 100 €")
+        return {"final_results": "Pénalités", "tender_id": "t1"}
+
+    async def read(response):
+        return [orjson.loads(line) async for line in response.body_iterator]
+
+    events = asyncio.run(read(main.stream_analysis(analysis)))
+    assert events == [
+        {"type": "item", "file": "ccap.docx", "field": "penalites", "value": "Retard : 100 €"},
+        {"type": "result", "final_results": "Pénalités", "tender_id": "t1"},
+    ]
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from pipeline import analyze_tender
+from Providers.FakeProvider import FakeProvider
+from streaming_json import IncrementalJSONParser, emit_fields
+from test_tender_manifest import CountingZipFile, marked_response
+
+RESPONSE = {
+    "penalites": ["Retard : 100 € / jour", "Clause \"absence\", [art. 9] {voir CCAP}"],
+    "equipes": [{"poste": "Agent", "horaires": ["7h-19h", "19h-7h"]}],
+    "duree_marche": "3 ans",
+    "rse": [],
+    "budget_ou_CA": None,
+    "nombre_agents": 12,
+}
+EXPECTED = [
+    ("penalites", "Retard : 100 € / jour"),
+    ("penalites", "Clause \"absence\", [art. 9] {voir CCAP}"),
+    ("equipes", {"poste": "Agent", "horaires": ["7h-19h", "19h-7h"]}),
+    ("duree_marche", "3 ans"),
+    ("nombre_agents", 12),
+]
+
+
+def feed_by(text: str, size: int):
+    parser = IncrementalJSONParser()
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+
+def test_items_are_emitted_whatever_the_fragment_size():
+    text = json.dumps(RESPONSE, ensure_ascii=False, indent=2)
+    for size in (1, 3, 7, len(text)):
+        assert feed_by(text, size) == EXPECTED
+
+
+def test_list_item_is_emitted_as_soon_as_it_is_complete():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"penalites": ["Retard", "Abs') == [("penalites", "Retard")]
+    assert parser.feed('ence"') == []
+    assert parser.feed("]") == [("penalites", "Absence")]
+
+
+def test_escaped_keys_and_truncated_response():
+    # Réponse coupée : seul l'élément complet est émis
+    assert feed_by('{"p\\u00e9nalit\\u00e9s": ["A", "B', 4) == [("pénalités", "A")]
+
+
+def test_complete_response_is_emitted_like_a_stream():
+    items = []
+    emit_fields(RESPONSE, lambda field, value: items.append((field, value)))
+    assert items == EXPECTED
+
+
+def test_tender_analysis_streams_items_of_each_file(manifests, tender_zip):
+    items = []
+    client = FakeProvider(responder=marked_response, stream_fragments=7)
+    archive = CountingZipFile(tender_zip({"ccap.docx": "Clause MARK-A MARK-B"}))
+    merged, report = asyncio.run(analyze_tender(client, "t1", archive, on_item=lambda *item: items.append(item)))
+    assert items == [("ccap.docx", "penalites", "MARK-A"), ("ccap.docx", "penalites", "MARK-B")]
+    assert merged["penalites"] == ["MARK-A", "MARK-B"]
@@ -0,0 +1,94 @@
+import asyncio
+import io
+import re
+import typing
+import zipfile
+
+from pydantic import BaseModel
+
+from pipeline import analyze_tender
+from Providers.FakeProvider import FakeProvider
+from tender_manifest import classify_file, diff_fields, new_manifest
+
+
+def marked_response(prompt, response_model):
+    """Renseigne les pénalités avec les marqueurs MARK-x présents dans le prompt."""
+    marks = sorted(set(re.findall(r"MARK-\w+", prompt)))
+    return {
+        name: marks if name == "penalites"
+        else [] if typing.get_origin(field.annotation) is list
+        else marked_response(prompt, field.annotation) if isinstance(field.annotation, type) and issubclass(field.annotation, BaseModel)
+        else None
+        for name, field in response_model.model_fields.items()
+    }
+
+
+class CountingZipFile(zipfile.ZipFile):
+    """Archive qui relève les fichiers dont le contenu est lu."""
+
+    def __init__(self, content: bytes):
+        super().__init__(io.BytesIO(content))
+        self.opened = []
+
+    def open(self, name, *args, **kwargs):
+        self.opened.append(getattr(name, "filename", name))
+        return super().open(name, *args, **kwargs)
+
+
+def analyze(client, tender_id, content):
+    return asyncio.run(analyze_tender(client, tender_id, CountingZipFile(content)))
+
+
+def test_classify_file_against_manifest():
+    manifest = new_manifest("t1")
+    manifest["files"]["ccap.docx"] = {"sha256": "abc"}
+    assert classify_file(manifest, "rc.docx", "abc") == "added"
+    assert classify_file(manifest, "ccap.docx", "abc") == "unchanged"
+    assert classify_file(manifest, "ccap.docx", "def") == "modified"
+
+
+def test_diff_fields_ignores_value_order():
+    previous = {"penalites": ["A", "B"], "duree_marche": ["2 ans"], "rse": ["ISO"]}
+    merged = {"penalites": ["B", "A"], "duree_marche": ["3 ans"], "qualite": ["Q"]}
+    assert diff_fields(previous, merged) == ["duree_marche", "qualite", "rse"]
+    assert diff_fields(None, {"penalites": ["A"], "rse": []}) == ["penalites"]
+
+
+def test_reupload_reanalyzes_only_changed_files(manifests, tender_zip):
+    client = FakeProvider(responder=marked_response)
+    first = tender_zip({"ccap.docx": "Clause MARK-A", "cctp.docx": "Clause MARK-B"})
+    merged, report = analyze(client, "t1", first)
+    assert sorted(report["files"]["added"]) == ["ccap.docx", "cctp.docx"]
+    assert {"MARK-A", "MARK-B"} <= set(merged["penalites"])
+    calls = client.calls
+
+    # Même archive : fichiers reconnus par CRC et taille, ni lus ni renvoyés au modèle
+    z = CountingZipFile(first)
+    merged, report = asyncio.run(analyze_tender(client, "t1", z))
+    assert sorted(report["files"]["unchanged"]) == ["ccap.docx", "cctp.docx"]
+    assert z.opened == []
+    assert client.calls == calls
+    assert report["changed_fields"] == []
+    assert {"MARK-A", "MARK-B"} <= set(merged["penalites"])
+
+    # CCAP corrigé, CCTP retiré : l'ancien résultat de chacun disparaît du résultat fusionné
+    merged, report = analyze(client, "t1", tender_zip({"ccap.docx": "Clause MARK-C"}))
+    assert report["files"]["modified"] == ["ccap.docx"]
+    assert report["files"]["removed"] == ["cctp.docx"]
+    assert merged["penalites"] == ["MARK-C"]
+    assert "penalites" in report["changed_fields"]
+    assert manifests["t1"]["version"] == 3
+    assert list(manifests["t1"]["files"]) == ["ccap.docx"]
+
+
+def test_same_size_change_is_detected_by_hash(manifests, tender_zip):
+    client = FakeProvider(responder=marked_response)
+    analyze(client, "t2", tender_zip({"ccap.docx": "Clause MARK-A"}))
+    # CRC du manifeste faussé : le contenu est lu et comparé par son empreinte SHA-256
+    manifests["t2"]["files"]["ccap.docx"]["crc32"] += 1
+    merged, report = analyze(client, "t2", tender_zip({"ccap.docx": "Clause MARK-A"}))
+    assert report["files"]["unchanged"] == ["ccap.docx"]
+
+    merged, report = analyze(client, "t2", tender_zip({"ccap.docx": "Clause MARK-D"}))
+    assert report["files"]["modified"] == ["ccap.docx"]
+    assert merged["penalites"] == ["MARK-D"]
@@ -0,0 +1,78 @@
+import asyncio
+from collections import deque
+
+import deadline
+import pipeline
+from deadline import LatencyTracker, drain_losers, hedged_call
+from pipeline import analyze_tender
+from Providers.FakeProvider import FakeProvider
+from usage_accounting import UsageRecorder, tender_usage
+from test_tender_manifest import CountingZipFile, marked_response
+
+
+class SlowFirstCall(FakeProvider):
+    """Premier appel lent : la requête doublon répond avant lui."""
+
+    async def parse(self, system, prompt, response_model):
+        self.latency = 1.0 if self.calls == 0 else 0.0
+        return await super().parse(system, prompt, response_model)
+
+    async def parse_stream(self, system, prompt, response_model, on_item):
+        self.latency = 1.0 if self.calls == 0 else 0.0
+        return await super().parse_stream(system, prompt, response_model, on_item)
+
+
+def test_hedge_loser_runs_to_completion_when_it_is_counted():
+    started, responses = [], []
+
+    async def call():
+        attempt = len(started)
+        started.append(attempt)
+        await asyncio.sleep(0.2 if attempt == 0 else 0.01)
+        responses.append(attempt)
+        return attempt
+
+    async def scenario():
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record(0.01)
+        losers = set()
+        result = await hedged_call(call, tracker, losers)
+        assert len(losers) == 1 and responses == [1]
+        assert await drain_losers(losers) == 0
+        return result, losers
+
+    result, losers = asyncio.run(scenario())
+    assert (result, responses, losers) == (1, [1, 0], set())
+
+
+def test_drain_cancels_losers_past_the_timeout():
+    async def scenario():
+        loser = asyncio.ensure_future(asyncio.sleep(10))
+        assert await drain_losers({loser}, timeout=0.01) == 1
+        await asyncio.sleep(0)
+        return loser.cancelled()
+
+    assert asyncio.run(scenario())
+
+
+def test_hedge_loser_usage_is_saved_after_the_response(data_dir, manifests, tender_zip, monkeypatch):
+    monkeypatch.setattr(deadline.llm_latency, "samples", deque([0.02] * deadline.llm_latency.min_samples))
+    client = SlowFirstCall(responder=marked_response, input_cost=1, output_cost=1)
+    usage = UsageRecorder("t1", "c1")
+
+    async def scenario():
+        archive = CountingZipFile(tender_zip({"ccap.docx": "Clause MARK-A"}))
+        merged, report = await analyze_tender(client, "t1", archive, usage=usage)
+        # Réponse rendue avec la requête doublon gagnante seule
+        answered = len(usage.calls)
+        await asyncio.gather(*pipeline._late_usage)
+        return merged, answered
+
+    merged, answered = asyncio.run(scenario())
+    assert merged["penalites"] == ["MARK-A"]
+    assert (client.calls, answered, len(usage.calls)) == (2, 1, 2)
+    # Chaque appel enregistré une seule fois, y compris le perdant arrivé après la réponse
+    assert tender_usage("t1")["calls"] == 2
+    usage.save()
+    assert tender_usage("t1")["calls"] == 2
+    assert tender_usage("t1")["pages"] == 1
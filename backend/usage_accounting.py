@@ -0,0 +1,276 @@
+import logging
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from BaseLLMProvider import LLMResult
+from sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# Consommation des appels au modèle : chaque appel réussi est enregistré (tokens du prompt,
+# dont ceux lus depuis le cache du fournisseur, tokens de la réponse, coût) avec le fichier et
+# l'analyseur qui l'ont produit, ainsi que le nombre de pages de chaque fichier analysé.
+# Les totaux de la requête sont retournés dans la réponse ; la base permet les rapports de coût
+# par page et de tokens par analyseur. Une requête doublon perdante (hedging) est comptée comme
+# les autres quand sa réponse arrive, même après la réponse à la requête d'analyse : save()
+# n'enregistre que les appels qui ne l'ont pas encore été. Un appel en échec, ou annulé avant
+# d'avoir répondu, n'est pas compté : le fournisseur n'en communique pas la consommation.
+DB_NAME = "usage.sqlite"
+# Alerte quand le coût cumulé d'un appel d'offres (toutes versions) dépasse ce budget
+TENDER_BUDGET_USD = float(os.getenv("TENDER_BUDGET_USD", "1.0"))
+# Pages estimées depuis le texte extrait, faute de pagination commune aux PDF, DOCX et XLSX
+CHARS_PER_PAGE = 3000
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS llm_calls (id INTEGER PRIMARY KEY, tender_id TEXT, client_id TEXT, "
+    "file_name TEXT, analyzer TEXT, provider TEXT, model TEXT, input_tokens INTEGER, cached_tokens INTEGER, "
+    "output_tokens INTEGER, cost_usd REAL, share REAL DEFAULT 1, created_at TEXT)",
+    "CREATE INDEX IF NOT EXISTS llm_calls_tender ON llm_calls (tender_id)",
+    "CREATE INDEX IF NOT EXISTS llm_calls_client ON llm_calls (client_id)",
+    "CREATE TABLE IF NOT EXISTS analyzed_files (id INTEGER PRIMARY KEY, tender_id TEXT, client_id TEXT, "
+    "file_name TEXT, analyzer TEXT, pages INTEGER, created_at TEXT)",
+]
+
+TOTALS = (
+    "ROUND(COALESCE(SUM(share), 0), 2) AS calls, COALESCE(SUM(input_tokens), 0) AS input_tokens, COALESCE(SUM(cached_tokens), 0) AS cached_tokens, "
+    "COALESCE(SUM(output_tokens), 0) AS output_tokens, ROUND(COALESCE(SUM(cost_usd), 0), 6) AS cost_usd"
+)
+
+_schema_ready = False
+
+
+def _connect():
+    global _schema_ready
+    connection = connect(DB_NAME)
+    if not _schema_ready:
+        for statement in SCHEMA:
+            connection.execute(statement)
+        # Bases créées avant les appels groupés
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(llm_calls)")}
+        if "share" not in columns:
+            connection.execute("ALTER TABLE llm_calls ADD COLUMN share REAL DEFAULT 1")
+        _schema_ready = True
+    return connection
+
+
+def estimate_pages(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_PAGE) if text else 0
+
+
+def _totals(calls) -> Dict[str, Any]:
+    return {
+        # Un appel groupé compte pour la part attribuée à chaque fichier
+        "calls": round(sum(call["share"] for call in calls), 2),
+        "input_tokens": sum(call["input_tokens"] for call in calls),
+        "cached_tokens": sum(call["cached_tokens"] for call in calls),
+        "output_tokens": sum(call["output_tokens"] for call in calls),
+        "cost_usd": round(sum(call["cost_usd"] for call in calls), 6),
+    }
+
+
+def _cost_per_page(cost: float, pages: int) -> Optional[float]:
+    return round(cost / pages, 6) if pages else None
+
+
+class UsageRecorder:
+    """Consommation des appels au modèle d'une requête d'analyse."""
+
+    def __init__(self, tender_id: str, client_id: Optional[str] = None):
+        self.tender_id = tender_id
+        self.client_id = client_id
+        self.calls = []
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # Appels et fichiers déjà enregistrés en base
+        self.saved_calls = 0
+        self.saved_files = set()
+        # Cumuls en base (toutes les requêtes), connus après save()
+        self.tender_cost_usd: Optional[float] = None
+        self.client_cost_usd: Optional[float] = None
+
+    def record(self, file_name: str, analyzer: str, result: LLMResult, share: float = 1.0):
+        """Enregistre un appel ; `share` est la part de l'appel attribuée au fichier quand un
+        même appel analyse plusieurs documents."""
+        self.calls.append({
+            "file_name": file_name,
+            "analyzer": analyzer,
+            "provider": result.provider,
+            "model": result.model,
+            "input_tokens": round(result.input_tokens * share),
+            "cached_tokens": round(result.cached_tokens * share),
+            "output_tokens": round(result.output_tokens * share),
+            "cost_usd": result.cost_usd * share,
+            "share": share,
+        })
+
+    def record_file(self, file_name: str, analyzer: Optional[str], text: str):
+        self.files[file_name] = {"analyzer": analyzer, "pages": estimate_pages(text)}
+
+    def _grouped(self, key: str) -> Dict[str, Dict[str, Any]]:
+        groups = {}
+        for call in self.calls:
+            groups.setdefault(call[key], []).append(call)
+        return {name: _totals(calls) for name, calls in groups.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        totals = _totals(self.calls)
+        pages = sum(file["pages"] for file in self.files.values())
+        by_file = self._grouped("file_name")
+        for file_name, file in self.files.items():
+            by_file.setdefault(file_name, _totals([]))["pages"] = file["pages"]
+        return {
+            **totals,
+            "pages": pages,
+            "cost_per_page_usd": _cost_per_page(totals["cost_usd"], pages),
+            "by_file": by_file,
+            "by_analyzer": self._grouped("analyzer"),
+            "by_model": self._grouped("model"),
+            "tender_id": self.tender_id,
+            "client_id": self.client_id,
+            "tender_cost_usd": self.tender_cost_usd,
+            "client_cost_usd": self.client_cost_usd,
+            "tender_budget_usd": TENDER_BUDGET_USD,
+            "budget_exceeded": self.tender_cost_usd is not None and self.tender_cost_usd > TENDER_BUDGET_USD,
+        }
+
+    def save(self):
+        """Enregistre les appels et les fichiers de la requête pas encore enregistrés, met à jour
+        les cumuls par appel d'offres et par client, et alerte au franchissement du budget de
+        l'appel d'offres."""
+        now = datetime.utcnow().isoformat()
+        calls = self.calls[self.saved_calls:]
+        files = {file_name: file for file_name, file in self.files.items() if file_name not in self.saved_files}
+        connection = _connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            previous = connection.execute(
+                "SELECT COALESCE(SUM(cost_usd), 0) FROM llm_calls WHERE tender_id = ?", (self.tender_id,)
+            ).fetchone()[0]
+            connection.executemany(
+                "INSERT INTO llm_calls (tender_id, client_id, file_name, analyzer, provider, model, input_tokens, "
+                "cached_tokens, output_tokens, cost_usd, share, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (self.tender_id, self.client_id, call["file_name"], call["analyzer"], call["provider"], call["model"],
+                     call["input_tokens"], call["cached_tokens"], call["output_tokens"], call["cost_usd"], call["share"], now)
+                    for call in calls
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO analyzed_files (tender_id, client_id, file_name, analyzer, pages, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (self.tender_id, self.client_id, file_name, file["analyzer"], file["pages"], now)
+                    for file_name, file in files.items()
+                ],
+            )
+            self.client_cost_usd = round(connection.execute(
+                "SELECT COALESCE(SUM(cost_usd), 0) FROM llm_calls WHERE client_id IS ?", (self.client_id,)
+            ).fetchone()[0], 6)
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        self.saved_calls += len(calls)
+        self.saved_files.update(files)
+
+        self.tender_cost_usd = round(previous + sum(call["cost_usd"] for call in calls), 6)
+        if previous <= TENDER_BUDGET_USD < self.tender_cost_usd:
+            logger.error(
+                f"Budget dépassé pour l'appel d'offres '{self.tender_id}' (client {self.client_id}) : "
+                f"{self.tender_cost_usd:.4f} $ pour un budget de {TENDER_BUDGET_USD:g} $"
+            )
+
+
+def tender_usage(tender_id: str) -> Optional[Dict[str, Any]]:
+    """Cumul de la consommation d'un appel d'offres, par analyseur et par fichier."""
+    connection = _connect()
+    connection.row_factory = _dict_row
+    try:
+        totals = connection.execute(f"SELECT {TOTALS} FROM llm_calls WHERE tender_id = ?", (tender_id,)).fetchone()
+        pages = connection.execute(
+            "SELECT COALESCE(SUM(pages), 0) AS pages FROM analyzed_files WHERE tender_id = ?", (tender_id,)
+        ).fetchone()["pages"]
+        if not totals["calls"] and not pages:
+            return None
+        by_analyzer = connection.execute(
+            f"SELECT analyzer, {TOTALS} FROM llm_calls WHERE tender_id = ? GROUP BY analyzer ORDER BY cost_usd DESC",
+            (tender_id,),
+        ).fetchall()
+        by_file = connection.execute(
+            f"SELECT file_name, {TOTALS} FROM llm_calls WHERE tender_id = ? GROUP BY file_name ORDER BY cost_usd DESC",
+            (tender_id,),
+        ).fetchall()
+    finally:
+        connection.close()
+    return {
+        "tender_id": tender_id,
+        **totals,
+        "pages": pages,
+        "cost_per_page_usd": _cost_per_page(totals["cost_usd"], pages),
+        "tender_budget_usd": TENDER_BUDGET_USD,
+        "budget_exceeded": totals["cost_usd"] > TENDER_BUDGET_USD,
+        "by_analyzer": by_analyzer,
+        "by_file": by_file,
+    }
+
+
+def usage_report(client_id: Optional[str] = None, since: Optional[str] = None) -> Dict[str, Any]:
+    """Rapport de consommation : coût par page et tokens par analyseur, coût par client et
+    appels d'offres hors budget. `since` est une date ISO (2025-01-31)."""
+    conditions, params = ["1 = 1"], []
+    if client_id is not None:
+        conditions.append("client_id = ?")
+        params.append(client_id)
+    if since is not None:
+        conditions.append("created_at >= ?")
+        params.append(since)
+    where = " AND ".join(conditions)
+
+    connection = _connect()
+    connection.row_factory = _dict_row
+    try:
+        by_analyzer = connection.execute(
+            f"SELECT analyzer, {TOTALS}, COUNT(DISTINCT tender_id) AS tenders FROM llm_calls WHERE {where} "
+            "GROUP BY analyzer ORDER BY cost_usd DESC",
+            params,
+        ).fetchall()
+        pages = {
+            row["analyzer"]: row["pages"]
+            for row in connection.execute(
+                f"SELECT analyzer, SUM(pages) AS pages FROM analyzed_files WHERE {where} GROUP BY analyzer", params
+            )
+        }
+        by_client = connection.execute(
+            f"SELECT client_id, {TOTALS}, COUNT(DISTINCT tender_id) AS tenders FROM llm_calls WHERE {where} "
+            "GROUP BY client_id ORDER BY cost_usd DESC",
+            params,
+        ).fetchall()
+        over_budget = connection.execute(
+            f"SELECT tender_id, client_id, ROUND(SUM(cost_usd), 6) AS cost_usd FROM llm_calls WHERE {where} "
+            "GROUP BY tender_id HAVING SUM(cost_usd) > ? ORDER BY cost_usd DESC",
+            params + [TENDER_BUDGET_USD],
+        ).fetchall()
+    finally:
+        connection.close()
+
+    for row in by_analyzer:
+        row["pages"] = pages.get(row["analyzer"], 0)
+        row["cost_per_page_usd"] = _cost_per_page(row["cost_usd"], row["pages"])
+        row["tokens_per_call"] = round((row["input_tokens"] + row["output_tokens"]) / row["calls"]) if row["calls"] else 0
+    total_cost = sum(row["cost_usd"] for row in by_analyzer)
+    total_pages = sum(pages.values())
+    return {
+        "client_id": client_id,
+        "since": since,
+        "cost_usd": round(total_cost, 6),
+        "pages": total_pages,
+        "cost_per_page_usd": _cost_per_page(total_cost, total_pages),
+        "by_analyzer": by_analyzer,
+        "by_client": by_client,
+        "tender_budget_usd": TENDER_BUDGET_USD,
+        "over_budget": over_budget,
+    }
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
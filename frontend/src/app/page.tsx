@@ -2,9 +2,9 @@
 
 import { ChangeEvent, FunctionComponent, useState } from "react";
 import { useMutation } from "@tanstack/react-query";
+import axios from "axios";
 import api from "@/config/api";
 import ApiResponse from "@/types/api-response";
-import jsPDF from 'jspdf';
 
 interface FileResult {
     filename: string;
@@ -13,8 +13,8 @@ interface FileResult {
 
 const Home: FunctionComponent = () => {
     const [file, setFile] = useState<File | null>(null);
-    const [results, setResults] = useState<FileResult[]>([]);
     const [finalResults, setFinalResults] = useState<string>("");
+    const [tenderId, setTenderId] = useState<string | null>(null);
     const [showDownloadButton, setShowDownloadButton] = useState(false);
     const [isDownloading, setIsDownloading] = useState(false);
     const [isLoading, setIsLoading] = useState(false);
@@ -23,19 +23,23 @@ const Home: FunctionComponent = () => {
         mutationFn: async () => {
             if (!file) throw new Error("Aucun fichier sélectionné");
             setIsLoading(true);
+            // L'archive est déposée directement dans MinIO via un formulaire présigné (taille bornée),
+            // puis l'API la lit par plages sans la recevoir en entier
+            const upload = await api.post<{ object_key: string; url: string; fields: Record<string, string> }>('uploads');
+            const uploadForm = new FormData();
+            Object.entries(upload.data.fields).forEach(([name, value]) => uploadForm.append(name, value));
+            // Le fichier doit suivre les champs de la politique signée
+            uploadForm.append('file', file);
+            await axios.post(upload.data.url, uploadForm);
             const formData = new FormData();
-            formData.append('zip_file', file);
-            const response = await api.post<ApiResponse>('read-file', formData, {
-                headers: {
-                    'Content-Type': 'multipart/form-data',
-                }
-            });
+            formData.append('object_key', upload.data.object_key);
+            const response = await api.post<ApiResponse>('analyze-upload', formData);
             return response.data;
         },
         onSuccess: (data) => {
             console.log("Réponse complète:", data);
-            setResults(data.results);
             setFinalResults(data.final_results);
+            setTenderId(data.tender_id);
             setShowDownloadButton(true);
             setIsLoading(false);
         },
@@ -53,27 +57,21 @@ const Home: FunctionComponent = () => {
         }
     };
 
-const handleDownloadPDF = () => {
-    const doc = new jsPDF();
-
-    doc.setFontSize(16);
-    doc.text("Résumé Final de l'analyse", 10, 10);
-
-    const pageHeight = doc.internal.pageSize.height;
-    const lines = doc.splitTextToSize(finalResults, 180);
-    let y = 20;
-
-    lines.forEach((line) => {
-        if (y + 10 > pageHeight) {
-            doc.addPage();
-            y = 10;
+    const handleDownloadPDF = async () => {
+        if (!tenderId) return;
+        setIsDownloading(true);
+        try {
+            // Le rapport est généré côté serveur et servi par une URL présignée
+            const response = await api.get<{ url: string }>(`tenders/${tenderId}/report`, {
+                params: { format: 'pdf' }
+            });
+            window.open(response.data.url, '_blank');
+        } catch (error) {
+            console.error("Erreur lors de la génération du rapport:", error);
+        } finally {
+            setIsDownloading(false);
         }
-        doc.text(line, 10, y);
-        y += 10;
-    });
-
-    doc.save("resultfinal.pdf");
-};
+    };
 
 
     const renderResult = (result: FileResult) => {
@@ -132,7 +130,7 @@ const handleDownloadPDF = () => {
                 {handleFileUpload.isSuccess && <p>Fichier traité avec succès!</p>}
             </div>
 
-            {showDownloadButton && results && (
+            {showDownloadButton && finalResults && (
                 <button
                     onClick={handleDownloadPDF}
                     disabled={isDownloading}
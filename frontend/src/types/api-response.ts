@@ -5,6 +5,8 @@ interface ApiResponse {
     fine_tune_id: string;
     chatgpt_analysis: ChatGPTAnalysis;
     word_document: string;
+    final_results: string;
+    tender_id: string;
 }
 
 export default ApiResponse;